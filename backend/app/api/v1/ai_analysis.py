@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request
 from app.schemas.ai_response import PatientAnalysisRequest, AIAnalysisResponse
 from app.services.ai_service import ai_service
+from app.services.admission_controller import AdmissionRejected, PRIORITY_EMERGENCY, PRIORITY_NORMAL
+from app.services.audit_logger import audit_logger, SOURCE_ADMISSION, SOURCE_AI_ANALYSIS
 
 router = APIRouter()
 
@@ -8,11 +11,21 @@ router = APIRouter()
 @router.post("/analyze_input", response_model=AIAnalysisResponse)
 async def analyze_patient_input(
     request: PatientAnalysisRequest,
+    http_request: Request,
+    x_kiosk_id: Optional[str] = Header(default=None),
 ):
     """
     Analyze patient symptoms and information using AI.
     This endpoint processes patient data and returns medication recommendations.
+
+    Requests are identified by the X-Kiosk-ID header (falling back to the client
+    address) for fair queueing; emergency re-checks are served first.
     """
+    kiosk_id = x_kiosk_id or http_request.headers.get("x-real-ip") or (
+        http_request.client.host if http_request.client else "anonymous"
+    )
+    priority = PRIORITY_EMERGENCY if request.emergency_status else PRIORITY_NORMAL
+
     try:
         response = await ai_service.analyze_symptoms(
             symptoms=request.symptoms,
@@ -22,13 +35,27 @@ async def analyze_patient_input(
             weight=request.weight,
             allergies=request.allergies,
             underlying_conditions=request.underlying_conditions,
-            current_medications=request.current_medications
+            current_medications=request.current_medications,
+            kiosk_id=kiosk_id,
+            priority=priority
         )
         
+        audit_logger.log(
+            SOURCE_AI_ANALYSIS,
+            f"Kiosk {kiosk_id}: diagnosis '{response.diagnosis}', severity {response.severity_level}, "
+            f"{len(response.main_medicines)} main / {len(response.supporting_medicines)} supporting medicines"
+        )
         return response
         
+    except AdmissionRejected as e:
+        audit_logger.log(SOURCE_ADMISSION, f"Kiosk {kiosk_id}: analysis rejected ({e.status_code}): {e.detail}", "warning")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing patient input: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,72 @@
+"""
+Analytics API endpoints for inventory operations.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.config import settings
+from app.database.session import get_async_read_db
+from app.schemas.analytics import DepletionForecastListResponse, DepletionForecastResponse
+from app.services.consumption_service import get_depletion_forecasts
+
+router = APIRouter()
+
+
+@router.get("/depletion", response_model=DepletionForecastListResponse)
+async def get_depletion(
+    window_days: Optional[int] = Query(default=None, ge=1, le=365),
+    needs_reorder_only: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Forecast stock depletion and reorder quantities for every medication.
+    
+    Served from the daily consumption rollup, so the cost per medication does
+    not grow with prescription history.
+    
+    Args:
+        window_days: Days of consumption to average over (default: FORECAST_WINDOW_DAYS)
+        needs_reorder_only: Only medications at or below their reorder point
+    """
+    try:
+        window_days = window_days or settings.forecast_window_days
+        forecasts = await db.run_sync(get_depletion_forecasts, None, window_days)
+        
+        if needs_reorder_only:
+            forecasts = [forecast for forecast in forecasts if forecast["needs_reorder"]]
+        
+        return DepletionForecastListResponse(window_days=window_days, items=forecasts)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error forecasting depletion: {str(e)}"
+        )
+
+
+@router.get("/depletion/{medication_id}", response_model=DepletionForecastResponse)
+async def get_medication_depletion(
+    medication_id: int,
+    window_days: Optional[int] = Query(default=None, ge=1, le=365),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Forecast stock depletion and reorder quantity for one medication."""
+    try:
+        forecasts = await db.run_sync(get_depletion_forecasts, medication_id, window_days)
+        
+        if not forecasts:
+            raise HTTPException(
+                status_code=404,
+                detail="Medication not found"
+            )
+        
+        return forecasts[0]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error forecasting depletion: {str(e)}"
+        )
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.services.autocomplete_service import SUGGESTION_TYPES, autocomplete_index
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+class AutocompleteSuggestion(BaseModel):
+    """A medication or symptom matching the typed text."""
+    type: str  # "medication" or "symptom"
+    id: int
+    label: str  # Text to display (medication name or Vietnamese symptom name)
+    matched: str  # Indexed text that matched (e.g. the active ingredient)
+
+
+class AutocompleteResponse(BaseModel):
+    """Response schema for autocomplete."""
+    query: str
+    suggestions: List[AutocompleteSuggestion]
+
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+    types: Optional[List[str]] = Query(default=None)
+):
+    """
+    Suggest medications and symptoms while the patient types.
+    
+    Matches word prefixes of medication names, active ingredients and symptom
+    names (Vietnamese and English), with or without diacritics: "dau d" finds
+    "đau đầu". Served from memory, without database or embedding calls.
+    
+    Args:
+        q: Text typed so far
+        limit: Maximum number of suggestions
+        types: Only these suggestion types (repeatable: medication, symptom)
+    """
+    if types:
+        unknown = [t for t in types if t not in SUGGESTION_TYPES]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown types: {', '.join(unknown)}. Available: {', '.join(SUGGESTION_TYPES)}"
+            )
+    
+    if not autocomplete_index.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Autocomplete index is not ready"
+        )
+    
+    return AutocompleteResponse(
+        query=q,
+        suggestions=autocomplete_index.search(q, limit, set(types) if types else None)
+    )
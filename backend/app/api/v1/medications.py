@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database.session import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import ARRAY, Text, cast, not_, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from opentelemetry import trace
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, alphabetical_page, split_alphabetical_page
+from app.database.session import get_async_db, get_async_read_db
 from app.models.medication import Medication
-from pydantic import BaseModel
+from app.services.catalog_service import catalog_cache
+from pydantic import BaseModel, TypeAdapter
 
 router = APIRouter()
 
@@ -17,6 +21,7 @@ class MedicationResponse(BaseModel):
     unit_type: str
     unit_price: int
     stock: int
+    available_stock: int  # stock minus active reservations
     side_effects: str = None
     max_per_day: int = None
     is_supporting: bool
@@ -28,42 +33,239 @@ class MedicationResponse(BaseModel):
         from_attributes = True
 
 
-@router.get("/medications", response_model=List[MedicationResponse])
+class MedicationCatalogItem(BaseModel):
+    """Response schema for a medication in the cached catalog (stock is served by /medications/stock)."""
+    id: int
+    name: str
+    active_ingredient: str
+    form: str
+    unit_type: str
+    unit_price: int
+    side_effects: str = None
+    max_per_day: int = None
+    is_supporting: bool
+    treatment_class: str
+    contraindications: str = None
+    allergy_tags: List[str] = []
+
+    class Config:
+        from_attributes = True
+
+
+class MedicationStockResponse(BaseModel):
+    """Response schema for the available stock of a medication."""
+    id: int
+    available_stock: int  # stock minus active reservations
+
+
+class MedicationListResponse(BaseModel):
+    """Response schema for a page of medications."""
+    items: List[Dict[str, Any]]  # Only the requested fields (always including id)
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
+
+
+medication_list_adapter = TypeAdapter(List[MedicationCatalogItem])
+
+STOCK_LEVELS_SQL = text("SELECT id, stock - reserved AS available_stock FROM medications ORDER BY id")
+
+# Selectable fields of a medication listing
+MEDICATION_FIELDS = {
+    "id": Medication.id,
+    "name": Medication.name,
+    "active_ingredient": Medication.active_ingredient,
+    "form": Medication.form,
+    "unit_type": Medication.unit_type,
+    "unit_price": Medication.unit_price,
+    "stock": Medication.stock,
+    "available_stock": (Medication.stock - Medication.reserved).label("available_stock"),
+    "side_effects": Medication.side_effects,
+    "max_per_day": Medication.max_per_day,
+    "is_supporting": Medication.is_supporting,
+    "treatment_class": Medication.treatment_class,
+    "contraindications": Medication.contraindications,
+    "allergy_tags": Medication.allergy_tags
+}
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated sparse fieldset.
+    
+    Args:
+        fields: Requested field names, or None for all fields
+        
+    Returns:
+        Field names to return, id first
+    """
+    if not fields:
+        return list(MEDICATION_FIELDS)
+    
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in MEDICATION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(MEDICATION_FIELDS)}"
+        )
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+
+@router.get("/medications", response_model=List[MedicationCatalogItem])
 async def get_medications(
-    db: Session = Depends(get_db),
-    in_stock_only: bool = True
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
-    Returns all available medications in stock.
+    Returns the medication catalog, without stock.
+    
+    Served from an in-memory snapshot that is rebuilt only after the catalog
+    changes; sales and reservations do not change it. Send the returned ETag
+    as If-None-Match to get an empty 304 response while nothing has changed,
+    and get available stock from /medications/stock.
+    
+    Snapshots are built from the primary: a rebuild follows a change
+    notification, and a lagging replica would pin the pre-change catalog
+    until the next change.
+    """
+    try:
+        built = False
+        
+        async def build() -> bytes:
+            nonlocal built
+            built = True
+            medications = (await db.scalars(select(Medication).order_by(Medication.id))).all()
+            return medication_list_adapter.dump_json(
+                medication_list_adapter.validate_python(medications, from_attributes=True)
+            )
+        
+        snapshot = await catalog_cache.get("catalog", build)
+        not_modified = snapshot.matches(if_none_match)
+        span = trace.get_current_span()
+        span.set_attribute("cache.hit", not built)
+        span.set_attribute("cache.not_modified", not_modified)
+        # no-cache: clients may store the catalog but must revalidate it on every poll
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        
+        if not_modified:
+            catalog_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+        
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching medications: {str(e)}"
+        )
+
+
+@router.get("/medications/stock", response_model=List[MedicationStockResponse])
+async def get_medication_stock(
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Returns the available (unreserved) stock of every medication.
+    
+    Read from the primary on every call, so a kiosk can hide sold-out
+    medications of its cached catalog.
+    """
+    try:
+        rows = (await db.execute(STOCK_LEVELS_SQL)).all()
+        return [MedicationStockResponse(id=row.id, available_stock=row.available_stock) for row in rows]
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching medication stock: {str(e)}"
+        )
+
+
+@router.get("/medications/listing", response_model=MedicationListResponse)
+async def list_medications(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    treatment_class: Optional[str] = None,
+    is_supporting: Optional[bool] = None,
+    form: Optional[str] = None,
+    min_price: Optional[int] = Query(default=None, ge=0),
+    max_price: Optional[int] = Query(default=None, ge=0),
+    exclude_allergens: List[str] = Query(default=[]),
+    in_stock_only: bool = True,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    List medications alphabetically, one page at a time.
+    
+    Only the requested columns are read from the database, so list views can
+    fetch e.g. fields=name,unit_price,available_stock.
     
     Args:
-        in_stock_only: If True, only return medications with stock > 0
+        cursor: next_cursor of the previous page; omit for the first page
+        limit: Page size
+        fields: Comma-separated fields to return (default: all); id is always included
+        treatment_class: Only medications of this treatment class
+        is_supporting: Only supporting (true) or main (false) medications
+        form: Only medications of this dosage form
+        min_price: Only medications with a unit price of at least this
+        max_price: Only medications with a unit price of at most this
+        exclude_allergens: Only medications tagged with none of these allergens (repeatable)
+        in_stock_only: If True, only return medications with unreserved stock > 0
     """
     try:
-        query = db.query(Medication)
+        selected = _parse_fields(fields)
+        columns = [MEDICATION_FIELDS[field] for field in selected]
+        if "name" not in selected:
+            columns.append(Medication.name)  # Needed for the cursor
+        
+        query = select(*columns)
         
+        if treatment_class:
+            query = query.filter(Medication.treatment_class == treatment_class)
+        if is_supporting is not None:
+            query = query.filter(Medication.is_supporting == is_supporting)
+        if form:
+            query = query.filter(Medication.form == form)
+        if min_price is not None:
+            query = query.filter(Medication.unit_price >= min_price)
+        if max_price is not None:
+            query = query.filter(Medication.unit_price <= max_price)
+        if exclude_allergens:
+            allergens = cast([allergen.strip().lower() for allergen in exclude_allergens], ARRAY(Text))
+            query = query.filter(or_(
+                Medication.allergy_tags.is_(None),
+                not_(Medication.allergy_tags.op("&&")(allergens))  # && : arrays overlap
+            ))
         if in_stock_only:
-            query = query.filter(Medication.stock > 0)
+            query = query.filter(Medication.stock - Medication.reserved > 0)
         
-        medications = query.all()
+        query = alphabetical_page(query, Medication.name, Medication.id, cursor, limit)
+        rows, next_cursor = split_alphabetical_page((await db.execute(query)).all(), limit)
         
-        return medications
+        return MedicationListResponse(
+            items=[{field: row._mapping[field] for field in selected} for row in rows],
+            next_cursor=next_cursor
+        )
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error fetching medications: {str(e)}"
+            detail=f"Error listing medications: {str(e)}"
         )
 
 
 @router.get("/medications/{medication_id}", response_model=MedicationResponse)
 async def get_medication(
     medication_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific medication by ID."""
     try:
-        medication = db.query(Medication).filter(Medication.id == medication_id).first()
+        medication = await db.get(Medication, medication_id)
         
         if not medication:
             raise HTTPException(
@@ -0,0 +1,90 @@
+"""
+Monitoring API endpoints exposing runtime metrics.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from app.api.v1.prescriptions import prescription_detail_cache
+from app.core.config import settings
+from app.core.logging import get_log_stats
+from app.core.profiling import is_authorized, profile_store
+from app.database.pool_metrics import pool_metrics
+from app.services.admission_controller import llm_admission_controller
+from app.services.audit_logger import audit_logger
+from app.services.autocomplete_service import autocomplete_index
+from app.services.catalog_service import catalog_cache
+
+router = APIRouter()
+
+
+@router.get("/admission")
+async def get_admission_stats():
+    """Get LLM admission control and queue-time metrics."""
+    return llm_admission_controller.get_stats()
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """
+    Get connection pool usage for this worker's engines.
+    
+    Total connections against Postgres are roughly
+    workers x engines x (pool_size + max_overflow).
+    """
+    return {
+        "pgbouncer_mode": settings.db_pgbouncer_mode,
+        "engines": {name: metrics.get_stats() for name, metrics in pool_metrics.items()}
+    }
+
+
+@router.get("/caches")
+async def get_cache_stats():
+    """Get hit/miss statistics of this worker's in-process caches."""
+    return {
+        "prescription_detail": prescription_detail_cache.get_stats(),
+        "medication_catalog": catalog_cache.get_stats(),
+        "autocomplete": autocomplete_index.get_stats()
+    }
+
+
+@router.get("/audit-log")
+async def get_audit_log_stats():
+    """Get write-behind audit logger queue depth and drop counters."""
+    return audit_logger.get_stats()
+
+
+@router.get("/logging")
+async def get_logging_stats():
+    """Get application log queue depth and drop counter for this worker."""
+    return get_log_stats()
+
+
+def _require_profile_access(token: Optional[str]) -> None:
+    """Profiles expose code paths and timings; allow them only with the profiling token."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not is_authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(default=None)):
+    """List recent request profiles, newest first."""
+    _require_profile_access(x_profile_token)
+    return {
+        "profiles": await asyncio.to_thread(profile_store.list),
+        "store": await asyncio.to_thread(profile_store.get_stats)
+    }
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str, x_profile_token: Optional[str] = Header(default=None)):
+    """Download a profile as speedscope JSON (open at https://www.speedscope.app)."""
+    _require_profile_access(x_profile_token)
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
@@ -1,22 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database.session import get_db
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, keyset_page, split_page
+from app.database.connection import AsyncSessionLocal
+from app.database.session import get_async_db, get_async_read_db, has_replica
 from app.models.patient import Patient, Allergy, UnderlyingCondition
-from app.schemas.patient import PatientCreate, PatientResponse
+from app.schemas.patient import PatientCreate, PatientListResponse, PatientResponse
 
 router = APIRouter()
 
 
-@router.get("/patients")
-async def get_patients():
-    """Get all patients."""
-    return {"message": "Patients endpoint - to be implemented"}
+@router.get("/patients", response_model=PatientListResponse)
+async def get_patients(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    gender: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    List patients, newest first, one page at a time.
+    
+    Args:
+        cursor: next_cursor of the previous page; omit for the first page
+        limit: Page size
+        gender: Only patients of this gender
+        min_age: Only patients at least this old
+        max_age: Only patients at most this old
+        created_from: Only patients created at or after this time
+        created_to: Only patients created before this time
+    """
+    try:
+        query = select(Patient).options(
+            selectinload(Patient.allergies),
+            selectinload(Patient.underlying_conditions)
+        )
+        
+        if gender:
+            query = query.filter(Patient.gender == gender)
+        if min_age is not None:
+            query = query.filter(Patient.age >= min_age)
+        if max_age is not None:
+            query = query.filter(Patient.age <= max_age)
+        if created_from:
+            query = query.filter(Patient.created_at >= created_from)
+        if created_to:
+            query = query.filter(Patient.created_at < created_to)
+        
+        query = keyset_page(query, Patient.created_at, Patient.id, cursor, limit)
+        patients, next_cursor = split_page((await db.scalars(query)).all(), limit)
+        
+        return PatientListResponse(items=patients, next_cursor=next_cursor)
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching patients: {str(e)}"
+        )
 
 
 @router.post("/patients", response_model=PatientResponse)
 async def create_patient(
     patient_data: PatientCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new patient record.
@@ -25,56 +79,57 @@ async def create_patient(
     Output: Patient ID and created patient data
     """
     try:
-        # Create patient record
+        # Create patient record with its allergies and conditions, inserted in one flush
         db_patient = Patient(
             gender=patient_data.gender,
             age=patient_data.age,
             weight=patient_data.weight,
-            height=patient_data.height
+            height=patient_data.height,
+            allergies=[
+                Allergy(substance=allergy_substance)
+                for allergy_substance in patient_data.allergies
+            ],
+            underlying_conditions=[
+                UnderlyingCondition(condition_name=condition_name)
+                for condition_name in patient_data.underlying_conditions
+            ]
         )
         
         db.add(db_patient)
-        db.flush()  # To get the patient ID
-        
-        # Add allergies if provided
-        if patient_data.allergies:
-            for allergy_substance in patient_data.allergies:
-                allergy = Allergy(
-                    patient_id=db_patient.id,
-                    substance=allergy_substance
-                )
-                db.add(allergy)
-        
-        # Add underlying conditions if provided
-        if patient_data.underlying_conditions:
-            for condition_name in patient_data.underlying_conditions:
-                condition = UnderlyingCondition(
-                    patient_id=db_patient.id,
-                    condition_name=condition_name
-                )
-                db.add(condition)
-        
-        db.commit()
-        db.refresh(db_patient)
+        await db.commit()
         
         return db_patient
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error creating patient: {str(e)}"
         )
 
 
+async def _load_patient(db: AsyncSession, patient_id: int) -> Optional[Patient]:
+    """Load a patient with allergies and underlying conditions."""
+    return await db.scalar(
+        select(Patient)
+        .options(selectinload(Patient.allergies), selectinload(Patient.underlying_conditions))
+        .filter(Patient.id == patient_id)
+    )
+
+
 @router.get("/patients/{patient_id}", response_model=PatientResponse)
 async def get_patient(
     patient_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific patient by ID."""
     try:
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await _load_patient(db, patient_id)
+        
+        if not patient and has_replica():
+            # Just created and not replicated yet: read your own write from the primary
+            async with AsyncSessionLocal() as primary_db:
+                patient = await _load_patient(primary_db, patient_id)
         
         if not patient:
             raise HTTPException(
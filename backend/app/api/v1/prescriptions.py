@@ -1,24 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database.session import get_db
+import logging
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from opentelemetry import trace
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app.database.connection import AsyncSessionLocal
+from app.database.session import get_async_db, get_async_read_db, has_replica
 from app.models.prescription import Prescription, PrescriptionDose, PrescriptionSupporting
 from app.models.medication import Medication
 from app.models.patient import Patient
-from app.schemas.ai_response import ConfirmPrescriptionResponse, PrescriptionItem
-from app.schemas.patient import PatientCreate
+from app.core.cache import TTLCache
+from app.core.tracing import tracer
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, keyset_page, split_page
+from app.schemas.ai_response import ConfirmPrescriptionResponse, PrescriptionItem, StockReservationResponse
+from app.schemas.prescription import (
+    PrescriptionDetailResponse,
+    PrescriptionDoseResponse,
+    PrescriptionListResponse,
+    PrescriptionSupportingResponse
+)
+from app.services.audit_logger import audit_logger, SOURCE_CONFIRMATION, SOURCE_RESERVATION
+from app.services.consumption_service import record_consumption
+from app.services.export_service import EXPORT_FORMATS, export_prescriptions
+from app.services.idempotency_service import IdempotencyKeyConflict, get_stored_response, lock_key, request_fingerprint, store_response
+from app.services.inventory_service import (
+    InsufficientStockError,
+    audit_stock_decrement,
+    cancel_reservation,
+    decrement_stock,
+    reserve_stock
+)
+from app.services.vector_store_manager import vector_store_manager
+from app.core.config import settings
+from app.schemas.patient import PatientCreate, PatientResponse
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Receipt and print screens fetch a just-confirmed prescription repeatedly; the
+# serialized JSON is cached, so hits skip response model validation and encoding.
+# Confirmation stores the new prescription's body, built from the request's own
+# data (see _confirmed_prescription_detail).
+# Prescriptions are not updated or deleted through the API; code that changes one
+# in this process must evict it with prescription_detail_cache.invalidate. The
+# archive job (app.cli.maintenance) runs in its own process and cannot, so an
+# archived prescription may still be served for up to PRESCRIPTION_CACHE_TTL_SECONDS.
+prescription_detail_cache = TTLCache(
+    maxsize=settings.prescription_cache_size,
+    ttl=settings.prescription_cache_ttl_seconds
+)
 
-class ConfirmPrescriptionRequest(BaseModel):
-    """Request schema for confirming prescription."""
-    patient_data: PatientCreate
+
+class MedicationOrderRequest(BaseModel):
+    """Request schema for the medicines and quantities of a recommendation."""
     main_medicines: List[dict]
     supporting_medicines: List[dict]
     doses_per_day: int
     total_days: int
+
+
+class ConfirmPrescriptionRequest(MedicationOrderRequest):
+    """Request schema for confirming prescription."""
+    patient_data: PatientCreate
+    reservation_id: Optional[str] = None  # Hold from POST /reservations, consumed on confirm
     diagnosis: str = ""
     ai_recommendation: str = ""
     severity_level: str = ""
@@ -29,30 +78,492 @@ class ConfirmPrescriptionRequest(BaseModel):
     disclaimer: str = ""
 
 
+def _medication_name_candidates(name: str) -> List[str]:
+    """
+    Names to try for a requested medicine, in order of preference.
+    
+    The AI sometimes appends the active ingredient, e.g. "Panadol (Paracetamol)",
+    so the part before the parenthesis is tried as a fallback.
+    """
+    candidates = [name]
+    if "(" in name and ")" in name:
+        candidates.append(name.split("(")[0].strip())
+    return candidates
+
+
+def _normalize_medication_name(name: str) -> str:
+    """Case- and surrounding-whitespace-insensitive form of a name (as indexed by idx_medications_name_lower)."""
+    return name.strip().lower()
+
+
+async def _resolve_medications(db: AsyncSession, names: Iterable[str]) -> Dict[str, Medication]:
+    """
+    Resolve requested medicine names to medications with a single query.
+    
+    The query matches each candidate name exactly or by lower(name), so case
+    and whitespace variants from the AI are found too; _lookup_medication
+    decides between them.
+    
+    Args:
+        db: Database session
+        names: Requested medicine names
+        
+    Returns:
+        Mapping of medication name to medication, for every medication matched
+    """
+    candidate_names = {candidate for name in names for candidate in _medication_name_candidates(name)}
+    if not candidate_names:
+        return {}
+    
+    medications = (await db.scalars(
+        select(Medication).filter(
+            or_(
+                Medication.name.in_(candidate_names),
+                func.lower(Medication.name).in_({_normalize_medication_name(name) for name in candidate_names})
+            )
+        )
+    )).all()
+    
+    return {med.name: med for med in medications}
+
+
+def _lookup_medication(medications: Dict[str, Medication], name: str) -> Optional[Medication]:
+    """
+    Find a requested medicine in the resolved medications.
+    
+    Every candidate name is tried exactly first. Otherwise a candidate matches
+    by normalized name only if exactly one medication has that normalized name,
+    so names differing only in case never resolve to an arbitrary one of them.
+    """
+    candidates = _medication_name_candidates(name)
+    for candidate in candidates:
+        medication = medications.get(candidate)
+        if medication:
+            return medication
+    
+    for candidate in candidates:
+        normalized = _normalize_medication_name(candidate)
+        matches = [med for med in medications.values() if _normalize_medication_name(med.name) == normalized]
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+
+async def _prepare_order(
+    db: AsyncSession,
+    request: MedicationOrderRequest,
+    check_stock: bool = True
+) -> Tuple[List[dict], List[dict], List[PrescriptionItem], int]:
+    """
+    Resolve requested medicines and compute quantities and prices.
+    
+    Args:
+        db: Database session
+        request: Requested medicines and dosage
+        check_stock: Fail fast when unreserved stock is already too low
+        
+    Returns:
+        Tuple of (main medicine data, supporting medicine data, items, total price)
+    """
+    # Calculate total price and prepare items
+    total_price = 0
+    prescription_items = []
+    
+    # Resolve every requested medicine in one query
+    medications = await _resolve_medications(
+        db,
+        [med_info["name"] for med_info in request.main_medicines + request.supporting_medicines]
+    )
+    
+    # Process main medicines
+    main_medicine_total_quantities = []
+    for med_info in request.main_medicines:
+        medication = _lookup_medication(medications, med_info["name"])
+        
+        if not medication:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Medication not found: {med_info['name']}"
+            )
+        
+        # Calculate total quantity needed
+        quantity_per_dose = med_info["quantity_per_dose"]
+        total_quantity = quantity_per_dose * request.doses_per_day * request.total_days
+        
+        # Fail fast on a stale read; the authoritative check is the atomic update
+        if check_stock and medication.available_stock < total_quantity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {medication.name}. Available: {medication.available_stock}, Required: {total_quantity}"
+            )
+        
+        item_price = total_quantity * medication.unit_price
+        total_price += item_price
+        
+        prescription_items.append(PrescriptionItem(
+            name=medication.name,
+            total_quantity=total_quantity,
+            price=item_price
+        ))
+        
+        main_medicine_total_quantities.append({
+            "medication": medication,
+            "quantity_per_dose": quantity_per_dose,
+            "total_quantity": total_quantity
+        })
+    
+    # Process supporting medicines
+    supporting_medicine_data = []
+    for med_info in request.supporting_medicines:
+        medication = _lookup_medication(medications, med_info["name"])
+        
+        if not medication:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Supporting medication not found: {med_info['name']}"
+            )
+        
+        total_quantity = med_info.get("quantity_total", med_info.get("quantity_per_day", 1))
+        
+        # Fail fast on a stale read; the authoritative check is the atomic update
+        if check_stock and medication.available_stock < total_quantity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {medication.name}. Available: {medication.available_stock}, Required: {total_quantity}"
+            )
+        
+        item_price = total_quantity * medication.unit_price
+        total_price += item_price
+        
+        prescription_items.append(PrescriptionItem(
+            name=medication.name,
+            total_quantity=total_quantity,
+            price=item_price
+        ))
+        
+        supporting_medicine_data.append({
+            "medication": medication,
+            "total_quantity": total_quantity
+        })
+    
+    return main_medicine_total_quantities, supporting_medicine_data, prescription_items, total_price
+
+
+def _stock_quantities(medicine_data: List[dict]) -> Dict[int, int]:
+    """Sum total quantities per medication ID."""
+    quantities: Dict[int, int] = {}
+    for med_data in medicine_data:
+        med_id = med_data["medication"].id
+        quantities[med_id] = quantities.get(med_id, 0) + med_data["total_quantity"]
+    return quantities
+
+
+def _insufficient_stock_error(e: InsufficientStockError, medicine_data: List[dict]) -> HTTPException:
+    """Convert an InsufficientStockError into a 400 response naming the medication."""
+    medication_name = next(
+        (
+            med_data["medication"].name
+            for med_data in medicine_data
+            if med_data["medication"].id == e.medication_id
+        ),
+        str(e.medication_id)
+    )
+    return HTTPException(
+        status_code=400,
+        detail=f"Insufficient stock for {medication_name}. Available: {e.available}, Required: {e.required}"
+    )
+
+
+async def _load_prescription_detail(db: AsyncSession, prescription_id: int) -> Optional[PrescriptionDetailResponse]:
+    """
+    Load a prescription with its patient and medicine lines.
+    
+    Uses a fixed number of queries however many lines the prescription has:
+    the prescription joined with its patient, the patient's allergies and
+    conditions, and each set of lines joined with their medications.
+    
+    Args:
+        db: Database session
+        prescription_id: Prescription ID
+        
+    Returns:
+        Prescription detail, or None if it does not exist
+    """
+    prescription = await db.scalar(
+        select(Prescription)
+        .options(
+            joinedload(Prescription.patient).selectinload(Patient.allergies),
+            joinedload(Prescription.patient).selectinload(Patient.underlying_conditions),
+            selectinload(Prescription.doses).joinedload(PrescriptionDose.medication),
+            selectinload(Prescription.supportings).joinedload(PrescriptionSupporting.medication)
+        )
+        .filter(Prescription.id == prescription_id)
+    )
+    
+    if not prescription:
+        return None
+    
+    # Line prices use the current unit price; total_price is what was charged
+    doses = []
+    for dose in sorted(prescription.doses, key=lambda dose: dose.id):
+        total_quantity = dose.quantity_per_dose * prescription.doses_per_day * prescription.days
+        doses.append(PrescriptionDoseResponse(
+            id=dose.id,
+            medication_id=dose.medication_id,
+            medication_name=dose.medication.name,
+            quantity_per_dose=dose.quantity_per_dose,
+            total_quantity=total_quantity,
+            dose_time=dose.dose_time,
+            special_instructions=dose.special_instructions,
+            unit_price=dose.medication.unit_price,
+            price=total_quantity * dose.medication.unit_price
+        ))
+    
+    supportings = [
+        PrescriptionSupportingResponse(
+            id=supporting.id,
+            medication_id=supporting.medication_id,
+            medication_name=supporting.medication.name,
+            quantity_total=supporting.quantity_total,
+            usage_instructions=supporting.usage_instructions,
+            unit_price=supporting.medication.unit_price,
+            price=supporting.quantity_total * supporting.medication.unit_price
+        )
+        for supporting in sorted(prescription.supportings, key=lambda supporting: supporting.id)
+    ]
+    
+    return PrescriptionDetailResponse(
+        id=prescription.id,
+        created_at=prescription.created_at,
+        status=prescription.status,
+        doses_per_day=prescription.doses_per_day,
+        days=prescription.days,
+        total_price=prescription.total_price,
+        diagnosis=prescription.diagnosis,
+        ai_recommendation=prescription.ai_recommendation,
+        pharmacist_notes=prescription.pharmacist_notes,
+        patient=prescription.patient,
+        doses=doses,
+        supportings=supportings
+    )
+
+
+def _confirmed_prescription_detail(
+    prescription: Prescription,
+    patient: Patient,
+    main_medicine_data: List[dict],
+    supporting_medicine_data: List[dict],
+    dose_ids: List[int],
+    supporting_ids: List[int]
+) -> PrescriptionDetailResponse:
+    """
+    Build the detail of a prescription confirmed in this request from what the
+    confirmation already holds, without reading it back.
+    
+    Matches _load_prescription_detail for a new prescription: the patient has
+    no allergies or conditions stored, and lines are in insertion (id) order.
+    
+    Args:
+        prescription: The flushed prescription
+        patient: Its patient, flushed
+        main_medicine_data: Main medicine data from _prepare_order
+        supporting_medicine_data: Supporting medicine data from _prepare_order
+        dose_ids: IDs returned by the dose insert, in the order of main_medicine_data
+        supporting_ids: IDs returned by the supporting insert, in the order of supporting_medicine_data
+        
+    Returns:
+        Prescription detail
+    """
+    return PrescriptionDetailResponse(
+        id=prescription.id,
+        created_at=prescription.created_at,
+        status=prescription.status,
+        doses_per_day=prescription.doses_per_day,
+        days=prescription.days,
+        total_price=prescription.total_price,
+        diagnosis=prescription.diagnosis,
+        ai_recommendation=prescription.ai_recommendation,
+        pharmacist_notes=prescription.pharmacist_notes,
+        patient=PatientResponse(
+            id=patient.id,
+            created_at=patient.created_at,
+            gender=patient.gender,
+            age=patient.age,
+            weight=patient.weight,
+            height=patient.height
+        ),
+        doses=[
+            PrescriptionDoseResponse(
+                id=dose_id,
+                medication_id=med_data["medication"].id,
+                medication_name=med_data["medication"].name,
+                quantity_per_dose=med_data["quantity_per_dose"],
+                total_quantity=med_data["total_quantity"],
+                dose_time="regular",
+                unit_price=med_data["medication"].unit_price,
+                price=med_data["total_quantity"] * med_data["medication"].unit_price
+            )
+            for dose_id, med_data in zip(dose_ids, main_medicine_data)
+        ],
+        supportings=[
+            PrescriptionSupportingResponse(
+                id=supporting_id,
+                medication_id=med_data["medication"].id,
+                medication_name=med_data["medication"].name,
+                quantity_total=med_data["total_quantity"],
+                unit_price=med_data["medication"].unit_price,
+                price=med_data["total_quantity"] * med_data["medication"].unit_price
+            )
+            for supporting_id, med_data in zip(supporting_ids, supporting_medicine_data)
+        ]
+    )
+
+
+def _cache_prescription_detail(prescription: PrescriptionDetailResponse) -> None:
+    """
+    Store a just-committed prescription's detail body in the cache, so the
+    receipt screen's first fetch is a hit and is not sent to a lagging replica.
+    
+    Failures are logged, not raised: the prescription is already committed.
+    
+    Args:
+        prescription: Detail from _confirmed_prescription_detail
+    """
+    try:
+        prescription_detail_cache.set(prescription.id, prescription.model_dump_json().encode("utf-8"))
+    except Exception as e:
+        prescription_detail_cache.invalidate(prescription.id)
+        logger.warning("Could not cache prescription %s: %s", prescription.id, e)
+
+
+@router.get("/prescriptions", response_model=PrescriptionListResponse)
+async def list_prescriptions(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    patient_id: Optional[int] = None,
+    diagnosis: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    List prescriptions, newest first, one page at a time.
+    
+    Pages are fetched by keyset on (created_at, id), so a page costs the same
+    however deep into the history it is.
+    
+    Args:
+        cursor: next_cursor of the previous page; omit for the first page
+        limit: Page size
+        status: Only prescriptions with this status
+        patient_id: Only prescriptions of this patient
+        diagnosis: Only prescriptions whose diagnosis contains this text (case-insensitive)
+        created_from: Only prescriptions created at or after this time
+        created_to: Only prescriptions created before this time
+    """
+    try:
+        query = select(Prescription)
+        
+        if status:
+            query = query.filter(Prescription.status == status)
+        if patient_id is not None:
+            query = query.filter(Prescription.patient_id == patient_id)
+        if diagnosis:
+            # ILIKE (rather than lower() LIKE) so the trigram index on diagnosis applies
+            pattern = diagnosis.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(Prescription.diagnosis.ilike(f"%{pattern}%", escape="\\"))
+        if created_from:
+            query = query.filter(Prescription.created_at >= created_from)
+        if created_to:
+            query = query.filter(Prescription.created_at < created_to)
+        
+        query = keyset_page(query, Prescription.created_at, Prescription.id, cursor, limit)
+        prescriptions, next_cursor = split_page((await db.scalars(query)).all(), limit)
+        
+        return PrescriptionListResponse(items=prescriptions, next_cursor=next_cursor)
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching prescriptions: {str(e)}"
+        )
+
+
 @router.post("/prescriptions")
 async def create_prescription():
     """Create a new prescription."""
     return {"message": "Create prescription endpoint - to be implemented"}
 
 
-@router.get("/prescriptions/{prescription_id}")
+# Declared before /prescriptions/{prescription_id} so "export" is not parsed as an ID
+@router.get("/prescriptions/export")
+async def export_prescription_history(
+    format: str = Query(default="ndjson", pattern="^(" + "|".join(EXPORT_FORMATS) + ")$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    gzip: bool = False
+):
+    """
+    Export prescriptions with their line items for a date range.
+    
+    The export is streamed from a server-side cursor in constant memory.
+    
+    Args:
+        format: "ndjson" (one document per prescription) or "csv" (one row per line item)
+        created_from: Only prescriptions created at or after this time
+        created_to: Only prescriptions created before this time
+        gzip: Return a .gz file compressed on the fly
+    """
+    filename = f"prescriptions.{format}" + (".gz" if gzip else "")
+    if gzip:
+        media_type = "application/gzip"
+    elif format == "csv":
+        media_type = "text/csv; charset=utf-8"
+    else:
+        media_type = "application/x-ndjson"
+    
+    # A sync iterator is consumed in the threadpool, so the cursor reads do not block the event loop
+    return StreamingResponse(
+        export_prescriptions(format, created_from, created_to, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/prescriptions/{prescription_id}", response_model=PrescriptionDetailResponse)
 async def get_prescription(
     prescription_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get a specific prescription by ID."""
+    """
+    Get a specific prescription by ID, with patient and medicine lines.
+    
+    Read from the replica; a prescription confirmed moments ago that has not
+    been replicated yet is read from the primary instead.
+    """
     try:
-        prescription = db.query(Prescription).filter(
-            Prescription.id == prescription_id
-        ).first()
-        
-        if not prescription:
-            raise HTTPException(
-                status_code=404,
-                detail="Prescription not found"
-            )
+        body = prescription_detail_cache.get(prescription_id)
+        trace.get_current_span().set_attribute("cache.hit", body is not None)
+        if body is None:
+            prescription = await _load_prescription_detail(db, prescription_id)
+            
+            if not prescription and has_replica():
+                async with AsyncSessionLocal() as primary_db:
+                    prescription = await _load_prescription_detail(primary_db, prescription_id)
+            
+            if not prescription:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Prescription not found"
+                )
+            
+            body = prescription.model_dump_json().encode("utf-8")
+            prescription_detail_cache.set(prescription_id, body)
         
-        return prescription
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -66,15 +577,43 @@ async def get_prescription(
 @router.post("/confirm_prescription", response_model=ConfirmPrescriptionResponse)
 async def confirm_prescription(
     request: ConfirmPrescriptionRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Confirm and create a prescription based on AI recommendations.
     
     Input: Patient data, medication recommendations, dosage info
     Output: Prescription ID, total price, detailed breakdown
+    
+    With an Idempotency-Key header, a retry of the same request returns the
+    stored response instead of creating another prescription.
     """
     try:
+        if idempotency_key:
+            request_hash = request_fingerprint(request)
+            try:
+                # Completed retries are answered from one primary-key lookup
+                stored = await db.run_sync(get_stored_response, idempotency_key, request_hash)
+                if stored is None:
+                    # In-flight duplicates wait here for the first request to finish
+                    await db.run_sync(lock_key, idempotency_key)
+                    stored = await db.run_sync(get_stored_response, idempotency_key, request_hash)
+            except IdempotencyKeyConflict as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            
+            trace.get_current_span().set_attribute("idempotency.replayed", stored is not None)
+            if stored is not None:
+                await db.rollback()
+                response.headers["Idempotent-Replayed"] = "true"
+                audit_logger.log(
+                    SOURCE_CONFIRMATION,
+                    "Idempotent retry answered from stored response",
+                    prescription_id=stored.get("prescription_id")
+                )
+                return ConfirmPrescriptionResponse(**stored)
+        
         # Create or get patient
         patient = Patient(
             gender=request.patient_data.gender,
@@ -83,101 +622,16 @@ async def confirm_prescription(
             height=request.patient_data.height
         )
         db.add(patient)
-        db.flush()
-        
-        # Calculate total price and prepare items
-        total_price = 0
-        prescription_items = []
-        
-        # Process main medicines
-        main_medicine_total_quantities = []
-        for med_info in request.main_medicines:
-            # First try exact match
-            medication = db.query(Medication).filter(
-                Medication.name == med_info["name"]
-            ).first()
-            
-            if not medication and "(" in med_info["name"] and ")" in med_info["name"]:
-                clean_name = med_info["name"].split("(")[0].strip()
-                medication = db.query(Medication).filter(
-                    Medication.name == clean_name
-                ).first()
-            
-            if not medication:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Medication not found: {med_info['name']}"
-                )
-            
-            # Calculate total quantity needed
-            quantity_per_dose = med_info["quantity_per_dose"]
-            total_quantity = quantity_per_dose * request.doses_per_day * request.total_days
-            
-            # Check stock
-            if medication.stock < total_quantity:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Insufficient stock for {medication.name}. Available: {medication.stock}, Required: {total_quantity}"
-                )
-            
-            item_price = total_quantity * medication.unit_price
-            total_price += item_price
-            
-            prescription_items.append(PrescriptionItem(
-                name=medication.name,
-                total_quantity=total_quantity,
-                price=item_price
-            ))
-            
-            main_medicine_total_quantities.append({
-                "medication": medication,
-                "quantity_per_dose": quantity_per_dose,
-                "total_quantity": total_quantity
-            })
-        
-        # Process supporting medicines
-        supporting_medicine_data = []
-        for med_info in request.supporting_medicines:
-            # First try exact match
-            medication = db.query(Medication).filter(
-                Medication.name == med_info["name"]
-            ).first()
-            
-            # If not found, try to extract medication name (remove active ingredient part)
-            if not medication and "(" in med_info["name"] and ")" in med_info["name"]:
-                clean_name = med_info["name"].split("(")[0].strip()
-                medication = db.query(Medication).filter(
-                    Medication.name == clean_name
-                ).first()
-            
-            if not medication:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Supporting medication not found: {med_info['name']}"
-                )
-            
-            total_quantity = med_info.get("quantity_total", med_info.get("quantity_per_day", 1))
-            
-            # Check stock
-            if medication.stock < total_quantity:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Insufficient stock for {medication.name}. Available: {medication.stock}, Required: {total_quantity}"
-                )
-            
-            item_price = total_quantity * medication.unit_price
-            total_price += item_price
-            
-            prescription_items.append(PrescriptionItem(
-                name=medication.name,
-                total_quantity=total_quantity,
-                price=item_price
-            ))
-            
-            supporting_medicine_data.append({
-                "medication": medication,
-                "total_quantity": total_quantity
-            })
+        await db.flush()
+        
+        with tracer.start_as_current_span("confirm.prepare_order") as span:
+            main_medicine_total_quantities, supporting_medicine_data, prescription_items, total_price = await _prepare_order(
+                db,
+                request,
+                # Held units are not counted as available, so a stale pre-check would reject our own hold
+                check_stock=request.reservation_id is None
+            )
+            span.set_attribute("order.items", len(prescription_items))
         
         # Create prescription record
         prescription = Prescription(
@@ -189,38 +643,57 @@ async def confirm_prescription(
             ai_recommendation=request.ai_recommendation
         )
         db.add(prescription)
-        db.flush()
+        await db.flush()
         
-        # Create prescription dose records (main medicines)
-        for med_data in main_medicine_total_quantities:
-            dose_record = PrescriptionDose(
-                prescription_id=prescription.id,
-                medication_id=med_data["medication"].id,
-                quantity_per_dose=med_data["quantity_per_dose"],
-                dose_time="regular"  # Could be enhanced with specific times
-            )
-            db.add(dose_record)
+        # Create prescription dose records (main medicines) in one bulk insert;
+        # the returned IDs complete the detail cached after the commit
+        dose_ids = []
+        if main_medicine_total_quantities:
+            dose_ids = (await db.scalars(
+                insert(PrescriptionDose).returning(PrescriptionDose.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "prescription_id": prescription.id,
+                        "medication_id": med_data["medication"].id,
+                        "quantity_per_dose": med_data["quantity_per_dose"],
+                        "dose_time": "regular"  # Could be enhanced with specific times
+                    }
+                    for med_data in main_medicine_total_quantities
+                ]
+            )).all()
         
-        # Create prescription supporting records
-        for med_data in supporting_medicine_data:
-            supporting_record = PrescriptionSupporting(
-                prescription_id=prescription.id,
-                medication_id=med_data["medication"].id,
-                quantity_total=med_data["total_quantity"]
-            )
-            db.add(supporting_record)
-        
-        # Update medication stock
-        for med_data in main_medicine_total_quantities:
-            med_data["medication"].stock -= med_data["total_quantity"]
+        # Create prescription supporting records in one bulk insert
+        supporting_ids = []
+        if supporting_medicine_data:
+            supporting_ids = (await db.scalars(
+                insert(PrescriptionSupporting).returning(PrescriptionSupporting.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "prescription_id": prescription.id,
+                        "medication_id": med_data["medication"].id,
+                        "quantity_total": med_data["total_quantity"]
+                    }
+                    for med_data in supporting_medicine_data
+                ]
+            )).all()
         
-        for med_data in supporting_medicine_data:
-            med_data["medication"].stock -= med_data["total_quantity"]
+        # Check and decrement stock atomically (consuming the hold, if any), as late
+        # as possible so row locks are held only until the commit right after
+        all_medicine_data = main_medicine_total_quantities + supporting_medicine_data
+        quantities = _stock_quantities(all_medicine_data)
+        try:
+            with tracer.start_as_current_span("confirm.decrement_stock") as span:
+                span.set_attribute("stock.medications", len(quantities))
+                span.set_attribute("stock.reserved", request.reservation_id is not None)
+                available = await db.run_sync(decrement_stock, quantities, request.reservation_id)
+        except InsufficientStockError as e:
+            raise _insufficient_stock_error(e, all_medicine_data)
         
-        db.commit()
+        # Keep the consumption rollup in step with stock, in the same transaction
+        await db.run_sync(record_consumption, quantities)
         
         # Prepare response
-        response = ConfirmPrescriptionResponse(
+        confirmation = ConfirmPrescriptionResponse(
             prescription_id=prescription.id,
             total_price=total_price,
             diagnosis=request.diagnosis or "Chẩn đoán dựa trên triệu chứng được phân tích.",
@@ -235,14 +708,113 @@ async def confirm_prescription(
             items=prescription_items
         )
         
-        return response
+        # Stored in the same transaction, so a retry never sees a key without its prescription
+        if idempotency_key:
+            await db.run_sync(store_response, idempotency_key, request_hash, confirmation, prescription.id)
         
-    except HTTPException:
-        db.rollback()
+        await db.commit()
+        vector_store_manager.update_stock_levels(available)
+        audit_stock_decrement(quantities, available, prescription.id, request.reservation_id)
+        _cache_prescription_detail(_confirmed_prescription_detail(
+            prescription,
+            patient,
+            main_medicine_total_quantities,
+            supporting_medicine_data,
+            dose_ids,
+            supporting_ids
+        ))
+        audit_logger.log(
+            SOURCE_CONFIRMATION,
+            f"Prescription confirmed: {len(prescription_items)} items, total {total_price}",
+            "success",
+            prescription_id=prescription.id
+        )
+        
+        return confirmation
+        
+    except HTTPException as e:
+        await db.rollback()
+        # Logged without a prescription ID: the prescription was rolled back
+        audit_logger.log(SOURCE_CONFIRMATION, f"Confirmation rejected ({e.status_code}): {e.detail}", "warning")
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error confirming prescription: {str(e)}"
         )
+
+
+@router.post("/reservations", response_model=StockReservationResponse)
+async def create_reservation(
+    request: MedicationOrderRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Hold stock for a recommendation while the patient reviews it.
+    
+    Input: Recommended medicines and dosage (as returned by /analyze_input)
+    Output: Reservation ID to pass to /confirm_prescription, expiry time and pricing
+    """
+    try:
+        main_medicine_data, supporting_medicine_data, prescription_items, total_price = await _prepare_order(db, request)
+        
+        all_medicine_data = main_medicine_data + supporting_medicine_data
+        try:
+            reservation_id, expires_at, available = await db.run_sync(
+                reserve_stock,
+                _stock_quantities(all_medicine_data),
+                settings.reservation_ttl_seconds
+            )
+        except InsufficientStockError as e:
+            raise _insufficient_stock_error(e, all_medicine_data)
+        
+        await db.commit()
+        vector_store_manager.update_stock_levels(available)
+        
+        return StockReservationResponse(
+            reservation_id=reservation_id,
+            expires_at=expires_at,
+            total_price=total_price,
+            items=prescription_items
+        )
+        
+    except HTTPException as e:
+        await db.rollback()
+        audit_logger.log(SOURCE_RESERVATION, f"Reservation rejected ({e.status_code}): {e.detail}", "warning")
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reserving stock: {str(e)}"
+        )
+
+
+@router.delete("/reservations/{reservation_id}")
+async def delete_reservation(
+    reservation_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Release a stock reservation before it expires."""
+    try:
+        available = await db.run_sync(cancel_reservation, reservation_id)
+        await db.commit()
+        
+        if not available:
+            raise HTTPException(
+                status_code=404,
+                detail="Reservation not found"
+            )
+        
+        vector_store_manager.update_stock_levels(available)
+        return {"reservation_id": reservation_id, "released": True}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error releasing reservation: {str(e)}"
+        )
@@ -4,7 +4,7 @@ Vector Store API endpoints for managing medical knowledge embeddings.
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
-from app.database.session import get_db
+from app.database.session import get_read_db
 from app.services.vector_store_manager import vector_store_manager
 from pydantic import BaseModel
 from typing import List, Dict, Any
@@ -53,7 +53,7 @@ async def get_vector_store_status():
 @router.post("/initialize", response_model=VectorStoreResponse)
 async def initialize_vector_stores(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Initialize vector stores from database."""
     try:
@@ -75,7 +75,7 @@ async def initialize_vector_stores(
 @router.post("/rebuild", response_model=VectorStoreResponse)
 async def rebuild_vector_stores(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Rebuild vector stores from current database data."""
     try:
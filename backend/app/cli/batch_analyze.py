@@ -0,0 +1,222 @@
+"""
+Bulk offline analysis runner for evaluation datasets.
+
+Streams JSONL cases through AIService.analyze_symptoms_with_status and appends JSONL results.
+Each input line is a PatientAnalysisRequest plus an "id" field. Cases with a
+successful result in the output file are skipped, so an interrupted run can be
+resumed, and failed cases retried, by re-running the same command. Input lines
+that are not valid JSON objects are reported and counted as failures.
+
+Usage:
+    python -m app.cli.batch_analyze --input cases.jsonl --output results.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+from app.core.config import settings
+from app.schemas.ai_response import PatientAnalysisRequest
+from app.services.admission_controller import AdmissionController
+from app.services.ai_service import ai_service
+from app.services.vector_store_manager import vector_store_manager
+
+
+BATCH_KIOSK_ID = "batch-runner"
+
+
+def load_completed_ids(output_path: Path) -> Set[str]:
+    """Collect ids of cases with a successful result in the output file (failed ones are retried)."""
+    completed = set()
+    if not output_path.exists():
+        return completed
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record["ok"]:
+                    completed.add(str(record["id"]))
+            except (ValueError, KeyError, TypeError):
+                # Partially written last line from an interrupted run
+                continue
+
+    return completed
+
+
+def read_case_chunks(
+    input_path: Path,
+    completed: Set[str],
+    chunk_size: int,
+    counts: Dict[str, int]
+) -> Iterator[List[Dict]]:
+    """
+    Stream pending cases from the input file in chunks.
+
+    Args:
+        input_path: JSONL file of analysis cases
+        completed: Ids of cases to skip
+        chunk_size: Cases per chunk
+        counts: Updated with the number of "skipped" cases and "invalid" lines
+    """
+    chunk = []
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                case = json.loads(line)
+            except ValueError as e:
+                case, error = None, str(e)
+            else:
+                error = "not a JSON object"
+            if not isinstance(case, dict):
+                counts["invalid"] += 1
+                print(f"Skipping invalid input line {line_number}: {error}", file=sys.stderr)
+                continue
+
+            case_id = str(case.get("id", line_number))
+            if case_id in completed:
+                counts["skipped"] += 1
+                continue
+
+            case["id"] = case_id
+            chunk.append(case)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+    if chunk:
+        yield chunk
+
+
+async def analyze_case(
+    case: Dict,
+    vector_context: str,
+    semaphore: asyncio.Semaphore,
+    admission_controller: AdmissionController
+) -> Dict:
+    """Run one case through the recommender and build its result record."""
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            request = PatientAnalysisRequest(**{k: v for k, v in case.items() if k != "id"})
+            response, fallback = await ai_service.analyze_symptoms_with_status(
+                symptoms=request.symptoms,
+                gender=request.gender,
+                age=request.age,
+                height=request.height,
+                weight=request.weight,
+                allergies=request.allergies,
+                underlying_conditions=request.underlying_conditions,
+                current_medications=request.current_medications,
+                kiosk_id=BATCH_KIOSK_ID,
+                vector_context=vector_context,
+                admission_controller=admission_controller
+            )
+            return {
+                "id": case["id"],
+                "ok": True,
+                "fallback": fallback,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "result": response.model_dump()
+            }
+        except Exception as e:
+            return {
+                "id": case["id"],
+                "ok": False,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": str(e)
+            }
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def print_summary(records: List[Dict], counts: Dict[str, int], elapsed: float) -> None:
+    """Print throughput and latency summary for the run."""
+    latencies = [record["latency_ms"] for record in records]
+    succeeded = sum(1 for record in records if record["ok"])
+    fallbacks = sum(1 for record in records if record.get("fallback"))
+
+    print("\n=== Batch analysis summary ===")
+    print(f"Processed:   {len(records)} (skipped {counts['skipped']} already completed)")
+    print(f"Succeeded:   {succeeded}")
+    print(f"Failed:      {len(records) - succeeded + counts['invalid']} ({counts['invalid']} invalid input lines)")
+    print(f"Fallbacks:   {fallbacks}")
+    print(f"Wall time:   {elapsed:.1f}s")
+    print(f"Throughput:  {len(records) / elapsed if elapsed else 0.0:.2f} cases/s")
+    print(
+        f"Latency ms:  p50={percentile(latencies, 0.50):.0f} "
+        f"p95={percentile(latencies, 0.95):.0f} "
+        f"p99={percentile(latencies, 0.99):.0f} "
+        f"max={max(latencies, default=0.0):.0f}"
+    )
+
+
+async def run(input_path: Path, output_path: Path, concurrency: int, chunk_size: int) -> None:
+    """Process all pending cases and append results to the output file."""
+    # The runner is the only client of its controller, so it may use every slot
+    admission_controller = AdmissionController(
+        max_concurrency=concurrency,
+        max_queue_size=max(chunk_size, concurrency),
+        max_queue_per_kiosk=max(chunk_size, concurrency),
+        queue_timeout=settings.llm_queue_timeout,
+        retry_after=settings.llm_retry_after_seconds
+    )
+
+    await vector_store_manager.initialize()
+
+    completed = load_completed_ids(output_path)
+    counts = {"skipped": 0, "invalid": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    records = []
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        for chunk in read_case_chunks(input_path, completed, chunk_size, counts):
+            # One batched embedding pass for the whole chunk
+            contexts = await asyncio.to_thread(
+                vector_store_manager.get_vector_contexts_for_prompts,
+                [case.get("symptoms", "") for case in chunk],
+                [case.get("allergies") or [] for case in chunk]
+            )
+
+            tasks = [
+                asyncio.create_task(analyze_case(case, context, semaphore, admission_controller))
+                for case, context in zip(chunk, contexts)
+            ]
+            for task in asyncio.as_completed(tasks):
+                record = await task
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+
+            print(f"Completed {len(records)} cases...")
+
+    print_summary(records, counts, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay JSONL cases through the medication recommender.")
+    parser.add_argument("--input", required=True, type=Path, help="JSONL file of analysis cases")
+    parser.add_argument("--output", required=True, type=Path, help="JSONL file to append results to")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent LLM calls")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Cases per batched vector search")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.input, args.output, args.concurrency, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Build the medication and symptom vector stores from the database.
+
+Run it before starting gunicorn (e.g. in the image build or a deploy step) so
+the master only has to load the saved indexes; rebuild after catalog imports.
+Without saved stores the first worker to start builds them.
+
+Usage:
+    python -m app.cli.build_vector_stores
+"""
+
+import asyncio
+import sys
+
+from app.services.vector_store_manager import vector_store_manager
+
+
+def main() -> None:
+    if not asyncio.run(vector_store_manager.rebuild_stores()):
+        print("Vector store build failed", file=sys.stderr)
+        sys.exit(1)
+    stats = vector_store_manager.get_store_stats()
+    print(f"Built vector stores for {stats['medication_count']} medications and {stats['symptom_count']} symptoms",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
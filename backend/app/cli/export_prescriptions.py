@@ -0,0 +1,42 @@
+"""
+Export prescriptions and their line items for regulatory reporting.
+
+Streams from a server-side cursor, so memory use does not depend on the date range.
+
+Usage:
+    python -m app.cli.export_prescriptions --format csv --from 2025-01-01 --to 2025-02-01 --output jan.csv.gz --gzip
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.services.export_service import EXPORT_FORMATS, export_prescriptions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export prescriptions with their line items.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", help="Output format")
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, help="Start of range (inclusive)")
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, help="End of range (exclusive)")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    args = parser.parse_args()
+
+    chunks = export_prescriptions(args.format, args.created_from, args.created_to, compress=args.gzip)
+
+    if args.output:
+        written = 0
+        with open(args.output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        print(f"Wrote {written} bytes to {args.output}", file=sys.stderr)
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
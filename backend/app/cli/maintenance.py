@@ -0,0 +1,95 @@
+"""
+Partition and archival maintenance for the history tables.
+
+Creates upcoming usage_logs partitions (and splits rows caught by the default
+partitions into monthly ones), moves prescriptions older than
+PRESCRIPTION_ARCHIVE_AFTER_MONTHS to the archive tables in batches, and detaches
+usage_logs partitions older than USAGE_LOG_RETENTION_MONTHS. Schedule it
+monthly (e.g. cron); every step is idempotent.
+
+Usage:
+    python -m app.cli.maintenance                     # all steps
+    python -m app.cli.maintenance partitions
+    python -m app.cli.maintenance archive --months 24
+    python -m app.cli.maintenance prune-logs --months 12 --drop
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.services.partition_service import (
+    add_months,
+    archive_prescriptions,
+    detach_expired_partitions,
+    month_start,
+    premake_usage_log_partitions,
+    split_default_partition,
+    PARTITIONED_TABLES
+)
+
+
+def cutoff_month(months: int) -> date:
+    """First day of the month that is months before the current one."""
+    return add_months(month_start(date.today()), -months)
+
+
+def run_partitions(db, args) -> None:
+    created = premake_usage_log_partitions(db, args.months_ahead)
+    for table in PARTITIONED_TABLES:
+        created += split_default_partition(db, table)
+    print(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}", file=sys.stderr)
+
+
+def run_archive(db, args) -> None:
+    before = datetime.combine(cutoff_month(args.archive_months), datetime.min.time())
+    total = 0
+    while True:
+        moved = archive_prescriptions(db, before, args.batch_size)
+        if not moved:
+            break
+        total += moved
+        print(f"Archived {total} prescriptions", file=sys.stderr)
+    print(f"Archived {total} prescriptions created before {before:%Y-%m-%d}", file=sys.stderr)
+
+
+def run_prune_logs(db, args) -> None:
+    before = cutoff_month(args.retention_months)
+    detached = detach_expired_partitions(db, "usage_logs", before, drop=args.drop)
+    action = "Dropped" if args.drop else "Detached"
+    print(f"{action} {len(detached)} usage_logs partitions before {before:%Y-%m}"
+          f"{': ' + ', '.join(detached) if detached else ''}", file=sys.stderr)
+
+
+STEPS = {
+    "partitions": run_partitions,
+    "archive": run_archive,
+    "prune-logs": run_prune_logs
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain history table partitions and archives.")
+    parser.add_argument("step", nargs="?", choices=[*STEPS, "all"], default="all")
+    parser.add_argument("--months-ahead", type=int, default=settings.partition_premake_months,
+                        help="usage_logs partitions to create after the current month")
+    parser.add_argument("--archive-months", type=int, default=settings.prescription_archive_after_months,
+                        help="Archive prescriptions from before this many months ago")
+    parser.add_argument("--retention-months", type=int, default=settings.usage_log_retention_months,
+                        help="Detach usage_logs partitions from before this many months ago")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size,
+                        help="Prescriptions moved per transaction")
+    parser.add_argument("--drop", action="store_true",
+                        help="Drop detached usage_logs partitions instead of keeping them as tables")
+    args = parser.parse_args()
+
+    steps = list(STEPS.values()) if args.step == "all" else [STEPS[args.step]]
+    with SessionLocal() as db:
+        for step in steps:
+            step(db, args)
+
+
+if __name__ == "__main__":
+    main()
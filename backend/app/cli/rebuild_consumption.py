@@ -0,0 +1,51 @@
+"""
+Rebuild the medication daily consumption rollup from prescription line items.
+
+Use it to backfill history before the rollup existed or to repair days. Each day
+is rebuilt in its own short transaction, so live confirmations are only held up
+for one day's recount at a time.
+
+Usage:
+    python -m app.cli.rebuild_consumption --from 2025-01-01 --to 2025-02-01
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal
+from app.services.consumption_service import rebuild_consumption_day
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the medication daily consumption rollup.")
+    parser.add_argument("--from", dest="day_from", type=date.fromisoformat,
+                        help="First day to rebuild (default: day of the oldest prescription)")
+    parser.add_argument("--to", dest="day_to", type=date.fromisoformat,
+                        help="Day after the last day to rebuild (default: tomorrow)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        day = args.day_from
+        if day is None:
+            oldest = db.scalar(text("SELECT min(created_at) FROM prescriptions"))
+            if oldest is None:
+                print("No prescriptions to roll up", file=sys.stderr)
+                return
+            day = oldest.date()
+        day_to = args.day_to or date.today() + timedelta(days=1)
+
+        days = rows = 0
+        while day < day_to:
+            rows += rebuild_consumption_day(db, day)
+            db.commit()
+            days += 1
+            day += timedelta(days=1)
+
+    print(f"Rebuilt {days} days ({rows} rollup rows)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Summarize exported traces to explain slow requests.
+
+Reads the JSON lines span files written with TRACING_EXPORTER=file, groups
+spans by trace and prints the slowest requests as span trees with durations,
+followed by per-span-name latency percentiles across all traces.
+
+Usage:
+    python -m app.cli.trace_report --dir data/traces --route /api/v1/analyze_input --top 10
+    python -m app.cli.trace_report --trace-id 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import argparse
+import json
+import statistics
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from app.core.config import settings
+
+# Span attributes shown next to each span in a tree
+SHOWN_ATTRIBUTES = (
+    "http.response.status_code", "kiosk.id", "cache.hit", "idempotency.replayed", "llm.queue_wait_seconds",
+    "search.k", "search.results", "embedding.texts", "gen_ai.usage.input_tokens", "gen_ai.usage.output_tokens",
+    "db.response.rows"
+)
+
+
+def read_spans(directory: Path) -> Iterator[dict]:
+    """Yield spans from every span file in a directory, current and rotated."""
+    for path in sorted(directory.glob("spans-*.jsonl*")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    # Partially written last line of a running worker
+                    continue
+                span["duration_ms"] = (
+                    datetime.fromisoformat(span["end_time"]) - datetime.fromisoformat(span["start_time"])
+                ).total_seconds() * 1000
+                yield span
+
+
+def group_traces(spans: Iterator[dict]) -> Dict[str, List[dict]]:
+    """Group spans by trace ID."""
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["context"]["trace_id"]].append(span)
+    return traces
+
+
+def root_span(spans: List[dict]) -> dict:
+    """The span of a trace without a parent in the trace (the request span)."""
+    span_ids = {span["context"]["span_id"] for span in spans}
+    roots = [span for span in spans if span.get("parent_id") not in span_ids]
+    return max(roots, key=lambda span: span["duration_ms"])
+
+
+def print_tree(spans: List[dict]) -> None:
+    """Print a trace as an indented span tree in start order."""
+    children = defaultdict(list)
+    for span in spans:
+        children[span.get("parent_id")].append(span)
+
+    def walk(span: dict, depth: int) -> None:
+        attributes = span.get("attributes", {})
+        shown = " ".join(f"{name}={attributes[name]}" for name in SHOWN_ATTRIBUTES if attributes.get(name) not in (None, ""))
+        error = " ERROR" if span.get("status", {}).get("status_code") == "ERROR" else ""
+        print(f"  {span['duration_ms']:>9.1f} ms  {'  ' * depth}{span['name']}{error}  {shown}".rstrip())
+        for child in sorted(children[span["context"]["span_id"]], key=lambda child: child["start_time"]):
+            walk(child, depth + 1)
+
+    walk(root_span(spans), 0)
+
+
+def print_breakdown(traces: List[List[dict]]) -> None:
+    """Print latency percentiles and share of request time per span name."""
+    durations = defaultdict(list)
+    total_request_ms = sum(root_span(spans)["duration_ms"] for spans in traces)
+    for spans in traces:
+        for span in spans:
+            durations[span["name"]].append(span["duration_ms"])
+
+    print(f"\n{'span':<48} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'% time':>7}")
+    for name, values in sorted(durations.items(), key=lambda item: sum(item[1]), reverse=True):
+        values.sort()
+        print(
+            f"{name[:48]:<48} {len(values):>7} {statistics.median(values):>9.1f} "
+            f"{values[int(len(values) * 0.95)]:>9.1f} {values[-1]:>9.1f} "
+            f"{100 * sum(values) / total_request_ms if total_request_ms else 0:>7.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the slowest traced requests and where their time went.")
+    parser.add_argument("--dir", default=settings.tracing_dir, help="Span file directory")
+    parser.add_argument("--route", help="Only requests to this route template, e.g. /api/v1/analyze_input")
+    parser.add_argument("--trace-id", help="Show a single trace (its X-Request-ID)")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest traces shown")
+    args = parser.parse_args()
+
+    traces = list(group_traces(read_spans(Path(args.dir))).values())
+    if args.trace_id:
+        traces = [spans for spans in traces if spans[0]["context"]["trace_id"] == f"0x{args.trace_id.lower()}"]
+    if args.route:
+        traces = [spans for spans in traces if root_span(spans).get("attributes", {}).get("http.route") == args.route]
+    if not traces:
+        print(f"No matching traces in {args.dir}")
+        return
+
+    traces.sort(key=lambda spans: root_span(spans)["duration_ms"], reverse=True)
+    print(f"{len(traces)} traces; slowest {min(args.top, len(traces))}:")
+    for spans in traces[:args.top]:
+        print(f"\ntrace {spans[0]['context']['trace_id'][2:]}")
+        print_tree(spans)
+
+    print_breakdown(traces)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Structured, non-blocking application logging.
+
+configure_logging() routes every logger through a QueueHandler: the calling
+code (usually the event loop) only puts the record on a bounded in-memory
+queue, and a background listener thread formats it as one JSON object per line
+and writes it to stdout. A slow or blocked stdout (a full pipe to the log
+collector) then stalls the listener instead of every request; when the queue is
+full, records are dropped and counted.
+
+RequestContextMiddleware gives each request an ID (nginx's X-Request-ID, or a
+new one) that is attached to every record logged while handling it, echoed in
+the response and, with tracing enabled, used as the trace ID.
+"""
+
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_KEY = REQUEST_ID_HEADER.lower().encode()  # As in ASGI header lists
+
+# Accepted client request IDs; anything else is replaced with a new ID
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+# Correlation fields of the request being handled, attached to every record
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+kiosk_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("kiosk_id", default=None)
+
+# LogRecord attributes that are not extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+access_logger = logging.getLogger("app.access")
+
+# Default levels of chatty libraries (LOG_LEVELS overrides them); SQLAlchemy
+# names pool loggers after the pool class, which lives in pool_metrics
+DEFAULT_LOGGER_LEVELS = {
+    "faiss.loader": "WARNING",
+    "httpx": "WARNING",
+    "sqlalchemy.pool": "WARNING",
+    "app.database.pool_metrics": "WARNING"
+}
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request ID and kiosk ID to records, in the caller's context before queueing."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.kiosk_id = kiosk_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects, including extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for name in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            value = record.__dict__[name]
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when max_size are waiting."""
+
+    def __init__(self, max_size: int):
+        super().__init__(None)  # Queue set by _start_listener
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render the traceback now, so the listener
+        # thread never touches the caller's objects; the JSON is built there.
+        # This is the root logger's only handler, so the record is not copied
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue is unbounded but much cheaper than Queue; the size check is approximate
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class _LogState:
+    """Handler and listener installed by configure_logging()."""
+
+    handler: Optional[DroppingQueueHandler] = None
+    listener: Optional[logging.handlers.QueueListener] = None
+    output: Optional[logging.Handler] = None
+
+
+_state = _LogState()
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """Parse LOG_LEVELS ("logger=LEVEL,logger=LEVEL") into a mapping."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener() -> None:
+    """Start a listener thread draining a new queue into the output handler."""
+    log_queue = queue.SimpleQueue()
+    _state.handler.queue = log_queue
+    _state.listener = logging.handlers.QueueListener(log_queue, _state.output, respect_handler_level=True)
+    _state.listener.start()
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not exist in a forked worker, and records queued
+    # before the fork belong to the parent; start over with a new queue
+    if _state.listener is not None:
+        _state.handler.dropped = 0
+        _start_listener()
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through the background queue, at the configured levels.
+
+    LOG_LEVEL sets the root level, LOG_LEVELS overrides single loggers (e.g.
+    "app.services.vector_store_service=DEBUG"), DB_ECHO logs every SQL
+    statement and LOG_FORMAT=text writes plain lines instead of JSON.
+    Calling it again replaces the previous configuration.
+    """
+    shutdown_logging()
+
+    # Records carry no caller location, thread or multiprocessing names; not
+    # collecting them saves most of the cost of creating a record
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+
+    _state.output = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "text":
+        _state.output.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        ))
+    else:
+        _state.output.setFormatter(JsonFormatter())
+
+    _state.handler = DroppingQueueHandler(settings.log_queue_size)
+    _state.handler.addFilter(RequestContextFilter())
+    _start_listener()
+
+    root = logging.getLogger()
+    root.handlers = [_state.handler]
+    root.setLevel(settings.log_level.upper())
+
+    # SQLAlchemy's echo=True would install its own synchronous stdout handler
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.db_echo else logging.WARNING)
+    # uvicorn's loggers write to their own handlers by default; send them through the queue
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    if settings.log_access:
+        # RequestContextMiddleware logs requests, with their request IDs
+        logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+    for name, level in {**DEFAULT_LOGGER_LEVELS, **_parse_levels(settings.log_levels)}.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Write the queued records and stop the listener thread."""
+    if _state.listener is not None:
+        _state.listener.stop()
+        _state.listener = None
+
+
+def get_log_stats() -> dict:
+    """
+    Get logging queue statistics.
+
+    Returns:
+        Dictionary with queued and dropped record counts
+    """
+    if _state.handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "level": logging.getLevelName(logging.getLogger().level),
+        "queued": _state.handler.queue.qsize(),
+        "queue_size": _state.handler.max_size,
+        "dropped": _state.handler.dropped
+    }
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(shutdown_logging)
+
+
+def _request_id(headers: dict) -> str:
+    """The request's valid X-Request-ID, or a new one (32 hex digits, usable as a trace ID)."""
+    request_id = headers.get(_REQUEST_ID_KEY, b"").decode("latin-1")
+    return request_id if _VALID_REQUEST_ID.match(request_id) else uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware setting the request context for logging.
+
+    Every request gets an X-Request-ID (the client's or nginx's if valid, a new
+    one otherwise) that is passed on to the app, attached to its log records
+    and returned in the response. With log_access, one access record per
+    request is logged with method, path, status and duration.
+    """
+
+    def __init__(self, app, log_access: bool = True):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            log_access: Log an access record per request
+        """
+        self.app = app
+        self.log_access = log_access
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = _request_id(headers)
+        if headers.get(_REQUEST_ID_KEY, b"").decode("latin-1") != request_id:
+            # Downstream middleware (tracing) reads the ID from the headers
+            scope = {
+                **scope,
+                "headers": [
+                    *(item for item in scope["headers"] if item[0] != _REQUEST_ID_KEY),
+                    (_REQUEST_ID_KEY, request_id.encode())
+                ]
+            }
+        request_id_token = request_id_var.set(request_id)
+        kiosk_id_token = kiosk_id_var.set(headers.get(b"x-kiosk-id", b"").decode("latin-1") or None)
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (_REQUEST_ID_KEY, request_id.encode())]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if self.log_access:
+                access_logger.info(
+                    "%s %s %d",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+                    }
+                )
+            request_id_var.reset(request_id_token)
+            kiosk_id_var.reset(kiosk_id_token)
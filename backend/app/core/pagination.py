@@ -0,0 +1,160 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are ordered newest first by (created_at, id), or alphabetically by
+(name, id) for catalog listings. The cursor is the sort key of the last row of
+a page, so the next page is an index range scan starting right after it instead
+of an OFFSET scan over every earlier row.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import Select, tuple_
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def _encode_key(key: List[Any]) -> str:
+    """Encode a JSON-serializable sort key as URL-safe base64 without padding."""
+    payload = json.dumps(key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_key(cursor: str) -> List[Any]:
+    """Decode a sort key encoded by _encode_key."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode a sort key as an opaque cursor.
+
+    Args:
+        created_at: Creation time of the last row on the page
+        row_id: ID of the last row on the page
+
+    Returns:
+        URL-safe cursor string
+    """
+    return _encode_key([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        Tuple of (created_at, id)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        created_at, row_id = _decode_key(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def keyset_page(query: Select, created_at_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """
+    Restrict a query to one page after a cursor.
+
+    Fetches one extra row so split_page can tell whether another page exists.
+
+    Args:
+        query: Filtered select over the paginated entity
+        created_at_column: Creation time column of the entity
+        id_column: Primary key column of the entity
+        cursor: Cursor of the previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        Query ordered newest first and limited to limit + 1 rows
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: Sequence[T], limit: int) -> Tuple[List[T], Optional[str]]:
+    """
+    Trim the extra row fetched by keyset_page and build the next cursor.
+
+    Args:
+        rows: Rows returned by a keyset_page query (objects with created_at and id)
+        limit: Page size
+
+    Returns:
+        Tuple of (rows of this page, cursor of the next page or None if this is the last)
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(page[-1].created_at, page[-1].id)
+
+
+def alphabetical_page(query: Select, name_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """
+    Restrict a query to one page of an alphabetical (name, id) listing.
+
+    Fetches one extra row so split_alphabetical_page can tell whether another page exists.
+
+    Args:
+        query: Filtered select that includes the name and id columns
+        name_column: Name column of the entity
+        id_column: Primary key column of the entity
+        cursor: Cursor of the previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        Query ordered by name, then id, and limited to limit + 1 rows
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    if cursor:
+        try:
+            name, row_id = _decode_key(cursor)
+            name, row_id = str(name), int(row_id)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor("Invalid pagination cursor") from e
+        query = query.filter(tuple_(name_column, id_column) > tuple_(name, row_id))
+
+    return query.order_by(name_column, id_column).limit(limit + 1)
+
+
+def split_alphabetical_page(rows: Sequence[T], limit: int) -> Tuple[List[T], Optional[str]]:
+    """
+    Trim the extra row fetched by alphabetical_page and build the next cursor.
+
+    Args:
+        rows: Rows returned by an alphabetical_page query (with name and id attributes)
+        limit: Page size
+
+    Returns:
+        Tuple of (rows of this page, cursor of the next page or None if this is the last)
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, _encode_key([page[-1].name, page[-1].id])
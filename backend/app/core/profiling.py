@@ -0,0 +1,275 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED set, ProfilingMiddleware runs the pyinstrument sampling
+profiler on requests that carry a valid X-Profile-Token header, and on a random
+PROFILING_SAMPLE_RATE share of all requests. Each profile is saved as
+speedscope JSON (flamegraph view: https://www.speedscope.app) to a bounded
+directory shared by the workers. With profiling disabled the middleware is not
+installed at all.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-ID"
+
+# Fetching profiles sends the token too; profiling those requests would evict real profiles
+UNPROFILED_PATH_PREFIX = "/api/v1/monitoring/profiles"
+
+# <id>_<method>_<path>_<status>_<duration>ms[_<kiosk>].speedscope.json; names
+# are also validated against it before a download, so they cannot escape the directory
+PROFILE_NAME = re.compile(
+    r"^(?P<id>\d{8}T\d{6}-[0-9a-f]{8})_(?P<method>[A-Z]+)_(?P<path>[A-Za-z0-9-]*)"
+    r"_(?P<status>\d{3})_(?P<duration_ms>\d+)ms(?:_(?P<kiosk>[A-Za-z0-9-]+))?\.speedscope\.json$"
+)
+
+
+def _slug(value: str, max_length: int = 60) -> str:
+    """Reduce a value to letters, digits and dashes for use in a file name."""
+    return re.sub(r"[^A-Za-z0-9]+", "-", value).strip("-")[:max_length]
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """
+    Check a profile token against PROFILING_TOKEN.
+
+    Args:
+        token: X-Profile-Token header value
+
+    Returns:
+        True if a token is configured and matches
+    """
+    if not settings.profiling_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.profiling_token.encode())
+
+
+class ProfileStore:
+    """
+    Directory of saved profiles, bounded in file count and total size.
+
+    Every worker writes to the same directory; after each save the oldest
+    profiles are removed until both limits hold again.
+    """
+
+    def __init__(self, directory: str, max_files: int, max_bytes: int):
+        """
+        Initialize the profile store.
+
+        Args:
+            directory: Directory for profile files (created on first save)
+            max_files: Maximum number of profiles kept
+            max_bytes: Maximum total size of the profiles kept
+        """
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def save(self, profile_id: str, scope: dict, status: int, duration: float, body: str) -> str:
+        """
+        Write a profile and enforce the limits.
+
+        Args:
+            profile_id: Unique ID of the profile (see new_profile_id)
+            scope: ASGI scope of the profiled request
+            status: Response status code
+            duration: Request duration in seconds
+            body: Rendered profile
+
+        Returns:
+            File name of the profile
+        """
+        headers = dict(scope.get("headers") or [])
+        kiosk = _slug(headers.get(b"x-kiosk-id", b"").decode("latin-1"), 40)
+        name = (
+            f"{profile_id}_{scope['method']}_{_slug(scope['path'])}_{status}_{int(duration * 1000)}ms"
+            f"{'_' + kiosk if kiosk else ''}.speedscope.json"
+        )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name so listings never see a partial file
+        partial = self.directory / f".{name}.tmp"
+        partial.write_text(body, encoding="utf-8")
+        os.replace(partial, self.directory / name)
+
+        self._prune()
+        return name
+
+    def _prune(self) -> None:
+        """Delete the oldest profiles beyond max_files or max_bytes."""
+        profiles = sorted(self._files(), key=lambda item: item[1].st_mtime, reverse=True)
+        kept_bytes = 0
+        for position, (path, stat) in enumerate(profiles):
+            kept_bytes += stat.st_size
+            if position >= self.max_files or kept_bytes > self.max_bytes:
+                path.unlink(missing_ok=True)
+
+    def _files(self) -> list:
+        """(path, stat) of every profile file."""
+        if not self.directory.is_dir():
+            return []
+        files = []
+        for path in self.directory.iterdir():
+            if PROFILE_NAME.match(path.name):
+                try:
+                    files.append((path, path.stat()))
+                except FileNotFoundError:
+                    continue  # Pruned by another worker
+        return files
+
+    def list(self) -> List[dict]:
+        """
+        List saved profiles, newest first.
+
+        Returns:
+            Profile dictionaries with name, request details, size and creation time
+        """
+        profiles = []
+        for path, stat in sorted(self._files(), key=lambda item: item[1].st_mtime, reverse=True):
+            fields = PROFILE_NAME.match(path.name).groupdict()
+            profiles.append({
+                "name": path.name,
+                "id": fields["id"],
+                "method": fields["method"],
+                "path_slug": fields["path"],
+                "status": int(fields["status"]),
+                "duration_ms": int(fields["duration_ms"]),
+                "kiosk_id": fields["kiosk"],
+                "size_bytes": stat.st_size,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stat.st_mtime))
+            })
+        return profiles
+
+    def path(self, name: str) -> Optional[Path]:
+        """
+        Resolve a profile name to its file.
+
+        Args:
+            name: File name as returned by list()
+
+        Returns:
+            Path of the profile, or None if the name is invalid or unknown
+        """
+        # fullmatch: "$" alone would also accept a name ending in a newline
+        if not PROFILE_NAME.fullmatch(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def get_stats(self) -> dict:
+        """
+        Get profile store usage.
+
+        Returns:
+            Dictionary with file count, total size and limits
+        """
+        files = self._files()
+        return {
+            "directory": str(self.directory),
+            "profiles": len(files),
+            "total_bytes": sum(stat.st_size for _, stat in files),
+            "max_files": self.max_files,
+            "max_bytes": self.max_bytes
+        }
+
+
+def new_profile_id() -> str:
+    """Sortable unique profile ID: UTC timestamp plus random suffix."""
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected requests end to end.
+
+    The profiler follows the request's task across awaits, so the profile
+    covers retrieval, the LLM call and database access. Work handed to a thread
+    (embedding, sync database sessions) appears as time spent awaiting it in
+    the calling frame. The profile ID is returned in the X-Profile-ID header.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float = 0.0, interval: float = 0.001):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            store: Where profiles are saved
+            sample_rate: Share of requests profiled without a token (0 to 1)
+            interval: Sampling interval in seconds
+        """
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._token_header = PROFILE_TOKEN_HEADER.lower().encode()
+
+    def _should_profile(self, scope: dict) -> bool:
+        for name, value in scope.get("headers") or []:
+            if name == self._token_header:
+                return is_authorized(value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(UNPROFILED_PATH_PREFIX)
+            or not self._should_profile(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profile_id = new_profile_id()
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), profile_id.encode())]
+                }
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - started
+            try:
+                await asyncio.to_thread(self._save, profiler, profile_id, scope, status, duration)
+            except Exception as e:
+                logger.exception("Error saving request profile: %s", e)
+
+    def _save(self, profiler, profile_id: str, scope: dict, status: int, duration: float) -> None:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self.store.save(profile_id, scope, status, duration, profiler.output(SpeedscopeRenderer()))
+
+
+# Global profile store instance
+profile_store = ProfileStore(
+    directory=settings.profiling_dir,
+    max_files=settings.profiling_max_files,
+    max_bytes=settings.profiling_max_bytes
+)
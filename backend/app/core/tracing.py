@@ -0,0 +1,255 @@
+"""
+Request tracing with OpenTelemetry.
+
+Code creates spans through the module-level tracer. Until configure_tracing()
+installs a tracer provider (TRACING_ENABLED), they are no-op spans. When
+enabled, every request becomes a trace whose ID is taken from nginx's
+X-Request-ID (or a W3C traceparent header). Spans are exported in the
+background to JSON lines files or the console, for offline analysis with
+python -m app.cli.trace_report.
+"""
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.id_generator import RandomIdGenerator
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.logging import REQUEST_ID_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Spans are created through this tracer everywhere in the app
+tracer = trace.get_tracer("medicine-vending")
+
+# Trace ID for the root span of the current request (see RequestIdGenerator)
+_request_trace_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("request_trace_id", default=None)
+
+# nginx's $request_id: 32 hex digits, exactly the size of a trace ID
+_HEX_TRACE_ID = re.compile(r"^[0-9a-fA-F]{32}$")
+
+# Longest SQL statement recorded on a span
+MAX_STATEMENT_LENGTH = 2000
+
+
+def trace_id_from_request_id(request_id: Optional[str]) -> Optional[int]:
+    """
+    Use a request ID as trace ID if it has the right form.
+
+    Args:
+        request_id: X-Request-ID header value
+
+    Returns:
+        Trace ID, or None if the value is not 32 hex digits (or all zeros)
+    """
+    if request_id and _HEX_TRACE_ID.match(request_id):
+        return int(request_id, 16) or None
+    return None
+
+
+class RequestIdGenerator(RandomIdGenerator):
+    """Root spans of a request take the trace ID derived from its X-Request-ID."""
+
+    def generate_trace_id(self) -> int:
+        return _request_trace_id.get() or super().generate_trace_id()
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Export finished spans as one JSON object per line.
+
+    Each process appends to its own file (spans-<pid>.jsonl), so workers never
+    interleave writes. When a file exceeds max_bytes it is rotated to .1,
+    replacing the previous rotation.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Initialize the exporter.
+
+        Args:
+            directory: Directory for span files (created if missing)
+            max_bytes: Size at which a span file is rotated
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def _open(self):
+        # A forked worker must not keep writing to its parent's file
+        if self._file is None or self._pid != os.getpid():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._pid = os.getpid()
+            self._file = open(self.directory / f"spans-{self._pid}.jsonl", "a", encoding="utf-8")
+        return self._file
+
+    def export(self, spans: Sequence) -> SpanExportResult:
+        try:
+            with self._lock:
+                handle = self._open()
+                for span in spans:
+                    handle.write(span.to_json(indent=None) + "\n")
+                handle.flush()
+                if handle.tell() > self.max_bytes:
+                    handle.close()
+                    path = Path(handle.name)
+                    os.replace(path, path.with_suffix(".jsonl.1"))
+                    self._file = None
+            return SpanExportResult.SUCCESS
+        except OSError as e:
+            logger.error("Error exporting spans: %s", e)
+            return SpanExportResult.FAILURE
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def configure_tracing() -> bool:
+    """
+    Install the OpenTelemetry SDK with the configured exporter and sampling.
+
+    Returns:
+        True if tracing was enabled
+    """
+    if not settings.tracing_enabled:
+        return False
+
+    if settings.tracing_exporter == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        exporter = JsonLinesSpanExporter(settings.tracing_dir, settings.tracing_max_file_bytes)
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "medicine-vending-backend", "service.version": settings.version}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_rate)),
+        id_generator=RequestIdGenerator()
+    )
+    # Spans are serialized and written on the processor's thread, off the event loop
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop span export."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Record a span for every SQL statement run on an engine.
+
+    Args:
+        engine: Sync Engine (for an AsyncEngine pass its sync_engine)
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        context._trace_span = tracer.start_span(
+            f"db.{operation.lower()}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": "postgresql",
+                "db.operation.name": operation,
+                "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+                "db.executemany": executemany
+            }
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.response.rows", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _fail_statement(exception_context):
+        span = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the server span of each request.
+
+    The trace continues a W3C traceparent if the client sent one; otherwise its
+    ID is the X-Request-ID set by RequestContextMiddleware (nginx's, or a new
+    one), so nginx access log lines, application logs and traces share one ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers") or []}
+        request_id = headers.get(REQUEST_ID_HEADER.lower())
+        parent = propagate.extract(headers) if "traceparent" in headers else None
+        trace_id_token = _request_trace_id.set(trace_id_from_request_id(request_id))
+
+        status_code = 500
+        started = time.perf_counter()
+        span = tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            context=parent,
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+                "http.request_id": request_id or "",
+                "kiosk.id": headers.get("x-kiosk-id", "")
+            }
+        )
+        _request_trace_id.reset(trace_id_token)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            with trace.use_span(span, end_on_exit=False, record_exception=True, set_status_on_exception=True):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            # FastAPI stores the matched route in the scope; name the span by its template
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.update_name(f"{scope['method']} {route.path}")
+                span.set_attribute("http.route", route.path)
+            span.set_attribute("http.response.status_code", status_code)
+            span.set_attribute("http.server.duration_ms", round((time.perf_counter() - started) * 1000, 3))
+            if status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            span.end()
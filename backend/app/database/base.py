@@ -6,6 +6,10 @@ from app.database.connection import Base
 from app.models.patient import Patient
 from app.models.medication import Medication, Symptom
 from app.models.prescription import Prescription, PrescriptionDose, PrescriptionSupporting
+from app.models.reservation import StockReservation
+from app.models.idempotency import IdempotencyKey
+from app.models.consumption import MedicationDailyConsumption
+from app.models.archive import PrescriptionArchive, PrescriptionDoseArchive, PrescriptionSupportingArchive
 
 __all__ = [
     "Base",
@@ -14,5 +18,11 @@ __all__ = [
     "Symptom",
     "Prescription",
     "PrescriptionDose", 
-    "PrescriptionSupporting"
+    "PrescriptionSupporting",
+    "StockReservation",
+    "IdempotencyKey",
+    "MedicationDailyConsumption",
+    "PrescriptionArchive",
+    "PrescriptionDoseArchive",
+    "PrescriptionSupportingArchive"
 ]
@@ -1,16 +1,120 @@
+import uuid
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
+from app.database.pool_metrics import PoolMetrics, pool_metrics, timed_pool_class
 
-# Create database engine
+
+def _pool_options(base_pool_class, metrics) -> dict:
+    """
+    Engine keyword arguments for the configured pooling mode.
+
+    In PgBouncer mode PgBouncer does the pooling, so connections are not kept
+    in the application and pool sizing options do not apply.
+    """
+    if settings.db_pgbouncer_mode:
+        return {"poolclass": NullPool}
+
+    return {
+        "poolclass": timed_pool_class(base_pool_class, metrics),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping
+    }
+
+
+def _sync_connect_args() -> dict:
+    """psycopg2 connection arguments."""
+    # PgBouncer rejects unknown startup parameters; set statement_timeout on the role instead
+    if settings.db_statement_timeout_ms and not settings.db_pgbouncer_mode:
+        return {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return {}
+
+
+def _async_connect_args() -> dict:
+    """asyncpg connection arguments."""
+    connect_args = {}
+    if settings.db_statement_timeout_ms and not settings.db_pgbouncer_mode:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+    if settings.db_pgbouncer_mode:
+        # Prepared statements do not survive transaction pooling: disable asyncpg's
+        # cache and use unique names so server connections never see a collision
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return connect_args
+
+
+def _async_database_url(database_url: str):
+    """A database URL with the asyncpg driver."""
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    if settings.db_pgbouncer_mode:
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    return url
+
+
+# Create database engine (used by the vector store, background jobs and CLIs)
 engine = create_engine(
     settings.database_url,
-    echo=settings.debug  # Log SQL queries in debug mode
+    connect_args=_sync_connect_args(),
+    **_pool_options(QueuePool, pool_metrics["sync"])
 )
+pool_metrics["sync"].attach(engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async database engine (used by API endpoints, so queries do not block the event loop)
+async_engine = create_async_engine(
+    _async_database_url(settings.database_url),
+    connect_args=_async_connect_args(),
+    **_pool_options(AsyncAdaptedQueuePool, pool_metrics["async"])
+)
+pool_metrics["async"].attach(async_engine.sync_engine)
+
+# Create AsyncSessionLocal class. Objects stay usable after commit, since lazy
+# attribute refreshes are not possible outside an awaited call.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read replica engines (used by GET endpoints, exports and bulk index builds).
+# Without DATABASE_REPLICA_URL they are the primary engines, so callers need not
+# care whether a replica exists.
+if settings.database_replica_url:
+    pool_metrics["replica"] = PoolMetrics("replica")
+    pool_metrics["async_replica"] = PoolMetrics("async_replica")
+    
+    replica_engine = create_engine(
+        settings.database_replica_url,
+        connect_args=_sync_connect_args(),
+        **_pool_options(QueuePool, pool_metrics["replica"])
+    )
+    pool_metrics["replica"].attach(replica_engine)
+    
+    async_replica_engine = create_async_engine(
+        _async_database_url(settings.database_replica_url),
+        connect_args=_async_connect_args(),
+        **_pool_options(AsyncAdaptedQueuePool, pool_metrics["async_replica"])
+    )
+    pool_metrics["async_replica"].attach(async_replica_engine.sync_engine)
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_replica_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class for models
 Base = declarative_base()
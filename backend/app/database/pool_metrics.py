@@ -0,0 +1,179 @@
+"""
+Connection pool metrics.
+Tracks checkouts, time spent waiting for a connection of a full pool and saturation for each engine's pool.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolMetrics:
+    """Counters and wait-time samples for one connection pool."""
+
+    def __init__(self, name: str):
+        """
+        Initialize pool metrics.
+
+        Args:
+            name: Label of the engine the pool belongs to
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._engine: Engine = None
+
+        self._checkouts = 0
+        self._checked_out = 0
+        self._peak_checked_out = 0
+        self._connects = 0
+        self._invalidations = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._blocked = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Listen to pool events of an engine.
+
+        Args:
+            engine: Engine whose pool should be tracked (the sync engine of an async engine)
+        """
+        self._engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self._checkouts += 1
+            self._checked_out += 1
+            self._peak_checked_out = max(self._peak_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._checked_out = max(0, self._checked_out - 1)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self._invalidations += 1
+
+    def record_wait(self, waited: float, blocked: bool = True, timed_out: bool = False) -> None:
+        """
+        Record how long a checkout waited for a free connection.
+
+        Args:
+            waited: Seconds spent blocked on the full pool (0 if it was not full)
+            blocked: Whether the pool was full, so the checkout had to wait for a checkin
+            timed_out: Whether the wait ended with a pool timeout
+        """
+        with self._lock:
+            self._waits += 1
+            if blocked:
+                self._blocked += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._recent_waits.append(waited)
+            if timed_out:
+                self._timeouts += 1
+
+    def get_stats(self) -> dict:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary with pool configuration, usage and wait-time statistics
+        """
+        pool = self._engine.pool if self._engine is not None else None
+        size = pool.size() if isinstance(pool, QueuePool) else None
+        max_overflow = pool._max_overflow if isinstance(pool, QueuePool) else None
+        capacity = size + max_overflow if size is not None else None
+
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            checked_out = self._checked_out
+
+            def percentile(p: float) -> float:
+                if not recent:
+                    return 0.0
+                return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "size": size,
+                "max_overflow": max_overflow,
+                "checked_out": checked_out,
+                "idle": pool.checkedin() if isinstance(pool, QueuePool) else None,
+                "peak_checked_out": self._peak_checked_out,
+                "saturation": checked_out / capacity if capacity else None,
+                "checkouts": self._checkouts,
+                "connects": self._connects,
+                "invalidations": self._invalidations,
+                "timeouts": self._timeouts,
+                "blocked_checkouts": self._blocked,
+                "wait_seconds": {
+                    "avg": self._wait_total / self._waits if self._waits else 0.0,
+                    "max": self._wait_max,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99)
+                }
+            }
+
+
+def timed_pool_class(base: Type[QueuePool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    Build a pool class that records checkout wait time.
+
+    Only checkouts made while all size + overflow connections are checked out
+    are timed: the others get an idle connection or open a new one without
+    waiting, and are recorded as zero waits so that connect time (including a
+    slow or unreachable database) does not show up as pool contention.
+
+    The metrics are bound to the class rather than the instance, so they survive
+    engine.dispose(), which replaces the pool with a new instance of the same class.
+
+    Args:
+        base: Queue pool class to extend (QueuePool or AsyncAdaptedQueuePool)
+        metrics: Metrics to record into
+
+    Returns:
+        Pool class to pass as poolclass
+    """
+
+    def _do_get(self):
+        # The same test QueuePool._do_get uses to decide whether to block
+        if not (self._max_overflow > -1 and self._overflow >= self._max_overflow):
+            connection = base._do_get(self)
+            metrics.record_wait(0.0, blocked=False)
+            return connection
+
+        started = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+# Global pool metrics per engine
+pool_metrics: Dict[str, PoolMetrics] = {
+    "sync": PoolMetrics("sync"),
+    "async": PoolMetrics("async")
+}
@@ -1,6 +1,14 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database.connection import SessionLocal
+from app.database.connection import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    async_engine,
+    async_replica_engine
+)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -13,3 +21,39 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    Dependency function that yields read-only database sessions.
+    Served by the read replica when one is configured, otherwise by the primary.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function that yields async database sessions.
+    Used by endpoints so database round trips do not block the event loop.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function that yields async read-only database sessions.
+    Used by GET endpoints; served by the read replica when one is configured.
+    Writes must go through get_async_db.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def has_replica() -> bool:
+    """Check if reads are routed to a separate replica."""
+    return async_replica_engine is not async_engine
@@ -1,36 +1,118 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api.v1 import patients, medications, prescriptions, ai_analysis, vector_store
+from app.core.logging import RequestContextMiddleware, configure_logging, shutdown_logging
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.core.tracing import TracingMiddleware, configure_tracing, instrument_engine, shutdown_tracing
+from app.database.connection import SessionLocal, async_engine, async_replica_engine, engine, replica_engine
+from app.api.v1 import patients, medications, prescriptions, ai_analysis, vector_store, monitoring, analytics, autocomplete
+from app.services.ai_service import ai_service
+from app.services.audit_logger import audit_logger
+from app.services.autocomplete_service import autocomplete_index
+from app.services.catalog_service import catalog_cache
+from app.services.inventory_service import run_reservation_sweeper
+from app.services.partition_service import premake_usage_log_partitions
 from app.services.vector_store_manager import vector_store_manager
 
+# Structured JSON logging through a background queue (app/core/logging.py)
+configure_logging()
+logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager for startup and shutdown events."""
-    # Startup: Initialize vector stores
-    print("Initializing vector stores on startup...")
+
+def premake_partitions() -> list:
+    """Create upcoming usage_logs partitions (idempotent, safe from every worker)."""
+    with SessionLocal() as db:
+        return premake_usage_log_partitions(db)
+
+
+async def warm_up() -> None:
+    """Build the autocomplete index and load the embedding model, vector stores and LLM pipeline in the background."""
+    try:
+        created = await asyncio.to_thread(premake_partitions)
+        if created:
+            logger.info("Created usage log partitions: %s", ", ".join(created))
+    except Exception as e:
+        logger.warning("Usage log partition creation failed: %s", e)
+    
+    try:
+        entries = await asyncio.to_thread(autocomplete_index.rebuild)
+        logger.info("Autocomplete index built with %d entries", entries)
+    except Exception as e:
+        logger.warning("Autocomplete index build failed: %s", e)
+    
+    logger.info("Initializing vector stores on startup")
     try:
         await vector_store_manager.initialize()
-        print("Vector stores initialization completed")
+        await asyncio.to_thread(vector_store_manager.vector_store.warm_up)
+        logger.info("Vector stores initialization completed")
     except Exception as e:
-        print(f"Warning: Vector store initialization failed: {e}")
+        logger.warning("Vector store initialization failed: %s", e)
+    
+    try:
+        if await asyncio.to_thread(ai_service.warm_up):
+            logger.info("LLM pipeline initialized")
+    except Exception as e:
+        logger.warning("LLM pipeline initialization failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager for startup and shutdown events."""
+    # Catalog changes announced over LISTEN/NOTIFY also refresh autocomplete;
+    # stock notifications refresh the stock levels used by vector search
+    catalog_cache.on_change(autocomplete_index.schedule_refresh)
+    catalog_cache.on_stock_change(vector_store_manager.schedule_stock_refresh)
+    
+    # Startup: warm up in the background so the server binds its port immediately;
+    # /ready reports 503 until warm-up has finished.
+    audit_logger.start()
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+    app.state.reservation_sweeper = asyncio.create_task(
+        run_reservation_sweeper(settings.reservation_sweep_interval_seconds)
+    )
+    # LISTEN needs a session-pooled connection, which PgBouncer transaction mode
+    # does not provide; catalog snapshots then expire by age instead
+    app.state.catalog_listener = None
+    if not settings.db_pgbouncer_mode:
+        app.state.catalog_listener = asyncio.create_task(catalog_cache.listen())
     
     yield
     
     # Shutdown: cleanup if needed
-    print("Application shutdown")
+    app.state.warm_up_task.cancel()
+    app.state.reservation_sweeper.cancel()
+    if app.state.catalog_listener is not None:
+        app.state.catalog_listener.cancel()
+    await audit_logger.stop()  # Flush buffered audit events before the pool closes
+    await async_engine.dispose()
+    if async_replica_engine is not async_engine:
+        await async_replica_engine.dispose()
+    shutdown_tracing()  # Export the remaining spans
+    logger.info("Application shutdown")
+    shutdown_logging()  # Write the queued records
 
 
-# Create FastAPI app with lifespan manager
+# Create FastAPI app with lifespan manager. Responses are rendered with orjson,
+# which is several times faster than the standard json module.
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
     debug=settings.debug,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Static payloads are serialized once
+ROOT_RESPONSE_BODY = ORJSONResponse({
+    "message": f"Welcome to {settings.app_name}",
+    "version": settings.version,
+    "status": "healthy"
+}).body
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -40,22 +122,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile requests on demand; when disabled the middleware is not in the stack
+if settings.profiling_enabled:
+    try:
+        import pyinstrument  # noqa: F401
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            sample_rate=settings.profiling_sample_rate,
+            interval=settings.profiling_interval_seconds
+        )
+    except ImportError:
+        logger.warning("PROFILING_ENABLED is set but pyinstrument is not installed; profiling disabled")
+
+# Trace every request and SQL statement; the server span covers the other middleware
+if configure_tracing():
+    for traced_engine in {engine, replica_engine, async_engine.sync_engine, async_replica_engine.sync_engine}:
+        instrument_engine(traced_engine)
+    app.add_middleware(TracingMiddleware)
+
+# Outermost: every request gets an X-Request-ID for its log records, trace and response
+app.add_middleware(RequestContextMiddleware, log_access=settings.log_access)
+
 # Include API routers
 app.include_router(patients.router, prefix="/api/v1", tags=["patients"])
 app.include_router(medications.router, prefix="/api/v1", tags=["medications"])
 app.include_router(prescriptions.router, prefix="/api/v1", tags=["prescriptions"])
 app.include_router(ai_analysis.router, prefix="/api/v1", tags=["ai-analysis"])
 app.include_router(vector_store.router, prefix="/api/v1/vector-store", tags=["vector-store"])
+app.include_router(monitoring.router, prefix="/api/v1/monitoring", tags=["monitoring"])
+app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
+app.include_router(autocomplete.router, prefix="/api/v1", tags=["autocomplete"])
 
 
 @app.get("/")
 async def root():
     """Health check endpoint."""
-    return {
-        "message": f"Welcome to {settings.app_name}",
-        "version": settings.version,
-        "status": "healthy"
-    }
+    return Response(content=ROOT_RESPONSE_BODY, media_type="application/json")
 
 
 @app.get("/health")
@@ -75,11 +178,32 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 only once retrieval and the LLM are usable."""
+    warm_up_task = getattr(app.state, "warm_up_task", None)
+    checks = {
+        "warm_up_complete": warm_up_task is not None and warm_up_task.done(),
+        "vector_store": vector_store_manager.is_initialized(),
+        "embedding_model": vector_store_manager.vector_store.is_model_loaded(),
+        "autocomplete": autocomplete_index.is_ready(),
+        "llm": ai_service.is_ready()
+    }
+    ready = all(checks.values())
+    
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        log_config=None,  # Keep the queue-based logging configured above
+        access_log=False  # Requests are logged by RequestContextMiddleware
     )
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, TIMESTAMP, Text, String
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class PrescriptionArchive(Base):
+    """Archived prescriptions - partitioned by month on created_at."""
+    __tablename__ = "prescriptions_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Kept from the live table
+    patient_id = Column(Integer)
+    created_at = Column(TIMESTAMP, primary_key=True)
+    doses_per_day = Column(Integer, nullable=False)
+    days = Column(Integer, nullable=False)
+    total_price = Column(Integer, nullable=False)
+    status = Column(String)
+    diagnosis = Column(Text)
+    ai_recommendation = Column(Text)
+    pharmacist_notes = Column(Text)
+    archived_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+
+class PrescriptionDoseArchive(Base):
+    """Archived prescription doses - partitioned by the prescription's created_at."""
+    __tablename__ = "prescription_doses_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Kept from the live table
+    prescription_id = Column(Integer, nullable=False, index=True)
+    medication_id = Column(Integer)
+    quantity_per_dose = Column(Integer, nullable=False)
+    dose_time = Column(String, nullable=False)
+    special_instructions = Column(Text)
+    created_at = Column(TIMESTAMP, primary_key=True)  # Of the prescription
+
+
+class PrescriptionSupportingArchive(Base):
+    """Archived supporting medications - partitioned by the prescription's created_at."""
+    __tablename__ = "prescription_supportings_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Kept from the live table
+    prescription_id = Column(Integer, nullable=False, index=True)
+    medication_id = Column(Integer)
+    quantity_total = Column(Integer, nullable=False)
+    usage_instructions = Column(Text)
+    created_at = Column(TIMESTAMP, primary_key=True)  # Of the prescription
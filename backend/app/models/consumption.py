@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer
+from app.database.connection import Base
+
+
+class MedicationDailyConsumption(Base):
+    """Daily consumption rollup - units dispensed per medication per day."""
+    __tablename__ = "medication_daily_consumption"
+
+    medication_id = Column(Integer, ForeignKey("medications.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    quantity = Column(BigInteger, nullable=False, default=0)  # Units dispensed
+    prescriptions = Column(Integer, nullable=False, default=0)  # Prescriptions containing the medication
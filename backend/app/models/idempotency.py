@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, TIMESTAMP, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class IdempotencyKey(Base):
+    """Idempotency key model - stored result of a completed confirmation."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(Text, primary_key=True)  # Idempotency-Key header value
+    request_hash = Column(Text, nullable=False)  # SHA-256 of the canonical request body
+    response = Column(JSONB, nullable=False)  # Serialized ConfirmPrescriptionResponse
+    prescription_id = Column(Integer)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False, index=True)
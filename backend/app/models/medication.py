@@ -14,6 +14,7 @@ class Medication(Base):
     unit_type = Column(Text, nullable=False)  # Đơn vị tính (viên, gói, chai...)
     unit_price = Column(Integer, nullable=False)  # Giá cho mỗi đơn vị (đồng)
     stock = Column(Integer, nullable=False, default=0)  # Số lượng còn trong kho
+    reserved = Column(Integer, nullable=False, default=0)  # Số lượng đang được giữ chỗ
     side_effects = Column(Text)  # Tác dụng phụ phổ biến
     max_per_day = Column(Integer)  # Liều tối đa/ngày
     is_supporting = Column(Boolean, default=False)  # Có phải thuốc hỗ trợ hay không
@@ -30,5 +31,10 @@ class Medication(Base):
     prescription_doses = relationship("PrescriptionDose", back_populates="medication")
     prescription_supportings = relationship("PrescriptionSupporting", back_populates="medication")
 
+    @property
+    def available_stock(self) -> int:
+        """Stock not held by an active reservation."""
+        return self.stock - (self.reserved or 0)
+
     def __repr__(self):
         return f"<Medication(id={self.id}, name='{self.name}', stock={self.stock})>"
@@ -1,17 +1,23 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Index, Integer, String, ForeignKey, Text, TIMESTAMP
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.database.connection import Base
 
 
 class Patient(Base):
     """Patient model."""
     __tablename__ = "patients"
+    __table_args__ = (
+        # Keyset pagination (newest first)
+        Index("idx_patients_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     gender = Column(String, nullable=False)
     age = Column(Integer, nullable=False)
     weight = Column(Integer, nullable=False)  # in kg
     height = Column(Integer, nullable=False)  # in cm
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
 
     # Relationships
     allergies = relationship("Allergy", back_populates="patient", cascade="all, delete-orphan")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, ForeignKey, TIMESTAMP, Text, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Index, Integer, ForeignKey, TIMESTAMP, Text, String
+from sqlalchemy.orm import foreign, relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
 
@@ -7,6 +7,19 @@ from app.database.connection import Base
 class Prescription(Base):
     """Prescription model."""
     __tablename__ = "prescriptions"
+    __table_args__ = (
+        # Keyset pagination (newest first), optionally filtered by status or patient
+        Index("idx_prescriptions_created_at_id", "created_at", "id"),
+        Index("idx_prescriptions_status_created_at_id", "status", "created_at", "id"),
+        Index("idx_prescriptions_patient_id_created_at_id", "patient_id", "created_at", "id"),
+        # Substring search on diagnosis (pg_trgm)
+        Index(
+            "idx_prescriptions_diagnosis_trgm",
+            "diagnosis",
+            postgresql_using="gin",
+            postgresql_ops={"diagnosis": "gin_trgm_ops"}
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -23,7 +36,11 @@ class Prescription(Base):
     patient = relationship("Patient", back_populates="prescriptions")
     doses = relationship("PrescriptionDose", back_populates="prescription", cascade="all, delete-orphan")
     supportings = relationship("PrescriptionSupporting", back_populates="prescription", cascade="all, delete-orphan")
-    usage_logs = relationship("UsageLog", back_populates="prescription", cascade="all, delete-orphan")
+    usage_logs = relationship(
+        "UsageLog",
+        primaryjoin="Prescription.id == foreign(UsageLog.prescription_id)",
+        viewonly=True  # No foreign key: logs outlive archived prescriptions
+    )
 
 
 class PrescriptionDose(Base):
@@ -58,15 +75,20 @@ class PrescriptionSupporting(Base):
 
 
 class UsageLog(Base):
-    """Usage logs model."""
+    """Usage logs model - partitioned by month on created_at."""
     __tablename__ = "usage_logs"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
-    id = Column(Integer, primary_key=True, index=True)
-    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    prescription_id = Column(Integer, index=True)  # Not every event belongs to a prescription
     note = Column(Text)
     generated_by = Column(Text, nullable=False)
     log_type = Column(String, default='info')
-    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+    created_at = Column(TIMESTAMP, primary_key=True, server_default=func.now(), nullable=False)
 
     # Relationships
-    prescription = relationship("Prescription", back_populates="usage_logs")
+    prescription = relationship(
+        "Prescription",
+        primaryjoin="foreign(UsageLog.prescription_id) == Prescription.id",
+        viewonly=True
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, TIMESTAMP, Text
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class StockReservation(Base):
+    """Stock reservation model - a time-limited hold on a medication quantity."""
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(Text, nullable=False, index=True)  # Shared by all rows of one hold
+    medication_id = Column(Integer, ForeignKey("medications.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+    # Relationships
+    medication = relationship("Medication")
@@ -2,7 +2,8 @@
 Symptom model for storing medical symptoms.
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, TIMESTAMP
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.connection import Base
 
@@ -21,6 +22,10 @@ class Symptom(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, unique=True)
+    vietnamese_name = Column(Text, nullable=False)  # Tên tiếng Việt
+    category = Column(Text)  # Nhóm triệu chứng
+    severity_level = Column(Text, default="mild")  # mild, moderate, severe, emergency
+    created_at = Column(TIMESTAMP, server_default=func.now())
 
     # Many-to-many relationship with medications
     medications = relationship(
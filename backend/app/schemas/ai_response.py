@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import List, Optional
 
@@ -27,6 +28,7 @@ class PatientAnalysisRequest(BaseModel):
     allergies: List[str] = []
     underlying_conditions: List[str] = []
     current_medications: List[str] = []
+    emergency_status: bool = False  # Set when re-checking a case previously flagged as emergency
 
 
 class AIAnalysisResponse(BaseModel):
@@ -66,3 +68,11 @@ class ConfirmPrescriptionResponse(BaseModel):
     should_see_doctor: bool
     disclaimer: str
     items: List[PrescriptionItem]
+
+
+class StockReservationResponse(BaseModel):
+    """Stock reservation response schema."""
+    reservation_id: str
+    expires_at: datetime
+    total_price: int  # in VND
+    items: List[PrescriptionItem]
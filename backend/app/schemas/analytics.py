@@ -0,0 +1,23 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class DepletionForecastResponse(BaseModel):
+    """Stock depletion forecast of one medication."""
+    medication_id: int
+    name: str
+    available_stock: int  # stock minus active reservations
+    consumed_in_window: int
+    average_daily_consumption: float
+    days_of_stock_left: Optional[float] = None  # None without recent consumption
+    depletion_date: Optional[date] = None
+    reorder_point: int  # Reorder at or below this many units
+    needs_reorder: bool
+    suggested_order_quantity: int
+
+
+class DepletionForecastListResponse(BaseModel):
+    """Depletion forecasts, soonest depletion first."""
+    window_days: int
+    items: List[DepletionForecastResponse]
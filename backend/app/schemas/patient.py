@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import List, Optional
 
@@ -47,8 +48,15 @@ class PatientCreate(PatientBase):
 class PatientResponse(PatientBase):
     """Patient response schema."""
     id: int
+    created_at: Optional[datetime] = None
     allergies: List[AllergyResponse] = []
     underlying_conditions: List[UnderlyingConditionResponse] = []
 
     class Config:
         from_attributes = True
+
+
+class PatientListResponse(BaseModel):
+    """Page of patients, newest first."""
+    items: List[PatientResponse]
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
@@ -0,0 +1,65 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+from app.schemas.patient import PatientResponse
+
+
+class PrescriptionDoseResponse(BaseModel):
+    """Main medicine line of a prescription."""
+    id: int
+    medication_id: int
+    medication_name: str
+    quantity_per_dose: int
+    total_quantity: int  # quantity_per_dose x doses_per_day x days
+    dose_time: str
+    special_instructions: Optional[str] = None
+    unit_price: int  # in VND
+    price: int  # in VND
+
+
+class PrescriptionSupportingResponse(BaseModel):
+    """Supporting medicine line of a prescription."""
+    id: int
+    medication_id: int
+    medication_name: str
+    quantity_total: int
+    usage_instructions: Optional[str] = None
+    unit_price: int  # in VND
+    price: int  # in VND
+
+
+class PrescriptionDetailResponse(BaseModel):
+    """Prescription detail response schema (receipt and print screens)."""
+    id: int
+    created_at: datetime
+    status: Optional[str] = None
+    doses_per_day: int
+    days: int
+    total_price: int  # in VND, as charged at confirmation
+    diagnosis: Optional[str] = None
+    ai_recommendation: Optional[str] = None
+    pharmacist_notes: Optional[str] = None
+    patient: PatientResponse
+    doses: List[PrescriptionDoseResponse]
+    supportings: List[PrescriptionSupportingResponse]
+
+
+class PrescriptionSummaryResponse(BaseModel):
+    """Prescription row of a list page."""
+    id: int
+    patient_id: int
+    created_at: datetime
+    status: Optional[str] = None
+    doses_per_day: int
+    days: int
+    total_price: int  # in VND
+    diagnosis: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PrescriptionListResponse(BaseModel):
+    """Page of prescriptions, newest first."""
+    items: List[PrescriptionSummaryResponse]
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
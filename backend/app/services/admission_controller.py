@@ -0,0 +1,275 @@
+"""
+Admission controller for LLM calls.
+This service bounds how many LLM requests run at once and queues the rest fairly across kiosks.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.core.config import settings
+
+
+# Lower value is served first
+PRIORITY_EMERGENCY = 0
+PRIORITY_NORMAL = 1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted to the LLM."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded, priority-ordered wait queue.
+
+    Waiters are grouped by priority, then by kiosk. Within a priority level kiosks
+    are served round-robin, so one busy kiosk cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        max_queue_per_kiosk: int,
+        queue_timeout: float,
+        retry_after: int
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrency: Maximum number of LLM calls running at once
+            max_queue_size: Maximum number of requests waiting for a slot
+            max_queue_per_kiosk: Maximum number of waiting requests per kiosk
+            queue_timeout: Seconds a request may wait before it is rejected
+            retry_after: Minimum Retry-After value (seconds) sent on rejection
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.max_queue_per_kiosk = max_queue_per_kiosk
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._in_flight = 0
+        self._queued = 0
+        self._queued_per_kiosk: Dict[str, int] = {}
+        # priority -> kiosk_id -> waiting futures
+        self._waiters: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {}
+
+        # Metrics
+        self._admitted = 0
+        self._rejected_kiosk_limit = 0
+        self._rejected_queue_full = 0
+        self._timed_out = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self._avg_service_time: Optional[float] = None
+
+    @asynccontextmanager
+    async def slot(self, kiosk_id: str, priority: int = PRIORITY_NORMAL) -> AsyncIterator[float]:
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Args:
+            kiosk_id: Identifier of the calling kiosk, used for fairness
+            priority: Request priority, lower values are served first
+
+        Yields:
+            Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: If the queue is saturated or the wait timed out
+        """
+        waited = await self._acquire(kiosk_id, priority)
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self._record_service_time(time.perf_counter() - started)
+            self._release()
+
+    async def _acquire(self, kiosk_id: str, priority: int) -> float:
+        """Wait for a free slot, or raise AdmissionRejected."""
+        if self._in_flight < self.max_concurrency and self._queued == 0:
+            self._in_flight += 1
+            self._record_wait(0.0)
+            return 0.0
+
+        if self._queued_per_kiosk.get(kiosk_id, 0) >= self.max_queue_per_kiosk:
+            self._rejected_kiosk_limit += 1
+            raise AdmissionRejected(
+                status_code=429,
+                detail="Too many pending analyses from this kiosk",
+                retry_after=self._estimate_retry_after()
+            )
+
+        if self._queued >= self.max_queue_size:
+            self._rejected_queue_full += 1
+            raise AdmissionRejected(
+                status_code=503,
+                detail="AI analysis is at capacity, please retry shortly",
+                retry_after=self._estimate_retry_after()
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(future, kiosk_id, priority)
+        started = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future, kiosk_id, priority)
+            self._timed_out += 1
+            raise AdmissionRejected(
+                status_code=503,
+                detail="Timed out waiting for AI analysis capacity",
+                retry_after=self._estimate_retry_after()
+            )
+        except asyncio.CancelledError:
+            self._abandon(future, kiosk_id, priority)
+            raise
+
+        waited = time.perf_counter() - started
+        self._record_wait(waited)
+        return waited
+
+    def _enqueue(self, future: asyncio.Future, kiosk_id: str, priority: int) -> None:
+        """Add a waiter to its priority/kiosk queue."""
+        kiosks = self._waiters.setdefault(priority, OrderedDict())
+        kiosks.setdefault(kiosk_id, deque()).append(future)
+        self._queued += 1
+        self._queued_per_kiosk[kiosk_id] = self._queued_per_kiosk.get(kiosk_id, 0) + 1
+
+    def _abandon(self, future: asyncio.Future, kiosk_id: str, priority: int) -> None:
+        """Give up a wait that timed out or was cancelled, returning the slot if it was granted."""
+        if future.done() and not future.cancelled():
+            # The slot was granted in the same loop iteration the wait ended
+            self._release()
+        else:
+            self._discard(future, kiosk_id, priority)
+
+    def _discard(self, future: asyncio.Future, kiosk_id: str, priority: int) -> None:
+        """Remove a waiter that gave up before being granted a slot."""
+        kiosks = self._waiters.get(priority)
+        if not kiosks or kiosk_id not in kiosks:
+            return
+
+        queue = kiosks[kiosk_id]
+        try:
+            queue.remove(future)
+        except ValueError:
+            return
+
+        if not queue:
+            del kiosks[kiosk_id]
+        self._dequeued(kiosk_id)
+
+    def _dequeued(self, kiosk_id: str) -> None:
+        """Update queue counters after a waiter leaves the queue."""
+        self._queued -= 1
+        remaining = self._queued_per_kiosk.get(kiosk_id, 1) - 1
+        if remaining > 0:
+            self._queued_per_kiosk[kiosk_id] = remaining
+        else:
+            self._queued_per_kiosk.pop(kiosk_id, None)
+
+    def _release(self) -> None:
+        """Free a slot and hand it to the next waiter, if any."""
+        self._in_flight -= 1
+
+        for priority in sorted(self._waiters):
+            kiosks = self._waiters[priority]
+            while kiosks and self._in_flight < self.max_concurrency:
+                kiosk_id, queue = next(iter(kiosks.items()))
+                future = queue.popleft()
+
+                # Rotate the kiosk to the back for round-robin fairness
+                if queue:
+                    kiosks.move_to_end(kiosk_id)
+                else:
+                    del kiosks[kiosk_id]
+                self._dequeued(kiosk_id)
+
+                if future.done():
+                    continue
+
+                self._in_flight += 1
+                future.set_result(None)
+                return
+
+    def _record_wait(self, waited: float) -> None:
+        """Record queue-time metrics for an admitted request."""
+        self._admitted += 1
+        self._queue_wait_total += waited
+        self._queue_wait_max = max(self._queue_wait_max, waited)
+        self._recent_waits.append(waited)
+
+    def _record_service_time(self, elapsed: float) -> None:
+        """Track an exponential moving average of slot hold time."""
+        if self._avg_service_time is None:
+            self._avg_service_time = elapsed
+        else:
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * elapsed
+
+    def _estimate_retry_after(self) -> int:
+        """Estimate how long until the current queue drains."""
+        if not self._avg_service_time:
+            return self.retry_after
+
+        estimate = self._avg_service_time * (self._queued + 1) / self.max_concurrency
+        return max(self.retry_after, math.ceil(estimate))
+
+    def get_stats(self) -> dict:
+        """
+        Get admission and queue-time statistics.
+
+        Returns:
+            Dictionary with controller statistics
+        """
+        recent = sorted(self._recent_waits)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "queued_per_kiosk": dict(self._queued_per_kiosk),
+            "admitted": self._admitted,
+            "rejected_kiosk_limit": self._rejected_kiosk_limit,
+            "rejected_queue_full": self._rejected_queue_full,
+            "timed_out": self._timed_out,
+            "queue_wait_seconds": {
+                "avg": self._queue_wait_total / self._admitted if self._admitted else 0.0,
+                "max": self._queue_wait_max,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99)
+            },
+            "avg_service_seconds": self._avg_service_time or 0.0
+        }
+
+
+# Global admission controller for LLM calls
+llm_admission_controller = AdmissionController(
+    max_concurrency=settings.llm_max_concurrency,
+    max_queue_size=settings.llm_max_queue_size,
+    max_queue_per_kiosk=settings.llm_max_queue_per_kiosk,
+    queue_timeout=settings.llm_queue_timeout,
+    retry_after=settings.llm_retry_after_seconds
+)
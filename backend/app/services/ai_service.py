@@ -3,19 +3,21 @@ AI Service for medication recommendation using Gemini and LangChain.
 This service handles the core AI logic for symptom analysis and medication recommendations.
 """
 
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Optional, Tuple
 from app.core.config import settings
+from app.core.tracing import tracer
+from opentelemetry import trace
 from app.schemas.ai_response import AIAnalysisResponse, MedicineRecommendation, SupportingMedicine
 
-# LangChain imports
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_core.runnables import RunnableSequence
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field, field_validator
 
 # Vector store imports
 from app.services.vector_store_manager import vector_store_manager
+from app.services.admission_controller import AdmissionController, llm_admission_controller, PRIORITY_NORMAL
+from app.services.audit_logger import audit_logger, SOURCE_AI_FALLBACK
+
+logger = logging.getLogger(__name__)
 
 
 class AIRecommendationOutput(BaseModel):
@@ -60,39 +62,87 @@ class AIService:
     """Service for AI-powered medication recommendations using LangChain."""
     
     def __init__(self):
-        """Initialize AI service with LangChain and Gemini."""
-        if settings.gemini_api_key:
-            # Initialize LangChain components
-            self.llm = ChatGoogleGenerativeAI(
+        """
+        Initialize AI service.
+        
+        LangChain and Gemini clients are built lazily on first use (or by warm_up),
+        so importing this module stays cheap.
+        """
+        self.llm = None
+        self.output_parser = None
+        self.prompt_template = None
+        self._chain = None
+    
+    @property
+    def chain(self):
+        """LangChain processing chain, built on first access. None if AI is not configured."""
+        if self._chain is None and settings.gemini_api_key:
+            self._build_chain()
+        return self._chain
+    
+    def use_llm(self, llm) -> None:
+        """
+        Build the pipeline around the given chat model instead of Gemini.
+        
+        Only for load tests and benchmarks, which inject a simulated model
+        (benchmarks/stub_llm.py); nothing in the application calls this.
+        
+        Args:
+            llm: LangChain chat model
+        """
+        logger.warning("Using %s instead of Gemini: recommendations are not generated by Gemini.", type(llm).__name__)
+        self._build_chain(llm)
+    
+    def _build_chain(self, llm=None) -> None:
+        """Initialize LangChain components and the processing chain (with Gemini unless llm is given)."""
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import PydanticOutputParser
+        from langchain_core.runnables import RunnableSequence
+        
+        # Initialize LangChain components
+        if llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            llm = ChatGoogleGenerativeAI(
                 model="gemini-2.0-flash",
                 google_api_key=settings.gemini_api_key,
                 temperature=0.1
             )
-            
-            # Initialize output parser
-            self.output_parser = PydanticOutputParser(pydantic_object=AIRecommendationOutput)
-            
-            # Initialize prompt template
-            self.prompt_template = PromptTemplate(
-                template=self._get_prompt_template(),
-                input_variables=[
-                    "gender", "age", "height", "weight", "symptoms", 
-                    "underlying_conditions", "allergies", "current_medications", 
-                    "med_context", "format_instructions"
-                ]
-            )
-            
-            # Create the processing chain
-            self.chain = RunnableSequence(
-                self.prompt_template,
-                self.llm,
-                self.output_parser
-            )
-            
-        else:
-            self.llm = None
-            self.chain = None
-            print("Warning: GEMINI_API_KEY not provided. AI features will be disabled.")
+        self.llm = llm
+        
+        # Initialize output parser
+        self.output_parser = PydanticOutputParser(pydantic_object=AIRecommendationOutput)
+        
+        # Initialize prompt template
+        self.prompt_template = PromptTemplate(
+            template=self._get_prompt_template(),
+            input_variables=[
+                "gender", "age", "height", "weight", "symptoms", 
+                "underlying_conditions", "allergies", "current_medications", 
+                "med_context", "format_instructions"
+            ]
+        )
+        
+        # Create the processing chain; the output is parsed separately so the
+        # LLM call and parsing can be timed (and token usage read) on their own
+        self._chain = RunnableSequence(
+            self.prompt_template,
+            self.llm
+        )
+    
+    def warm_up(self) -> bool:
+        """
+        Build the LangChain pipeline ahead of the first request.
+        
+        Returns:
+            True if the LLM is configured and ready, False otherwise
+        """
+        if self._chain is None and not settings.gemini_api_key:
+            logger.warning("GEMINI_API_KEY not provided. AI features will be disabled.")
+        return self.chain is not None
+    
+    def is_ready(self) -> bool:
+        """Check if the LLM pipeline has been built."""
+        return self._chain is not None
     
     def _get_prompt_template(self) -> str:
         """Get the prompt template."""
@@ -149,19 +199,25 @@ class AIService:
         weight: int,
         allergies: List[str],
         underlying_conditions: List[str],
-        current_medications: List[str]
+        current_medications: List[str],
+        vector_context: Optional[str] = None
     ) -> Dict[str, str]:
-        """Create prompt data for LangChain template."""
+        """
+        Create prompt data for LangChain template.
+        
+        A precomputed vector_context (e.g. from a batched search) skips the per-request search.
+        """
         
         allergies_str = ", ".join(allergies) if allergies else "Không có"
         conditions_str = ", ".join(underlying_conditions) if underlying_conditions else "Không có"
         medications_str = ", ".join(current_medications) if current_medications else "Không có"
         
         # Get vector store context for enhanced recommendations
-        vector_context = vector_store_manager.get_vector_context_for_prompt(
-            symptoms=symptoms,
-            allergies=allergies
-        )
+        if vector_context is None:
+            vector_context = vector_store_manager.get_vector_context_for_prompt(
+                symptoms=symptoms,
+                allergies=allergies
+            )
         
         return {
             "gender": gender,
@@ -185,31 +241,126 @@ class AIService:
         weight: int,
         allergies: List[str] = None,
         underlying_conditions: List[str] = None,
-        current_medications: List[str] = None
+        current_medications: List[str] = None,
+        kiosk_id: str = "anonymous",
+        priority: int = PRIORITY_NORMAL,
+        vector_context: Optional[str] = None
     ) -> AIAnalysisResponse:
         """
         Analyze patient symptoms and return medication recommendations using LangChain.
         This method implements the core AI logic for symptom analysis.
+
+        LLM calls go through the admission controller; AdmissionRejected is raised
+        (not swallowed into the fallback) when the queue is saturated.
+        """
+        response, _ = await self.analyze_symptoms_with_status(
+            symptoms=symptoms,
+            gender=gender,
+            age=age,
+            height=height,
+            weight=weight,
+            allergies=allergies,
+            underlying_conditions=underlying_conditions,
+            current_medications=current_medications,
+            kiosk_id=kiosk_id,
+            priority=priority,
+            vector_context=vector_context
+        )
+        return response
+
+    async def analyze_symptoms_with_status(
+        self,
+        symptoms: str,
+        gender: str,
+        age: int,
+        height: int,
+        weight: int,
+        allergies: List[str] = None,
+        underlying_conditions: List[str] = None,
+        current_medications: List[str] = None,
+        kiosk_id: str = "anonymous",
+        priority: int = PRIORITY_NORMAL,
+        vector_context: Optional[str] = None,
+        admission_controller: Optional[AdmissionController] = None
+    ) -> Tuple[AIAnalysisResponse, bool]:
+        """
+        Analyze patient symptoms like analyze_symptoms, also reporting whether the
+        fallback response was returned.
+        
+        Args:
+            admission_controller: Controller admitting the LLM call (default: the
+                shared llm_admission_controller)
+            
+        Returns:
+            The analysis response and True if it is the fallback response (AI not
+            configured or the pipeline failed), False otherwise
         """
         if not self.chain:
             # Return mock response if AI is not configured
-            return self._get_mock_response(symptoms)
+            audit_logger.log(SOURCE_AI_FALLBACK, "LLM pipeline not configured; returned fallback response", "warning")
+            return self._get_mock_response(symptoms), True
         
-        try:
-            # Prepare prompt data
-            prompt_data = self.create_diagnosis_prompt_data(
+        controller = admission_controller or llm_admission_controller
+        async with controller.slot(kiosk_id, priority) as waited:
+            trace.get_current_span().set_attribute("llm.queue_wait_seconds", round(waited, 4))
+            return await self._run_analysis(
                 symptoms=symptoms,
                 gender=gender,
                 age=age,
                 height=height,
                 weight=weight,
-                allergies=allergies or [],
-                underlying_conditions=underlying_conditions or [],
-                current_medications=current_medications or []
+                allergies=allergies,
+                underlying_conditions=underlying_conditions,
+                current_medications=current_medications,
+                vector_context=vector_context
             )
+
+    async def _run_analysis(
+        self,
+        symptoms: str,
+        gender: str,
+        age: int,
+        height: int,
+        weight: int,
+        allergies: List[str] = None,
+        underlying_conditions: List[str] = None,
+        current_medications: List[str] = None,
+        vector_context: Optional[str] = None
+    ) -> Tuple[AIAnalysisResponse, bool]:
+        """
+        Run the LangChain pipeline, falling back to the mock response on failure.
+        
+        Returns:
+            The analysis response and True if it is the fallback response
+        """
+        try:
+            # Prepare prompt data
+            with tracer.start_as_current_span("ai.build_prompt") as span:
+                span.set_attribute("vector_context.precomputed", vector_context is not None)
+                prompt_data = self.create_diagnosis_prompt_data(
+                    symptoms=symptoms,
+                    gender=gender,
+                    age=age,
+                    height=height,
+                    weight=weight,
+                    allergies=allergies or [],
+                    underlying_conditions=underlying_conditions or [],
+                    current_medications=current_medications or [],
+                    vector_context=vector_context
+                )
+                span.set_attribute("prompt.med_context_chars", len(prompt_data["med_context"]))
             
             # Execute LangChain pipeline
-            result = await self.chain.ainvoke(prompt_data)
+            with tracer.start_as_current_span("ai.chain.ainvoke") as span:
+                span.set_attribute("gen_ai.request.model", self.llm.model)
+                message = await self.chain.ainvoke(prompt_data)
+                usage = getattr(message, "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens", "total_tokens"):
+                    if key in usage:
+                        span.set_attribute(f"gen_ai.usage.{key}", usage[key])
+            
+            with tracer.start_as_current_span("ai.parse"):
+                result = self.output_parser.invoke(message)
             
             # Convert to our response format
             main_medicines = [
@@ -235,12 +386,13 @@ class AIService:
                 emergency_status=result.emergency_status,
                 should_see_doctor=result.should_see_doctor,
                 disclaimer=result.disclaimer
-            )
+            ), False
             
         except Exception as e:
-            print(f"Error in LangChain pipeline: {e}")
+            logger.exception("Error in LangChain pipeline: %s", e)
+            audit_logger.log(SOURCE_AI_FALLBACK, f"LangChain pipeline failed: {e}", "error")
             # Fallback to mock response if LangChain fails
-            return self._get_mock_response(symptoms)
+            return self._get_mock_response(symptoms), True
     
     def _get_mock_response(self, symptoms: str = "") -> AIAnalysisResponse:
         """Return a fallback response when AI is not working."""
@@ -249,7 +401,14 @@ class AIService:
             supporting_medicines=[],
             doses_per_day=0,
             total_days=0,
-            recommendation_reasoning="AI hiện không hoạt động. Vui lòng đến bệnh viện để được khám và tư vấn trực tiếp từ bác sĩ."
+            recommendation_reasoning="AI hiện không hoạt động. Vui lòng đến bệnh viện để được khám và tư vấn trực tiếp từ bác sĩ.",
+            diagnosis="",
+            severity_level="",
+            side_effects_warning="",
+            medical_advice="",
+            emergency_status=False,
+            should_see_doctor=True,
+            disclaimer=""
         )
 
 
@@ -0,0 +1,211 @@
+"""
+Audit Logger for the usage_logs table.
+This service buffers audit events in memory and writes them in batches off the request path.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database.connection import AsyncSessionLocal
+from app.models.prescription import UsageLog
+
+logger = logging.getLogger(__name__)
+
+
+# generated_by values
+SOURCE_AI_ANALYSIS = "ai_analysis"
+SOURCE_AI_FALLBACK = "ai_fallback"
+SOURCE_ADMISSION = "admission_control"
+SOURCE_CONFIRMATION = "confirm_prescription"
+SOURCE_RESERVATION = "reservation"
+SOURCE_INVENTORY = "inventory"
+
+
+class AuditLogger:
+    """
+    Write-behind logger for UsageLog rows.
+
+    log() never waits: events go into a bounded in-memory queue and a background
+    task inserts them in bulk when a batch fills up or the flush interval passes.
+    When the queue is full (Postgres slow or down), new events are dropped and
+    counted instead of slowing requests down.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval: float):
+        """
+        Initialize the audit logger.
+
+        Args:
+            max_queue_size: Maximum number of buffered events
+            batch_size: Maximum rows per bulk insert
+            flush_interval: Seconds to wait for a batch to fill before writing it anyway
+        """
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Future] = None
+
+        # Metrics
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._dropped_queue_full = 0
+        self._dropped_not_running = 0
+        self._dropped_write_errors = 0
+        self._last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the background writer (call from the running event loop)."""
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Flush buffered events and stop the background writer.
+
+        Args:
+            timeout: Seconds to wait for the final flush
+        """
+        if self._writer is None:
+            return
+
+        writer, self._writer = self._writer, None
+        writer.cancel()
+        try:
+            await writer
+        except asyncio.CancelledError:
+            pass
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Audit log shutdown timed out with %d events unwritten", self._queue.qsize())
+        self._queue = None
+
+    def log(
+        self,
+        generated_by: str,
+        note: str,
+        log_type: str = "info",
+        prescription_id: Optional[int] = None
+    ) -> None:
+        """
+        Record an audit event without waiting for the database.
+
+        Args:
+            generated_by: Component that produced the event (one of the SOURCE_* values)
+            note: Human-readable description
+            log_type: "info", "warning", "error" or "success"
+            prescription_id: Related prescription, if any
+        """
+        if self._writer is None:
+            self._dropped_not_running += 1
+            return
+
+        try:
+            self._queue.put_nowait({
+                "prescription_id": prescription_id,
+                "note": note,
+                "generated_by": generated_by,
+                "log_type": log_type
+            })
+            self._enqueued += 1
+        except asyncio.QueueFull:
+            self._dropped_queue_full += 1
+
+    async def _run(self) -> None:
+        """Collect events into batches and write them until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+
+                while len(batch) < self.batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Put a partly collected batch back so the shutdown drain writes it
+                self._requeue(batch)
+                raise
+
+            # Shielded: cancelling the writer must not abort an insert half way
+            self._in_flight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._in_flight)
+
+    async def _drain(self) -> None:
+        """Wait for the in-flight batch, then write everything still buffered."""
+        if self._in_flight is not None:
+            await self._in_flight
+
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+
+    def _requeue(self, batch: List[dict]) -> None:
+        """Return unwritten events to the queue, dropping what no longer fits."""
+        for row in batch:
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self._dropped_queue_full += 1
+
+    async def _write(self, batch: List[dict]) -> None:
+        """Insert a batch in one statement; failed batches are dropped and counted."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(UsageLog), batch)
+                await db.commit()
+            self._written += len(batch)
+            self._batches += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._dropped_write_errors += len(batch)
+            self._last_error = str(e)
+            logger.error("Error writing %d audit log events: %s", len(batch), e)
+
+    def get_stats(self) -> dict:
+        """
+        Get audit logger statistics.
+
+        Returns:
+            Dictionary with queue depth, write and drop counters
+        """
+        return {
+            "running": self._writer is not None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "batches": self._batches,
+            "dropped_queue_full": self._dropped_queue_full,
+            "dropped_not_running": self._dropped_not_running,
+            "dropped_write_errors": self._dropped_write_errors,
+            "last_error": self._last_error
+        }
+
+
+# Global audit logger instance
+audit_logger = AuditLogger(
+    max_queue_size=settings.audit_log_queue_size,
+    batch_size=settings.audit_log_batch_size,
+    flush_interval=settings.audit_log_flush_interval_seconds
+)
@@ -0,0 +1,223 @@
+"""
+Autocomplete Service for kiosk typeahead.
+This service keeps an in-memory token-prefix index over medication and symptom names, matched without Vietnamese diacritics.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Longest indexed prefix; longer query tokens are looked up by this prefix and
+# then checked against the full tokens
+MAX_PREFIX_LENGTH = 10
+
+SUGGESTION_TYPES = ("medication", "symptom")
+
+
+def fold(value: str) -> str:
+    """
+    Normalize text for matching: lowercase, without diacritics, single-spaced.
+
+    "Đau đầu" and "dau dau" both fold to "dau dau".
+
+    Args:
+        value: Text to normalize
+
+    Returns:
+        Folded text
+    """
+    # đ is a separate letter, not d plus a combining mark, so NFD leaves it alone
+    value = value.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", value)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return " ".join(stripped.split())
+
+
+class _Entry:
+    """One indexed text of a medication or symptom."""
+
+    __slots__ = ("type", "id", "label", "matched", "folded", "tokens")
+
+    def __init__(self, type_: str, id_: int, label: str, matched: str):
+        self.type = type_
+        self.id = id_
+        self.label = label
+        self.matched = matched
+        self.folded = fold(matched)
+        self.tokens = self.folded.split()
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over medication names, active ingredients and symptom names.
+
+    Every token of every indexed text is stored under each of its prefixes, so
+    a lookup is a few dictionary hits and a set intersection, with no database
+    or embedding call. The index is rebuilt in the background when the catalog
+    changes, and swapped in as a whole.
+    """
+
+    def __init__(self, refresh_delay: float):
+        """
+        Initialize the autocomplete index.
+
+        Args:
+            refresh_delay: Seconds to wait after a catalog change before rebuilding,
+                so a burst of changes (e.g. stock updates) causes one rebuild
+        """
+        self.refresh_delay = refresh_delay
+        # (entries, prefix -> entry positions), replaced atomically on rebuild
+        self._index: Optional[Tuple[List[_Entry], Dict[str, Set[int]]]] = None
+        self._rebuild_lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._builds = 0
+        self._last_build_seconds = 0.0
+        self._lookups = 0
+
+    def is_ready(self) -> bool:
+        """Check if the index has been built."""
+        return self._index is not None
+
+    def rebuild(self) -> int:
+        """
+        Load names from the database and replace the index.
+
+        Returns:
+            Number of indexed entries
+        """
+        with self._rebuild_lock:
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                medications = db.execute(text("SELECT id, name, active_ingredient FROM medications")).all()
+                symptoms = db.execute(text("SELECT id, name, vietnamese_name FROM symptoms")).all()
+
+            entries: List[_Entry] = []
+            for row in medications:
+                entries.append(_Entry("medication", row.id, row.name, row.name))
+                if row.active_ingredient:
+                    entries.append(_Entry("medication", row.id, row.name, row.active_ingredient))
+            for row in symptoms:
+                label = row.vietnamese_name or row.name
+                entries.append(_Entry("symptom", row.id, label, label))
+                if row.vietnamese_name and row.name:
+                    entries.append(_Entry("symptom", row.id, label, row.name))
+
+            prefixes: Dict[str, Set[int]] = defaultdict(set)
+            for position, entry in enumerate(entries):
+                for token in entry.tokens:
+                    for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                        prefixes[token[:length]].add(position)
+
+            self._index = (entries, dict(prefixes))
+            self._builds += 1
+            self._last_build_seconds = time.perf_counter() - started
+            return len(entries)
+
+    def schedule_refresh(self) -> None:
+        """Rebuild after refresh_delay unless a rebuild is already pending (call from the event loop)."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self._delayed_refresh())
+
+    async def _delayed_refresh(self) -> None:
+        await asyncio.sleep(self.refresh_delay)
+        try:
+            await asyncio.to_thread(self.rebuild)
+        except Exception as e:
+            logger.exception("Error rebuilding autocomplete index: %s", e)
+
+    def search(self, query: str, limit: int = 10, types: Optional[Set[str]] = None) -> List[dict]:
+        """
+        Find medications and symptoms whose names match a partial query.
+
+        Every query word must be a prefix of a word of the matched text, in any
+        order. Exact matches come first, then texts starting with the query,
+        then shorter texts.
+
+        Args:
+            query: Text typed so far (with or without diacritics)
+            limit: Maximum number of suggestions
+            types: Only these suggestion types (default: all)
+
+        Returns:
+            Suggestions with type, id, label and the text that matched
+        """
+        if self._index is None:
+            raise RuntimeError("Autocomplete index is not built")
+
+        entries, prefixes = self._index
+        self._lookups += 1
+        query_tokens = fold(query).split()
+        if not query_tokens:
+            return []
+
+        candidates: Optional[Set[int]] = None
+        for token in sorted(query_tokens, key=len, reverse=True):  # Most selective first
+            postings = prefixes.get(token[:MAX_PREFIX_LENGTH])
+            if not postings:
+                return []
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return []
+
+        folded_query = " ".join(query_tokens)
+        best: Dict[Tuple[str, int], Tuple[tuple, _Entry]] = {}
+        for position in candidates:
+            entry = entries[position]
+            if types and entry.type not in types:
+                continue
+            # Tokens longer than MAX_PREFIX_LENGTH were only matched on their prefix
+            if any(
+                len(token) > MAX_PREFIX_LENGTH and not any(t.startswith(token) for t in entry.tokens)
+                for token in query_tokens
+            ):
+                continue
+
+            rank = (
+                0 if entry.folded == folded_query else 1 if entry.folded.startswith(folded_query) else 2,
+                len(entry.folded),
+                entry.label
+            )
+            key = (entry.type, entry.id)
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, entry)
+
+        ranked = sorted(best.values(), key=lambda item: item[0])[:limit]
+        return [
+            {"type": entry.type, "id": entry.id, "label": entry.label, "matched": entry.matched}
+            for _, entry in ranked
+        ]
+
+    def get_stats(self) -> dict:
+        """
+        Get autocomplete index statistics.
+
+        Returns:
+            Dictionary with index size and build metrics
+        """
+        entries, prefixes = self._index if self._index is not None else ([], {})
+        return {
+            "ready": self._index is not None,
+            "entries": len(entries),
+            "prefixes": len(prefixes),
+            "builds": self._builds,
+            "last_build_seconds": self._last_build_seconds,
+            "lookups": self._lookups
+        }
+
+
+# Global autocomplete index instance
+autocomplete_index = AutocompleteIndex(refresh_delay=settings.autocomplete_refresh_delay_seconds)
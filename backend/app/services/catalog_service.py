@@ -0,0 +1,251 @@
+"""
+Catalog Service for the medication catalog.
+This service keeps pre-serialized catalog snapshots in memory and drops them when Postgres reports a catalog change.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Channels notified by the medications triggers in init.sql. Catalog payloads
+# are the new value of the medication_catalog_version sequence; stock
+# notifications (a medication ran out or came back into stock) have none.
+CATALOG_CHANNEL = "medication_catalog"
+STOCK_CHANNEL = "medication_stock"
+
+
+class CatalogSnapshot:
+    """Serialized catalog body with its strong ETag."""
+
+    def __init__(self, body: bytes, version: Optional[int]):
+        """
+        Initialize a snapshot.
+
+        Args:
+            body: JSON response body
+            version: Catalog version last announced before the snapshot was built
+        """
+        self.body = body
+        self.version = version
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.built_at = time.monotonic()
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        Check an If-None-Match header against this snapshot.
+
+        Args:
+            if_none_match: Raw header value (a list of ETags or "*")
+
+        Returns:
+            True if the client already has this snapshot
+        """
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+        return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+
+class CatalogCache:
+    """
+    Pre-serialized medication catalog snapshots, one per query variant.
+
+    Every catalog change bumps the catalog version and sends a NOTIFY (see
+    init.sql). Each worker LISTENs for it and drops its snapshots, so a poll
+    between changes costs neither a query nor serialization. While the
+    listener is not connected, snapshots expire after max_age seconds instead.
+    Stock is not part of the snapshots; stock notifications only run the
+    on_stock_change callbacks.
+    """
+
+    def __init__(self, max_age: float):
+        """
+        Initialize the catalog cache.
+
+        Args:
+            max_age: Seconds a snapshot stays valid while change notifications are unavailable
+        """
+        self.max_age = max_age
+        self._snapshots: Dict[Hashable, CatalogSnapshot] = {}
+        self._generation = 0
+        self._version: Optional[int] = None
+        self._build_lock = asyncio.Lock()
+        self._listening = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._stock_callbacks: List[Callable[[], None]] = []
+
+        # Metrics
+        self._hits = 0
+        self._builds = 0
+        self._not_modified = 0
+        self._invalidations = 0
+        self._stock_changes = 0
+        self._listener_errors = 0
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[bytes]]) -> CatalogSnapshot:
+        """
+        Get the snapshot for a query variant, building it on a miss.
+
+        Concurrent misses share one build.
+
+        Args:
+            key: Query variant
+            build: Coroutine function returning the serialized catalog
+
+        Returns:
+            Current snapshot
+        """
+        snapshot = self._fresh(key)
+        if snapshot is None:
+            async with self._build_lock:
+                snapshot = self._fresh(key)
+                if snapshot is None:
+                    generation = self._generation
+                    snapshot = CatalogSnapshot(await build(), self._version)
+                    self._builds += 1
+                    # A change announced during the build may not be in it; serve it once, don't keep it
+                    if generation == self._generation:
+                        self._snapshots[key] = snapshot
+                    return snapshot
+
+        self._hits += 1
+        return snapshot
+
+    def _fresh(self, key: Hashable) -> Optional[CatalogSnapshot]:
+        """Return the stored snapshot for key if it is still valid."""
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return None
+        if not self._listening and time.monotonic() - snapshot.built_at > self.max_age:
+            return None
+        return snapshot
+
+    def record_not_modified(self) -> None:
+        """Count a conditional request answered with 304."""
+        self._not_modified += 1
+
+    def invalidate(self, version: Optional[int] = None) -> None:
+        """
+        Drop all snapshots and notify subscribers.
+
+        Args:
+            version: Catalog version announced by the change, if known
+        """
+        self._generation += 1
+        self._snapshots.clear()
+        self._invalidations += 1
+        if version is not None:
+            self._version = version
+
+        self._run_callbacks(self._callbacks)
+
+    def stock_changed(self) -> None:
+        """Notify stock subscribers that a medication ran out or came back into stock."""
+        self._stock_changes += 1
+        self._run_callbacks(self._stock_callbacks)
+
+    def _run_callbacks(self, callbacks: List[Callable[[], None]]) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception("Error in catalog change callback: %s", e)
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback run whenever the catalog changes.
+
+        Args:
+            callback: Function without arguments; must not block
+        """
+        self._callbacks.append(callback)
+
+    def on_stock_change(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback run whenever a medication runs out or comes back into stock.
+
+        Args:
+            callback: Function without arguments; must not block
+        """
+        self._stock_callbacks.append(callback)
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        if channel == STOCK_CHANNEL:
+            self.stock_changed()
+            return
+        try:
+            version = int(payload)
+        except ValueError:
+            version = None
+        self.invalidate(version)
+
+    async def listen(self, reconnect_delay: float = 5.0) -> None:
+        """
+        LISTEN for catalog changes until cancelled, reconnecting on failure.
+
+        Args:
+            reconnect_delay: Seconds to wait before reconnecting
+        """
+        # asyncpg takes a plain libpq-style URL, without the SQLAlchemy driver suffix
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CATALOG_CHANNEL, self._on_notification)
+                await connection.add_listener(STOCK_CHANNEL, self._on_notification)
+
+                self._listening = True
+                # Changes made while we were not listening were missed
+                self.invalidate()
+                self.stock_changed()
+                await closed.wait()
+                logger.warning("Catalog change listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._listener_errors += 1
+                logger.error("Error in catalog change listener: %s", e)
+            finally:
+                self._listening = False
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+
+            await asyncio.sleep(reconnect_delay)
+
+    def get_stats(self) -> dict:
+        """
+        Get catalog cache statistics.
+
+        Returns:
+            Dictionary with snapshot, hit and invalidation counters
+        """
+        return {
+            "listening": self._listening,
+            "catalog_version": self._version,
+            "snapshots": len(self._snapshots),
+            "hits": self._hits,
+            "builds": self._builds,
+            "not_modified": self._not_modified,
+            "invalidations": self._invalidations,
+            "stock_changes": self._stock_changes,
+            "listener_errors": self._listener_errors,
+            "max_age_seconds": self.max_age
+        }
+
+
+# Global catalog cache instance
+catalog_cache = CatalogCache(max_age=settings.catalog_snapshot_max_age_seconds)
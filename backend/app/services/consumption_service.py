@@ -0,0 +1,179 @@
+"""
+Consumption Service for inventory depletion analytics.
+This service maintains the per-medication daily consumption rollup and derives depletion forecasts from it.
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+# Run in the confirmation transaction after decrement_stock, which has already
+# locked the same medications in id order, so the rollup rows add no new lock
+# ordering and cannot deadlock.
+RECORD_CONSUMPTION_SQL = text("""
+    INSERT INTO medication_daily_consumption AS c (medication_id, day, quantity, prescriptions)
+    SELECT id, CURRENT_DATE, quantity, 1
+    FROM unnest(CAST(:ids AS integer[]), CAST(:quantities AS integer[])) AS r(id, quantity)
+    ORDER BY id
+    ON CONFLICT (medication_id, day) DO UPDATE
+    SET quantity = c.quantity + EXCLUDED.quantity,
+        prescriptions = c.prescriptions + EXCLUDED.prescriptions
+""")
+
+# Blocks confirmation upserts until the rebuilt day commits, so none are lost or
+# counted twice: confirmations committed before the lock are in the recount,
+# later ones add to it.
+LOCK_CONSUMPTION_SQL = text("LOCK TABLE medication_daily_consumption IN SHARE ROW EXCLUSIVE MODE")
+
+DELETE_CONSUMPTION_DAY_SQL = text("DELETE FROM medication_daily_consumption WHERE day = :day")
+
+# Same quantities as confirm_prescription: doses per dose x doses per day x days,
+# supporting medicines as their total. Archived prescriptions count too, so
+# rebuilding a day that has been archived does not empty it.
+REBUILD_CONSUMPTION_DAY_SQL = text("""
+    INSERT INTO medication_daily_consumption (medication_id, day, quantity, prescriptions)
+    SELECT l.medication_id, :day, sum(l.quantity), count(DISTINCT p.id)
+    FROM (
+        SELECT id, created_at, doses_per_day, days, false AS archived
+        FROM prescriptions
+        WHERE created_at >= :day
+          AND created_at < CAST(:day AS date) + 1
+          AND status IS DISTINCT FROM 'cancelled'
+        UNION ALL
+        SELECT id, created_at, doses_per_day, days, true
+        FROM prescriptions_archive
+        WHERE created_at >= :day
+          AND created_at < CAST(:day AS date) + 1
+          AND status IS DISTINCT FROM 'cancelled'
+    ) p
+    JOIN LATERAL (
+        SELECT d.medication_id, d.quantity_per_dose * p.doses_per_day * p.days AS quantity
+        FROM prescription_doses d
+        WHERE d.prescription_id = p.id AND NOT p.archived
+        UNION ALL
+        SELECT s.medication_id, s.quantity_total
+        FROM prescription_supportings s
+        WHERE s.prescription_id = p.id AND NOT p.archived
+        UNION ALL
+        SELECT d.medication_id, d.quantity_per_dose * p.doses_per_day * p.days
+        FROM prescription_doses_archive d
+        WHERE d.prescription_id = p.id AND d.created_at = p.created_at AND p.archived
+        UNION ALL
+        SELECT s.medication_id, s.quantity_total
+        FROM prescription_supportings_archive s
+        WHERE s.prescription_id = p.id AND s.created_at = p.created_at AND p.archived
+    ) l ON true
+    WHERE l.medication_id IS NOT NULL
+    GROUP BY l.medication_id
+""")
+
+# Reads at most window_days rollup rows per medication through the primary key,
+# however many prescriptions there are.
+FORECAST_SQL = """
+    SELECT m.id, m.name, m.stock - m.reserved AS available,
+           coalesce(c.quantity, 0) AS consumed
+    FROM medications m
+    LEFT JOIN LATERAL (
+        SELECT sum(quantity) AS quantity
+        FROM medication_daily_consumption
+        WHERE medication_id = m.id
+          AND day > CURRENT_DATE - CAST(:window_days AS integer)
+    ) c ON true
+    WHERE {condition}
+    ORDER BY m.id
+"""
+
+
+def record_consumption(db: Session, quantities: Dict[int, int]) -> None:
+    """
+    Add dispensed quantities to today's rollup rows.
+
+    Args:
+        db: Database session (the caller owns the transaction)
+        quantities: Medication ID to quantity dispensed
+    """
+    if not quantities:
+        return
+
+    ids = sorted(quantities)
+    db.execute(
+        RECORD_CONSUMPTION_SQL,
+        {"ids": ids, "quantities": [quantities[med_id] for med_id in ids]}
+    )
+
+
+def rebuild_consumption_day(db: Session, day: date) -> int:
+    """
+    Recompute one day of the rollup from prescription line items, live or archived.
+
+    Args:
+        db: Database session (the caller owns the transaction; commit promptly,
+            confirmations wait on the table lock until then)
+        day: Day to rebuild
+
+    Returns:
+        Number of rollup rows written
+    """
+    db.execute(LOCK_CONSUMPTION_SQL)
+    db.execute(DELETE_CONSUMPTION_DAY_SQL, {"day": day})
+    return db.execute(REBUILD_CONSUMPTION_DAY_SQL, {"day": day}).rowcount
+
+
+def _forecast(row, window_days: int) -> dict:
+    """Derive depletion and reorder figures from a FORECAST_SQL row."""
+    average_daily = row.consumed / window_days
+    days_left = row.available / average_daily if average_daily > 0 else None
+    reorder_point = math.ceil(average_daily * (settings.reorder_lead_time_days + settings.reorder_safety_days))
+    needs_reorder = average_daily > 0 and row.available <= reorder_point
+
+    return {
+        "medication_id": row.id,
+        "name": row.name,
+        "available_stock": row.available,
+        "consumed_in_window": int(row.consumed),
+        "average_daily_consumption": round(average_daily, 2),
+        "days_of_stock_left": round(days_left, 1) if days_left is not None else None,
+        "depletion_date": date.today() + timedelta(days=int(days_left)) if days_left is not None else None,
+        "reorder_point": reorder_point,
+        "needs_reorder": needs_reorder,
+        "suggested_order_quantity": (
+            max(0, math.ceil(average_daily * settings.reorder_target_days) - row.available)
+            if needs_reorder else 0
+        )
+    }
+
+
+def get_depletion_forecasts(
+    db: Session,
+    medication_id: Optional[int] = None,
+    window_days: Optional[int] = None
+) -> List[dict]:
+    """
+    Forecast stock depletion from average daily consumption.
+
+    Args:
+        db: Database session
+        medication_id: Only this medication (default: all)
+        window_days: Days of consumption to average over (default: settings.forecast_window_days)
+
+    Returns:
+        Forecast dictionaries, soonest depletion first (medications without
+        recent consumption last)
+    """
+    window_days = window_days or settings.forecast_window_days
+    params = {"window_days": window_days}
+    condition = "true"
+    if medication_id is not None:
+        condition = "m.id = :medication_id"
+        params["medication_id"] = medication_id
+
+    rows = db.execute(text(FORECAST_SQL.format(condition=condition)), params).all()
+    forecasts = [_forecast(row, window_days) for row in rows]
+    forecasts.sort(key=lambda f: (f["days_of_stock_left"] is None, f["days_of_stock_left"] or 0))
+    return forecasts
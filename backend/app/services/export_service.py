@@ -0,0 +1,243 @@
+"""
+Export Service for regulatory reporting.
+This service streams prescriptions with their line items from a server-side cursor as NDJSON or CSV.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import text
+
+from app.database.connection import replica_engine
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+CSV_COLUMNS = [
+    "prescription_id", "created_at", "patient_id", "status", "doses_per_day", "days",
+    "total_price", "diagnosis", "line_type", "medication_id", "medication_name",
+    "quantity_per_dose", "quantity_total", "unit_price"
+]
+
+# One row per line item (or one row with NULL line columns for a prescription
+# without lines), ordered so each prescription's rows are contiguous. Archived
+# prescriptions (see partition_service.archive_prescriptions) are read from the
+# archive tables, whose line items are matched on created_at too so only the
+# prescription's monthly partition is searched.
+EXPORT_SQL = """
+    SELECT p.id, p.created_at, p.patient_id, p.status, p.doses_per_day, p.days,
+           p.total_price, p.diagnosis,
+           l.line_type, l.medication_id, m.name AS medication_name, m.unit_price,
+           l.quantity_per_dose, l.quantity_total
+    FROM (
+        SELECT id, created_at, patient_id, status, doses_per_day, days, total_price, diagnosis,
+               false AS archived
+        FROM prescriptions
+        WHERE {conditions}
+        UNION ALL
+        SELECT id, created_at, patient_id, status, doses_per_day, days, total_price, diagnosis,
+               true
+        FROM prescriptions_archive
+        WHERE {conditions}
+    ) p
+    LEFT JOIN LATERAL (
+        SELECT 'dose' AS line_type, d.id AS line_id, d.medication_id, d.quantity_per_dose,
+               d.quantity_per_dose * p.doses_per_day * p.days AS quantity_total
+        FROM prescription_doses d
+        WHERE d.prescription_id = p.id AND NOT p.archived
+        UNION ALL
+        SELECT 'supporting', s.id, s.medication_id, NULL, s.quantity_total
+        FROM prescription_supportings s
+        WHERE s.prescription_id = p.id AND NOT p.archived
+        UNION ALL
+        SELECT 'dose', d.id, d.medication_id, d.quantity_per_dose,
+               d.quantity_per_dose * p.doses_per_day * p.days
+        FROM prescription_doses_archive d
+        WHERE d.prescription_id = p.id AND d.created_at = p.created_at AND p.archived
+        UNION ALL
+        SELECT 'supporting', s.id, s.medication_id, NULL, s.quantity_total
+        FROM prescription_supportings_archive s
+        WHERE s.prescription_id = p.id AND s.created_at = p.created_at AND p.archived
+    ) l ON true
+    LEFT JOIN medications m ON m.id = l.medication_id
+    ORDER BY p.id, l.line_type, l.line_id
+"""
+
+CHUNK_SIZE = 64 * 1024  # bytes per streamed chunk
+
+
+def iter_export_rows(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    batch_size: int = 1000
+) -> Iterator[dict]:
+    """
+    Stream line-item rows for prescriptions in a date range, live or archived.
+
+    Rows come from a server-side cursor in batches of batch_size, so memory use
+    does not depend on the size of the range. The connection is opened here, not
+    taken from a request, because the rows are consumed after the request handler
+    has returned. Exports read from the replica when one is configured.
+
+    Args:
+        created_from: Only prescriptions created at or after this time
+        created_to: Only prescriptions created before this time
+        batch_size: Rows fetched per round trip
+
+    Yields:
+        Row mappings of EXPORT_SQL
+    """
+    conditions = ["true"]
+    params = {}
+    if created_from:
+        conditions.append("created_at >= :created_from")
+        params["created_from"] = created_from
+    if created_to:
+        conditions.append("created_at < :created_to")
+        params["created_to"] = created_to
+
+    query = text(EXPORT_SQL.format(conditions=" AND ".join(conditions)))
+
+    with replica_engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(query, params)
+        for row in result.mappings():
+            yield row
+
+
+def group_prescriptions(rows: Iterable[dict]) -> Iterator[dict]:
+    """
+    Fold contiguous line-item rows into one document per prescription.
+
+    Args:
+        rows: Rows of EXPORT_SQL, ordered by prescription
+
+    Yields:
+        Prescription dictionaries with an "items" list
+    """
+    current = None
+    for row in rows:
+        if current is None or current["prescription_id"] != row["id"]:
+            if current is not None:
+                yield current
+            current = {
+                "prescription_id": row["id"],
+                "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+                "patient_id": row["patient_id"],
+                "status": row["status"],
+                "doses_per_day": row["doses_per_day"],
+                "days": row["days"],
+                "total_price": row["total_price"],
+                "diagnosis": row["diagnosis"],
+                "items": []
+            }
+
+        if row["line_type"]:
+            current["items"].append({
+                "line_type": row["line_type"],
+                "medication_id": row["medication_id"],
+                "medication_name": row["medication_name"],
+                "quantity_per_dose": row["quantity_per_dose"],
+                "quantity_total": row["quantity_total"],
+                "unit_price": row["unit_price"]
+            })
+
+    if current is not None:
+        yield current
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """Render one JSON line per prescription."""
+    for prescription in group_prescriptions(rows):
+        yield json.dumps(prescription, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    """Render a header and one CSV line per line item."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow([
+            row["id"],
+            row["created_at"].isoformat() if row["created_at"] else "",
+            row["patient_id"], row["status"], row["doses_per_day"], row["days"],
+            row["total_price"], row["diagnosis"], row["line_type"], row["medication_id"],
+            row["medication_name"], row["quantity_per_dose"], row["quantity_total"], row["unit_price"]
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode_chunks(lines: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    """
+    Buffer lines into chunks of about CHUNK_SIZE bytes, optionally gzip-compressed.
+
+    Args:
+        lines: Rendered text lines
+        compress: Emit a gzip stream instead of plain UTF-8
+
+    Yields:
+        Byte chunks
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    pending = []
+    pending_size = 0
+
+    def flush() -> bytes:
+        data = "".join(pending).encode("utf-8")
+        pending.clear()
+        return compressor.compress(data) if compressor else data
+
+    for line in lines:
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size >= CHUNK_SIZE:
+            pending_size = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_prescriptions(
+    export_format: str,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream an export of prescriptions and their line items.
+
+    Args:
+        export_format: "ndjson" (one document per prescription) or "csv" (one row per line item)
+        created_from: Only prescriptions created at or after this time
+        created_to: Only prescriptions created before this time
+        compress: Gzip the stream
+
+    Returns:
+        Iterator of byte chunks; the query runs as it is consumed
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    rows = iter_export_rows(created_from, created_to)
+    lines = ndjson_lines(rows) if export_format == "ndjson" else csv_lines(rows)
+    return encode_chunks(lines, compress)
@@ -0,0 +1,134 @@
+"""
+Idempotency Service for safely retried write requests.
+This service stores the response of a completed request under its Idempotency-Key
+so retries can be answered without redoing the work.
+"""
+
+import hashlib
+import json
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+# Keys deleted per purge statement, so one purge never holds locks for long
+PURGE_BATCH_SIZE = 1000
+
+
+class IdempotencyKeyConflict(Exception):
+    """Raised when an Idempotency-Key is reused with a different request body."""
+
+
+def request_fingerprint(request: BaseModel) -> str:
+    """
+    Hash a request body in a canonical form.
+    
+    Args:
+        request: Parsed request model
+        
+    Returns:
+        Hex SHA-256 digest of the request
+    """
+    canonical = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_stored_response(db: Session, key: str, request_hash: str) -> Optional[dict]:
+    """
+    Look up the stored response for a key (one primary-key lookup).
+    
+    Args:
+        db: Database session
+        key: Idempotency key
+        request_hash: Fingerprint of the current request
+        
+    Returns:
+        The stored response, or None if the key has not completed yet
+        
+    Raises:
+        IdempotencyKeyConflict: If the key was used for a different request
+    """
+    row = db.execute(
+        text("SELECT request_hash, response FROM idempotency_keys WHERE key = :key"),
+        {"key": key}
+    ).first()
+    
+    if row is None:
+        return None
+    
+    if row.request_hash != request_hash:
+        raise IdempotencyKeyConflict("Idempotency-Key was already used with a different request")
+    
+    return row.response
+
+
+def lock_key(db: Session, key: str) -> None:
+    """
+    Serialize in-flight requests sharing a key.
+    
+    Takes a transaction-scoped advisory lock: a concurrent duplicate blocks here
+    until the first request commits (and then finds its stored response) or rolls
+    back (and then does the work itself).
+    
+    Args:
+        db: Database session (the lock is released when its transaction ends)
+        key: Idempotency key
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"), {"key": key})
+
+
+def store_response(db: Session, key: str, request_hash: str, response: BaseModel, prescription_id: Optional[int] = None) -> None:
+    """
+    Record the response for a key in the caller's transaction.
+    
+    Args:
+        db: Database session (commit together with the work itself)
+        key: Idempotency key
+        request_hash: Fingerprint of the request
+        response: Response model to replay on retries
+        prescription_id: Prescription created by the request, if any
+    """
+    db.execute(
+        text("""
+            INSERT INTO idempotency_keys (key, request_hash, response, prescription_id)
+            VALUES (:key, :request_hash, CAST(:response AS jsonb), :prescription_id)
+        """),
+        {
+            "key": key,
+            "request_hash": request_hash,
+            "response": response.model_dump_json(),
+            "prescription_id": prescription_id
+        }
+    )
+
+
+def purge_expired_keys(db: Session, retention_hours: int, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """
+    Delete the oldest keys stored longer than the retention window.
+    
+    A retry arriving after its key was purged is processed as a new request,
+    so the window must be longer than any client retries.
+    
+    Args:
+        db: Database session (the caller commits)
+        retention_hours: Hours a stored response is kept
+        batch_size: Maximum number of keys deleted
+        
+    Returns:
+        Number of keys deleted
+    """
+    result = db.execute(
+        text("""
+            DELETE FROM idempotency_keys
+            WHERE key IN (
+                SELECT key FROM idempotency_keys
+                WHERE created_at < now() - make_interval(hours => :retention_hours)
+                ORDER BY created_at
+                LIMIT :batch_size
+            )
+        """),
+        {"retention_hours": retention_hours, "batch_size": batch_size}
+    )
+    return result.rowcount
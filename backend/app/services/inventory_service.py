@@ -0,0 +1,333 @@
+"""
+Inventory Service for concurrency-safe stock changes.
+This service performs stock checks, decrements and reservations as single conditional SQL statements.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.services.audit_logger import audit_logger, SOURCE_INVENTORY
+from app.services.idempotency_service import purge_expired_keys
+from app.services.vector_store_manager import vector_store_manager
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Raised when a medication does not have enough unreserved stock for a request."""
+
+    def __init__(self, medication_id: int, available: int, required: int):
+        super().__init__(
+            f"Insufficient stock for medication {medication_id}. Available: {available}, Required: {required}"
+        )
+        self.medication_id = medication_id
+        self.available = available
+        self.required = required
+
+
+# Rows are locked in id order before being updated, so concurrent confirmations
+# touching overlapping medications always acquire locks in the same order and
+# cannot deadlock. The stock check and decrement happen in the same statement.
+#
+# When a reservation is given, its hold rows are consumed in the same statement:
+# held units are already set aside in medications.reserved, so they only need to
+# be moved out of both stock and reserved. Only quantities beyond the hold are
+# checked against unreserved stock. An expired or unknown reservation simply
+# holds nothing, which makes this a plain checked decrement.
+DECREMENT_STOCK_SQL = text("""
+    WITH requested AS (
+        SELECT id, quantity
+        FROM unnest(CAST(:ids AS integer[]), CAST(:quantities AS integer[])) AS r(id, quantity)
+    ),
+    held AS (
+        DELETE FROM stock_reservations
+        WHERE reservation_id = :reservation_id AND expires_at > now()
+        RETURNING medication_id, quantity
+    ),
+    held_totals AS (
+        SELECT medication_id AS id, sum(quantity)::integer AS quantity
+        FROM held
+        GROUP BY medication_id
+    ),
+    changes AS (
+        SELECT coalesce(r.id, h.id) AS id,
+               coalesce(r.quantity, 0) AS required,
+               coalesce(h.quantity, 0) AS held
+        FROM requested r
+        FULL OUTER JOIN held_totals h ON h.id = r.id
+    ),
+    locked AS (
+        SELECT m.id
+        FROM medications m
+        WHERE m.id IN (SELECT id FROM changes)
+        ORDER BY m.id
+        FOR UPDATE
+    )
+    UPDATE medications m
+    SET stock = m.stock - c.required,
+        reserved = m.reserved - c.held
+    FROM changes c, locked l
+    WHERE m.id = c.id
+      AND l.id = m.id
+      AND m.stock - m.reserved + c.held >= c.required
+    RETURNING m.id, m.stock - m.reserved AS available
+""")
+
+RESERVE_STOCK_SQL = text("""
+    WITH requested AS (
+        SELECT id, quantity
+        FROM unnest(CAST(:ids AS integer[]), CAST(:quantities AS integer[])) AS r(id, quantity)
+    ),
+    locked AS (
+        SELECT m.id
+        FROM medications m
+        WHERE m.id = ANY(CAST(:ids AS integer[]))
+        ORDER BY m.id
+        FOR UPDATE
+    )
+    UPDATE medications m
+    SET reserved = m.reserved + r.quantity
+    FROM requested r, locked l
+    WHERE m.id = r.id
+      AND l.id = m.id
+      AND m.stock - m.reserved >= r.quantity
+    RETURNING m.id, m.stock - m.reserved AS available
+""")
+
+INSERT_RESERVATIONS_SQL = text("""
+    INSERT INTO stock_reservations (reservation_id, medication_id, quantity, expires_at)
+    SELECT :reservation_id, id, quantity, now() + make_interval(secs => :ttl_seconds)
+    FROM unnest(CAST(:ids AS integer[]), CAST(:quantities AS integer[])) AS r(id, quantity)
+    RETURNING expires_at
+""")
+
+# Removes holds and gives their units back in one statement. Expired holds are
+# found through the expires_at index, so the sweep stays cheap however many
+# reservations exist.
+RELEASE_RESERVATIONS_SQL = """
+    WITH released AS (
+        DELETE FROM stock_reservations
+        WHERE {condition}
+        RETURNING medication_id, quantity
+    ),
+    totals AS (
+        SELECT medication_id AS id, sum(quantity)::integer AS quantity
+        FROM released
+        GROUP BY medication_id
+    ),
+    locked AS (
+        SELECT m.id
+        FROM medications m
+        WHERE m.id IN (SELECT id FROM totals)
+        ORDER BY m.id
+        FOR UPDATE
+    )
+    UPDATE medications m
+    SET reserved = m.reserved - t.quantity
+    FROM totals t, locked l
+    WHERE m.id = t.id
+      AND l.id = m.id
+    RETURNING m.id, m.stock - m.reserved AS available
+"""
+
+EXPIRE_RESERVATIONS_SQL = text(RELEASE_RESERVATIONS_SQL.format(condition="expires_at <= now()"))
+CANCEL_RESERVATION_SQL = text(RELEASE_RESERVATIONS_SQL.format(condition="reservation_id = :reservation_id"))
+
+
+def _current_availability(db: Session, ids) -> Dict[int, int]:
+    """Read unreserved stock for medications (locked by the caller's transaction)."""
+    return dict(db.execute(
+        text("SELECT id, stock - reserved FROM medications WHERE id = ANY(CAST(:ids AS integer[]))"),
+        {"ids": list(ids)}
+    ).all())
+
+
+def _raise_for_missing(db: Session, quantities: Dict[int, int], updated: Dict[int, int]) -> None:
+    """Raise InsufficientStockError for the first requested medication the update skipped."""
+    missing = [med_id for med_id in sorted(quantities) if med_id not in updated]
+    if not missing:
+        return
+
+    available = _current_availability(db, missing)
+    med_id = missing[0]
+    raise InsufficientStockError(med_id, available.get(med_id, 0), quantities[med_id])
+
+
+def decrement_stock(db: Session, quantities: Dict[int, int], reservation_id: Optional[str] = None) -> Dict[int, int]:
+    """
+    Atomically check and decrement stock for several medications.
+
+    Either every medication has enough stock and all are decremented, or
+    InsufficientStockError is raised and the caller must roll back.
+
+    Args:
+        db: Database session (the caller owns the transaction)
+        quantities: Medication ID to quantity to take
+        reservation_id: Optional hold to consume instead of rechecking stock
+
+    Returns:
+        Medication ID to remaining unreserved stock
+
+    Raises:
+        InsufficientStockError: If any medication has less stock than required
+    """
+    if not quantities:
+        return {}
+
+    ids = sorted(quantities)
+    rows = db.execute(
+        DECREMENT_STOCK_SQL,
+        {
+            "ids": ids,
+            "quantities": [quantities[med_id] for med_id in ids],
+            "reservation_id": reservation_id
+        }
+    ).all()
+    available = {row.id: row.available for row in rows}
+
+    _raise_for_missing(db, quantities, available)
+    return available
+
+
+def audit_stock_decrement(
+    quantities: Dict[int, int],
+    available: Dict[int, int],
+    prescription_id: int,
+    reservation_id: Optional[str] = None
+) -> None:
+    """
+    Record a committed stock decrement in the audit log (call from the event loop).
+
+    Args:
+        quantities: Medication ID to quantity taken
+        available: Medication ID to remaining unreserved stock, as returned by decrement_stock
+        prescription_id: Prescription the stock was taken for
+        reservation_id: Hold that was consumed, if any
+    """
+    taken = ", ".join(
+        f"#{med_id} -{quantities[med_id]} ({available.get(med_id, 0)} left)"
+        for med_id in sorted(quantities)
+    )
+    source = f" from reservation {reservation_id}" if reservation_id else ""
+    audit_logger.log(SOURCE_INVENTORY, f"Stock decremented{source}: {taken}", prescription_id=prescription_id)
+
+
+def reserve_stock(db: Session, quantities: Dict[int, int], ttl_seconds: int) -> Tuple[str, datetime, Dict[int, int]]:
+    """
+    Hold stock for several medications until a deadline.
+
+    Held units are added to medications.reserved and are not available to other
+    kiosks until the hold is consumed, cancelled or expires.
+
+    Args:
+        db: Database session (the caller owns the transaction)
+        quantities: Medication ID to quantity to hold
+        ttl_seconds: Lifetime of the hold
+
+    Returns:
+        Tuple of (reservation ID, expiry time, medication ID to remaining unreserved stock)
+
+    Raises:
+        InsufficientStockError: If any medication has less unreserved stock than required
+    """
+    ids = sorted(quantities)
+    params = {"ids": ids, "quantities": [quantities[med_id] for med_id in ids]}
+
+    rows = db.execute(RESERVE_STOCK_SQL, params).all()
+    available = {row.id: row.available for row in rows}
+    _raise_for_missing(db, quantities, available)
+
+    reservation_id = str(uuid.uuid4())
+    expires_at = db.execute(
+        INSERT_RESERVATIONS_SQL,
+        {**params, "reservation_id": reservation_id, "ttl_seconds": ttl_seconds}
+    ).scalars().first()
+
+    return reservation_id, expires_at, available
+
+
+def cancel_reservation(db: Session, reservation_id: str) -> Dict[int, int]:
+    """
+    Release a hold before it expires.
+
+    Args:
+        db: Database session (the caller owns the transaction)
+        reservation_id: Hold to release
+
+    Returns:
+        Medication ID to remaining unreserved stock, empty if the hold did not exist
+    """
+    rows = db.execute(CANCEL_RESERVATION_SQL, {"reservation_id": reservation_id}).all()
+    return {row.id: row.available for row in rows}
+
+
+def expire_reservations(db: Session) -> Dict[int, int]:
+    """
+    Release every expired hold in one statement.
+
+    Args:
+        db: Database session (the caller owns the transaction)
+
+    Returns:
+        Medication ID to remaining unreserved stock, for medications that changed
+    """
+    rows = db.execute(EXPIRE_RESERVATIONS_SQL).all()
+    return {row.id: row.available for row in rows}
+
+
+def _release_expired_reservations() -> int:
+    """Expire stale holds in a fresh session and refresh search stock levels."""
+    with SessionLocal() as db:
+        available = expire_reservations(db)
+        db.commit()
+    
+    vector_store_manager.update_stock_levels(available)
+    return len(available)
+
+
+def _purge_idempotency_keys() -> int:
+    """Delete expired idempotency keys in a fresh session."""
+    with SessionLocal() as db:
+        purged = purge_expired_keys(db, settings.idempotency_key_retention_hours)
+        db.commit()
+    return purged
+
+
+async def run_reservation_sweeper(interval_seconds: int) -> None:
+    """
+    Periodically release expired reservations and purge expired idempotency keys until cancelled.
+    
+    Args:
+        interval_seconds: Seconds between sweeps
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            released = await asyncio.to_thread(_release_expired_reservations)
+            if released:
+                logger.info("Released expired reservations for %d medications", released)
+                audit_logger.log(SOURCE_INVENTORY, f"Released expired reservations for {released} medications")
+        except Exception as e:
+            logger.exception("Error releasing expired reservations: %s", e)
+            audit_logger.log(SOURCE_INVENTORY, f"Releasing expired reservations failed: {e}", "error")
+        if settings.db_pgbouncer_mode and vector_store_manager.is_initialized():
+            # Without stock notifications, stock sold out through other
+            # workers only reaches this worker's search filter here
+            try:
+                await asyncio.to_thread(vector_store_manager.refresh_stock_levels)
+            except Exception as e:
+                logger.exception("Error refreshing stock levels: %s", e)
+        try:
+            purged = await asyncio.to_thread(_purge_idempotency_keys)
+            if purged:
+                logger.info("Purged %d expired idempotency keys", purged)
+        except Exception as e:
+            logger.exception("Error purging idempotency keys: %s", e)
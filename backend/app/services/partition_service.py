@@ -0,0 +1,290 @@
+"""
+Partition Service for time-partitioned history tables.
+This service creates monthly partitions ahead of time, detaches expired ones and moves old prescriptions to the archive tables.
+"""
+
+import re
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Tables partitioned by RANGE (created_at), one partition per month named
+# <table>_YYYY_MM, plus <table>_default (see init.sql)
+PARTITIONED_TABLES = (
+    "usage_logs",
+    "prescriptions_archive",
+    "prescription_doses_archive",
+    "prescription_supportings_archive"
+)
+
+ARCHIVE_TABLES = PARTITIONED_TABLES[1:]
+
+PARTITION_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+LIST_PARTITIONS_SQL = text("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:table AS regclass)
+    ORDER BY c.relname
+""")
+
+# Oldest first, so an interrupted run leaves a contiguous archived range
+SELECT_ARCHIVE_BATCH_SQL = text("""
+    SELECT id, created_at
+    FROM prescriptions
+    WHERE created_at < :before
+    ORDER BY created_at, id
+    LIMIT :batch_size
+""")
+
+LOCK_ARCHIVE_BATCH_SQL = text("""
+    SELECT id
+    FROM prescriptions
+    WHERE id = ANY(:ids) AND created_at < :before
+    ORDER BY id
+    FOR UPDATE
+""")
+
+# Line items first: deleting the prescriptions would cascade to them
+ARCHIVE_DOSES_SQL = text("""
+    WITH moved AS (
+        DELETE FROM prescription_doses d
+        USING prescriptions p
+        WHERE d.prescription_id = p.id AND p.id = ANY(:ids)
+        RETURNING d.id, d.prescription_id, d.medication_id, d.quantity_per_dose,
+                  d.dose_time, d.special_instructions, p.created_at
+    )
+    INSERT INTO prescription_doses_archive
+        (id, prescription_id, medication_id, quantity_per_dose, dose_time, special_instructions, created_at)
+    SELECT * FROM moved
+""")
+
+ARCHIVE_SUPPORTINGS_SQL = text("""
+    WITH moved AS (
+        DELETE FROM prescription_supportings s
+        USING prescriptions p
+        WHERE s.prescription_id = p.id AND p.id = ANY(:ids)
+        RETURNING s.id, s.prescription_id, s.medication_id, s.quantity_total,
+                  s.usage_instructions, p.created_at
+    )
+    INSERT INTO prescription_supportings_archive
+        (id, prescription_id, medication_id, quantity_total, usage_instructions, created_at)
+    SELECT * FROM moved
+""")
+
+ARCHIVE_PRESCRIPTIONS_SQL = text("""
+    WITH moved AS (
+        DELETE FROM prescriptions
+        WHERE id = ANY(:ids)
+        RETURNING id, patient_id, created_at, doses_per_day, days, total_price,
+                  status, diagnosis, ai_recommendation, pharmacist_notes
+    )
+    INSERT INTO prescriptions_archive
+        (id, patient_id, created_at, doses_per_day, days, total_price,
+         status, diagnosis, ai_recommendation, pharmacist_notes)
+    SELECT * FROM moved
+""")
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing value."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month a number of months after (or before) month."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Name of the partition of table holding month."""
+    return f"{table}_{month:%Y_%m}"
+
+
+def _check_table(table: str) -> None:
+    # Table names are interpolated into DDL, so only known names are accepted
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Not a partitioned table: {table}")
+
+
+def ensure_partition(db: Session, table: str, month: date) -> bool:
+    """
+    Create and attach the partition of table for one month, if missing.
+
+    Rows of that month already caught by the default partition are moved into
+    the new partition first. Commits.
+
+    Args:
+        db: Database session
+        table: One of PARTITIONED_TABLES
+        month: Any day of the month
+
+    Returns:
+        True if the partition was created
+    """
+    _check_table(table)
+    month = month_start(month)
+    name = partition_name(table, month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+
+    # Serializes workers and maintenance runs creating the same partitions
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {"table": table})
+    if db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None:
+        db.commit()
+        return False
+
+    # Keeps rows of this month out of the default partition until the new
+    # partition is attached; writes to other partitions are not blocked
+    db.execute(text(f"LOCK TABLE {table}_default IN ACCESS EXCLUSIVE MODE"))
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {table}_default
+            WHERE created_at >= '{start}' AND created_at < '{end}'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """))
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    db.commit()
+    return True
+
+
+def ensure_partitions(db: Session, tables: Sequence[str], first_month: date, last_month: date) -> List[str]:
+    """
+    Create missing monthly partitions for a range of months.
+
+    Args:
+        db: Database session
+        tables: Partitioned tables to extend
+        first_month: First month (any day of it)
+        last_month: Last month, inclusive (any day of it)
+
+    Returns:
+        Names of the partitions created
+    """
+    created = []
+    for table in tables:
+        month = month_start(first_month)
+        while month <= last_month:
+            if ensure_partition(db, table, month):
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def split_default_partition(db: Session, table: str) -> List[str]:
+    """
+    Move every month found in the default partition of table into its own partition.
+
+    Rows reach the default partition when maintenance has not run ahead of
+    time, or from before the table was partitioned. Until moved, they can only
+    be removed by row-by-row deletes.
+
+    Args:
+        db: Database session
+        table: One of PARTITIONED_TABLES
+
+    Returns:
+        Names of the partitions created
+    """
+    _check_table(table)
+    months = db.scalars(text(
+        f"SELECT DISTINCT CAST(date_trunc('month', created_at) AS date) FROM {table}_default ORDER BY 1"
+    )).all()
+    db.commit()
+    return [partition_name(table, month) for month in months if ensure_partition(db, table, month)]
+
+
+def premake_usage_log_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create usage_logs partitions for this month and the next months_ahead.
+
+    Run at startup and by the maintenance CLI, so audit log inserts always land
+    in a small monthly partition rather than the default one.
+
+    Args:
+        db: Database session
+        months_ahead: Months after the current one (default: settings.partition_premake_months)
+
+    Returns:
+        Names of the partitions created
+    """
+    if months_ahead is None:
+        months_ahead = settings.partition_premake_months
+    this_month = month_start(date.today())
+    return ensure_partitions(db, ["usage_logs"], this_month, add_months(this_month, months_ahead))
+
+
+def detach_expired_partitions(db: Session, table: str, before: date, drop: bool = False) -> List[str]:
+    """
+    Detach the monthly partitions of table that end on or before a month.
+
+    Detaching only updates the catalog, whatever the partition's size. Detached
+    partitions stay as standalone tables for dumping, unless dropped.
+
+    Args:
+        db: Database session
+        table: One of PARTITIONED_TABLES
+        before: Partitions for months before this month are detached
+        drop: Drop the detached tables
+
+    Returns:
+        Names of the detached partitions
+    """
+    _check_table(table)
+    before = month_start(before)
+    detached = []
+    for name in db.scalars(LIST_PARTITIONS_SQL, {"table": table}).all():
+        match = PARTITION_SUFFIX.search(name)
+        if match is None or date(int(match.group(1)), int(match.group(2)), 1) >= before:
+            continue
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        detached.append(name)
+    return detached
+
+
+def archive_prescriptions(db: Session, before: datetime, batch_size: Optional[int] = None) -> int:
+    """
+    Move one batch of prescriptions created before a cutoff to the archive tables.
+
+    The prescriptions and their line items move in one transaction, so a
+    prescription is always entirely live or entirely archived. Usage logs and
+    the consumption rollup keep referring to archived prescriptions by ID.
+    Call repeatedly until it returns 0.
+
+    Args:
+        db: Database session
+        before: Archive prescriptions created before this time
+        batch_size: Prescriptions per batch (default: settings.archive_batch_size)
+
+    Returns:
+        Number of prescriptions archived
+    """
+    batch_size = batch_size or settings.archive_batch_size
+    batch = db.execute(SELECT_ARCHIVE_BATCH_SQL, {"before": before, "batch_size": batch_size}).all()
+    if not batch:
+        db.commit()
+        return 0
+
+    # Archived rows go straight to their month's partition; created in their own
+    # short transactions before the batch takes its row locks
+    ensure_partitions(db, ARCHIVE_TABLES, batch[0].created_at.date(), batch[-1].created_at.date())
+
+    ids = db.scalars(LOCK_ARCHIVE_BATCH_SQL, {"ids": [row.id for row in batch], "before": before}).all()
+    if ids:
+        params = {"ids": list(ids)}
+        db.execute(ARCHIVE_DOSES_SQL, params)
+        db.execute(ARCHIVE_SUPPORTINGS_SQL, params)
+        db.execute(ARCHIVE_PRESCRIPTIONS_SQL, params)
+    db.commit()
+    return len(ids)
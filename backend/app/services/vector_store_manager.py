@@ -3,13 +3,25 @@ Vector Store Manager for initializing and managing medical vector stores.
 This service handles the lifecycle of vector stores and database synchronization.
 """
 
-from typing import List
+import asyncio
+import fcntl
+import logging
+from typing import IO, List, Optional
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.database.session import get_db
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.database.session import get_read_db
 from app.models.medication import Medication
 from app.models.symptom import Symptom
+from app.core.tracing import tracer
 from app.services.vector_store_service import medical_vector_store
 
+logger = logging.getLogger(__name__)
+
+# Read from the primary: a lagging replica would bring back stock that was just sold
+STOCK_LEVELS_SQL = text("SELECT id, stock - reserved AS available FROM medications")
+
 
 class VectorStoreManager:
     """Manager for medical vector store operations."""
@@ -18,6 +30,7 @@ class VectorStoreManager:
         """Initialize the vector store manager."""
         self.vector_store = medical_vector_store
         self.initialized = False
+        self._stock_refresh_task: Optional[asyncio.Task] = None
     
     async def initialize(self, db: Session = None) -> bool:
         """
@@ -29,17 +42,67 @@ class VectorStoreManager:
         Returns:
             True if initialization successful, False otherwise
         """
+        if self.is_initialized():
+            # Already loaded, e.g. by the gunicorn master before forking
+            return True
+        
         try:
             # Try loading existing stores first
-            if self.vector_store.load_existing_stores():
-                print("Vector stores loaded from existing files")
-                self.initialized = True
+            if await asyncio.to_thread(self.load_existing):
                 return True
             
-            # Create new stores from database
+            # Only one worker builds missing stores; the others wait for it and
+            # load its files
+            lock_file = await asyncio.to_thread(self._lock_builds)
+            try:
+                if await asyncio.to_thread(self.load_existing):
+                    return True
+                return await self._build_from_db(db)
+            finally:
+                self._unlock_builds(lock_file)
+            
+        except Exception as e:
+            logger.exception("Error initializing vector stores: %s", e)
+            return False
+    
+    def load_existing(self) -> bool:
+        """
+        Load vector stores saved on disk, without building missing ones.
+        
+        The embedding model is not loaded, so this is safe in the gunicorn
+        master before workers are forked.
+        
+        Returns:
+            True if at least one store was loaded, False otherwise
+        """
+        if self.is_initialized():
+            return True
+        
+        if self.vector_store.load_existing_stores():
+            logger.info("Vector stores loaded from existing files")
+            self.initialized = True
+            return True
+        return False
+    
+    def _lock_builds(self) -> IO:
+        """Block until no other process is building the stores, then hold the build lock."""
+        path = self.vector_store.vector_store_path
+        path.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path / ".build.lock", "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+    
+    def _unlock_builds(self, lock_file: IO) -> None:
+        """Release the build lock taken by _lock_builds."""
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+    
+    async def _build_from_db(self, db: Session = None) -> bool:
+        """Create the stores from the database (with the build lock held)."""
+        try:
             if db is None:
                 # Get a database session
-                db_gen = get_db()
+                db_gen = get_read_db()  # Full-table reads go to the replica, if any
                 db = next(db_gen)
                 try:
                     success = await self._create_stores_from_db(db)
@@ -50,14 +113,14 @@ class VectorStoreManager:
             
             if success:
                 self.initialized = True
-                print("Vector stores initialized successfully")
+                logger.info("Vector stores initialized successfully")
             else:
-                print("Failed to initialize vector stores")
+                logger.error("Failed to initialize vector stores")
             
             return success
             
         except Exception as e:
-            print(f"Error initializing vector stores: {e}")
+            logger.exception("Error creating stores from database: %s", e)
             return False
     
     async def _create_stores_from_db(self, db: Session) -> bool:
@@ -66,23 +129,23 @@ class VectorStoreManager:
             # Get all medications from database
             medications = db.query(Medication).all()
             if medications:
-                self.vector_store.create_medication_embeddings(medications)
-                print(f"Created embeddings for {len(medications)} medications")
+                await asyncio.to_thread(self.vector_store.create_medication_embeddings, medications)
+                logger.info("Created embeddings for %d medications", len(medications))
             else:
-                print("No medications found in database")
+                logger.warning("No medications found in database")
             
             # Get all symptoms from database
             symptoms = db.query(Symptom).all()
             if symptoms:
-                self.vector_store.create_symptom_embeddings(symptoms)
-                print(f"Created embeddings for {len(symptoms)} symptoms")
+                await asyncio.to_thread(self.vector_store.create_symptom_embeddings, symptoms)
+                logger.info("Created embeddings for %d symptoms", len(symptoms))
             else:
-                print("No symptoms found in database")
+                logger.warning("No symptoms found in database")
             
             return len(medications) > 0 or len(symptoms) > 0
             
         except Exception as e:
-            print(f"Error creating stores from database: {e}")
+            logger.exception("Error creating stores from database: %s", e)
             return False
     
     async def rebuild_stores(self, db: Session = None) -> bool:
@@ -96,26 +159,30 @@ class VectorStoreManager:
             True if rebuild successful, False otherwise
         """
         try:
-            print("Rebuilding vector stores from database...")
+            logger.info("Rebuilding vector stores from database")
             
-            if db is None:
-                db_gen = get_db()
-                db = next(db_gen)
-                try:
+            lock_file = await asyncio.to_thread(self._lock_builds)
+            try:
+                if db is None:
+                    db_gen = get_read_db()  # Full-table reads go to the replica, if any
+                    db = next(db_gen)
+                    try:
+                        success = await self._create_stores_from_db(db)
+                    finally:
+                        db.close()
+                else:
                     success = await self._create_stores_from_db(db)
-                finally:
-                    db.close()
-            else:
-                success = await self._create_stores_from_db(db)
+            finally:
+                self._unlock_builds(lock_file)
             
             if success:
                 self.initialized = True
-                print("Vector stores rebuilt successfully")
+                logger.info("Vector stores rebuilt successfully")
             
             return success
             
         except Exception as e:
-            print(f"Error rebuilding vector stores: {e}")
+            logger.exception("Error rebuilding vector stores: %s", e)
             return False
     
     def is_initialized(self) -> bool:
@@ -138,7 +205,7 @@ class VectorStoreManager:
             List of medication recommendations
         """
         if not self.is_initialized():
-            print("Vector stores not initialized")
+            logger.warning("Vector stores not initialized")
             return []
         
         return self.vector_store.search_relevant_medications(
@@ -159,14 +226,81 @@ class VectorStoreManager:
         Returns:
             Formatted context string for AI prompt
         """
+        with tracer.start_as_current_span("vector_store.get_vector_context_for_prompt") as span:
+            span.set_attribute("patient.allergies", len(allergies or []))
+            if not self.is_initialized():
+                span.set_attribute("vector_store.initialized", False)
+                return ""
+            
+            context = self.vector_store.get_treatment_context(
+                symptoms=symptoms,
+                patient_allergies=allergies or []
+            )
+            span.set_attribute("vector_context.chars", len(context))
+            return context
+    
+    def get_vector_contexts_for_prompts(self, symptoms_list: List[str], allergies_list: List[List[str]] = None) -> List[str]:
+        """
+        Get vector search context for many prompts with one batched embedding call.
+        
+        Args:
+            symptoms_list: Symptoms per case
+            allergies_list: Allergies per case
+            
+        Returns:
+            Formatted context strings aligned with symptoms_list
+        """
         if not self.is_initialized():
-            return ""
+            return ["" for _ in symptoms_list]
         
-        return self.vector_store.get_treatment_context(
-            symptoms=symptoms,
-            patient_allergies=allergies or []
+        return self.vector_store.get_treatment_context_batch(
+            symptoms_list=symptoms_list,
+            allergies_list=allergies_list
         )
     
+    def update_stock_levels(self, stock_levels: dict) -> None:
+        """
+        Refresh available stock in search metadata after stock or reservation changes.
+        
+        Args:
+            stock_levels: Medication ID to currently available (unreserved) stock
+        """
+        if stock_levels:
+            self.vector_store.update_stock_levels(stock_levels)
+    
+    def refresh_stock_levels(self) -> int:
+        """
+        Reload available stock for every medication from the database.
+        
+        Returns:
+            Number of medications read
+        """
+        with SessionLocal() as db:
+            rows = db.execute(STOCK_LEVELS_SQL).all()
+        self.update_stock_levels({row.id: row.available for row in rows})
+        return len(rows)
+    
+    def schedule_stock_refresh(self) -> None:
+        """
+        Reload stock levels shortly, unless a reload is already pending (call from the event loop).
+        
+        Registered as a catalog stock change callback, so a medication sold out
+        or restocked through any worker reaches the in-stock filter of every
+        worker.
+        """
+        if not self.is_initialized():
+            return
+        if self._stock_refresh_task is not None and not self._stock_refresh_task.done():
+            return
+        self._stock_refresh_task = asyncio.get_running_loop().create_task(self._delayed_stock_refresh())
+    
+    async def _delayed_stock_refresh(self) -> None:
+        await asyncio.sleep(settings.stock_refresh_delay_seconds)
+        try:
+            await asyncio.to_thread(self.refresh_stock_levels)
+        except Exception as e:
+            logger.exception("Error refreshing stock levels: %s", e)
+    
     async def update_medication_embeddings(self, medications: List[Medication]) -> bool:
         """
         Update vector store with new/modified medications.
@@ -185,7 +319,7 @@ class VectorStoreManager:
             return True
             
         except Exception as e:
-            print(f"Error updating medication embeddings: {e}")
+            logger.exception("Error updating medication embeddings: %s", e)
             return False
     
     def get_store_stats(self) -> dict:
@@ -3,17 +3,51 @@ Vector Store Service for medical knowledge retrieval.
 This service handles embedding generation and semantic search for medications and symptoms.
 """
 
+import logging
 import pickle
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TYPE_CHECKING
 from pathlib import Path
 
-from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-
+from app.core.config import settings
+from app.core.tracing import tracer
 from app.models.medication import Medication
 from app.models.symptom import Symptom
 
+logger = logging.getLogger(__name__)
+
+# LangChain, FAISS and the HuggingFace model are heavy to import, so they are
+# imported on first use instead of at module import time.
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+
+def _deferred_embeddings(store: "MedicalVectorStore") -> "Embeddings":
+    """
+    Embeddings that load the store's model on first use.
+    
+    FAISS.load_local needs an embeddings object but only calls it to embed
+    queries, so indexes loaded with this one can be loaded (e.g. by the gunicorn
+    master) without constructing the model.
+    
+    Args:
+        store: Vector store whose embedding model is used
+        
+    Returns:
+        Embeddings delegating to store.embeddings
+    """
+    from langchain_core.embeddings import Embeddings
+    
+    class DeferredEmbeddings(Embeddings):
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            return store.embeddings.embed_documents(texts)
+        
+        def embed_query(self, text: str) -> List[float]:
+            return store.embeddings.embed_query(text)
+    
+    return DeferredEmbeddings()
+
 
 class MedicalVectorStore:
     """Vector store for medical knowledge using FAISS and SentenceTransformers."""
@@ -28,24 +62,62 @@ class MedicalVectorStore:
         """
         self.embedding_model_name = embedding_model_name
         self.vector_store_path = Path(vector_store_path)
-        self.vector_store_path.mkdir(parents=True, exist_ok=True)
         
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model_name,
-            model_kwargs={'device': 'cpu'}
-        )
+        # Embedding model, loaded lazily (see the embeddings property)
+        self._embeddings: Optional["HuggingFaceEmbeddings"] = None
         
         # Vector store instances
-        self.medication_store: Optional[FAISS] = None
-        self.symptom_store: Optional[FAISS] = None
-        self.knowledge_store: Optional[FAISS] = None
+        self.medication_store: Optional["FAISS"] = None
+        self.symptom_store: Optional["FAISS"] = None
+        self.knowledge_store: Optional["FAISS"] = None
         
         # Metadata storage
         self.medication_metadata: Dict[int, Dict] = {}
         self.symptom_metadata: Dict[int, Dict] = {}
+        self._metadata_index: Optional[Dict[int, Dict]] = None  # medication ID -> metadata
         
-        print(f"Initialized MedicalVectorStore with model: {embedding_model_name}")
+        logger.debug("Initialized MedicalVectorStore with model: %s", embedding_model_name)
+    
+    @property
+    def embeddings(self) -> "HuggingFaceEmbeddings":
+        """Embedding model, loaded on first access."""
+        if self._embeddings is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            
+            self._embeddings = HuggingFaceEmbeddings(
+                model_name=self.embedding_model_name,
+                model_kwargs={'device': 'cpu'}
+            )
+            logger.info("Loaded embedding model: %s", self.embedding_model_name)
+        return self._embeddings
+    
+    def is_model_loaded(self) -> bool:
+        """Check if the embedding model has been loaded."""
+        return self._embeddings is not None
+    
+    def warm_up(self) -> None:
+        """Load the embedding model and run one embedding so the first request is fast."""
+        self.embeddings.embed_query("warm up")
+    
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many search queries in one batched model call.
+        
+        The vectors are the ones embed_query returns: HuggingFaceEmbeddings encodes
+        queries with query_encode_kwargs (falling back to encode_kwargs), which
+        embed_documents ignores, so its batch encoder is called with the query
+        settings. Other embedding classes embed the queries one by one.
+        
+        Args:
+            texts: Query texts
+            
+        Returns:
+            One vector per text
+        """
+        embeddings = self.embeddings
+        if not hasattr(embeddings, "query_encode_kwargs"):
+            return [embeddings.embed_query(text) for text in texts]
+        return embeddings._embed(texts, embeddings.query_encode_kwargs or embeddings.encode_kwargs)
     
     def create_medication_embeddings(self, medications: List[Medication]) -> None:
         """
@@ -55,11 +127,15 @@ class MedicalVectorStore:
             medications: List of medication objects from database
         """
         if not medications:
-            print("No medications provided for embedding creation")
+            logger.warning("No medications provided for embedding creation")
             return
         
+        from langchain_core.documents import Document
+        from langchain_community.vectorstores import FAISS
+        
         documents = []
         metadata_list = []
+        self._metadata_index = None
         
         for idx, med in enumerate(medications):
             # Create comprehensive text representation for each medication
@@ -74,7 +150,7 @@ class MedicalVectorStore:
                     "active_ingredient": med.active_ingredient,
                     "treatment_class": med.treatment_class,
                     "is_supporting": med.is_supporting,
-                    "stock": med.stock,
+                    "stock": med.available_stock,
                     "type": "medication"
                 }
             )
@@ -90,7 +166,7 @@ class MedicalVectorStore:
                 "form": med.form,
                 "unit_type": med.unit_type,
                 "unit_price": med.unit_price,
-                "stock": med.stock,
+                "stock": med.available_stock,
                 "side_effects": med.side_effects,
                 "max_per_day": med.max_per_day,
                 "is_supporting": med.is_supporting,
@@ -105,7 +181,7 @@ class MedicalVectorStore:
         # Save to disk
         self._save_medication_store()
         
-        print(f"Created medication embeddings for {len(medications)} medications")
+        logger.info("Created medication embeddings for %d medications", len(medications))
     
     def create_symptom_embeddings(self, symptoms: List[Symptom]) -> None:
         """
@@ -115,9 +191,12 @@ class MedicalVectorStore:
             symptoms: List of symptom objects from database
         """
         if not symptoms:
-            print("No symptoms provided for embedding creation")
+            logger.warning("No symptoms provided for embedding creation")
             return
         
+        from langchain_core.documents import Document
+        from langchain_community.vectorstores import FAISS
+        
         documents = []
         
         for idx, symptom in enumerate(symptoms):
@@ -145,7 +224,7 @@ class MedicalVectorStore:
         # Save to disk
         self._save_symptom_store()
         
-        print(f"Created symptom embeddings for {len(symptoms)} symptoms")
+        logger.info("Created symptom embeddings for %d symptoms", len(symptoms))
     
     def _create_medication_text(self, med: Medication) -> str:
         """Create comprehensive text representation for medication."""
@@ -183,54 +262,135 @@ class MedicalVectorStore:
             List of relevant medication metadata
         """
         if not self.medication_store:
-            print("Medication store not initialized")
+            logger.warning("Medication store not initialized")
             return []
         
-        exclude_allergies = exclude_allergies or []
-        
         try:
             # Perform semantic search
-            search_results = self.medication_store.similarity_search_with_score(
-                query=f"Điều trị triệu chứng: {symptoms}",
-                k=k * 2  # Get more results for filtering
-            )
+            with tracer.start_as_current_span("vector_store.embedding") as span:
+                span.set_attribute("embedding.texts", 1)
+                vector = self.embeddings.embed_query(self._medication_query(symptoms))
             
-            relevant_meds = []
-            for doc, score in search_results:
-                med_id = doc.metadata["id"]
-                
-                # Find metadata by medication ID
-                med_metadata = None
-                for metadata in self.medication_metadata.values():
-                    if metadata["id"] == med_id:
-                        med_metadata = metadata.copy()
-                        med_metadata["relevance_score"] = float(1 - score)  # Convert distance to similarity
-                        break
-                
-                if not med_metadata:
-                    continue
-                
-                # Apply filters
-                if filter_in_stock and med_metadata["stock"] <= 0:
-                    continue
-                
-                # Check allergies
-                if exclude_allergies and med_metadata.get("allergy_tags"):
-                    if any(allergy.lower() in [tag.lower() for tag in med_metadata["allergy_tags"]] 
-                           for allergy in exclude_allergies):
-                        continue
-                
-                relevant_meds.append(med_metadata)
-                
-                if len(relevant_meds) >= k:
-                    break
+            with tracer.start_as_current_span("vector_store.faiss_search") as span:
+                span.set_attribute("search.k", k)
+                span.set_attribute("search.fetch_k", k * 2)
+                search_results = self.medication_store.similarity_search_with_score_by_vector(
+                    embedding=vector,
+                    k=k * 2  # Get more results for filtering
+                )
+                relevant_meds = self._filter_medication_results(search_results, k, filter_in_stock, exclude_allergies or [])
+                span.set_attribute("search.hits", len(search_results))
+                span.set_attribute("search.results", len(relevant_meds))
             
             return relevant_meds
             
         except Exception as e:
-            print(f"Error in medication search: {e}")
+            logger.exception("Error in medication search: %s", e)
             return []
     
+    def search_relevant_medications_batch(self, symptoms_list: List[str], k: int = 10, filter_in_stock: bool = True, exclude_allergies_list: List[List[str]] = None) -> List[List[Dict]]:
+        """
+        Search for relevant medications for many symptom strings at once.
+        
+        All queries are embedded in a single batched model call, which is much
+        cheaper than embedding them one by one.
+        
+        Args:
+            symptoms_list: Symptoms string per case
+            k: Number of top results to return per case
+            filter_in_stock: Only return medications in stock
+            exclude_allergies_list: Allergic substances to exclude, per case
+            
+        Returns:
+            List of relevant medication metadata lists, aligned with symptoms_list
+        """
+        if not self.medication_store:
+            logger.warning("Medication store not initialized")
+            return [[] for _ in symptoms_list]
+        
+        exclude_allergies_list = exclude_allergies_list or [[] for _ in symptoms_list]
+        
+        try:
+            with tracer.start_as_current_span("vector_store.embedding") as span:
+                span.set_attribute("embedding.texts", len(symptoms_list))
+                query_vectors = self._embed_queries(
+                    [self._medication_query(symptoms) for symptoms in symptoms_list]
+                )
+            
+            results = []
+            with tracer.start_as_current_span("vector_store.faiss_search") as span:
+                span.set_attribute("search.k", k)
+                span.set_attribute("search.fetch_k", k * 2)
+                span.set_attribute("search.queries", len(query_vectors))
+                for vector, exclude_allergies in zip(query_vectors, exclude_allergies_list):
+                    search_results = self.medication_store.similarity_search_with_score_by_vector(
+                        embedding=vector,
+                        k=k * 2
+                    )
+                    results.append(
+                        self._filter_medication_results(search_results, k, filter_in_stock, exclude_allergies or [])
+                    )
+            
+            return results
+            
+        except Exception as e:
+            logger.exception("Error in batch medication search: %s", e)
+            return [[] for _ in symptoms_list]
+    
+    def update_stock_levels(self, stock_levels: Dict[int, int]) -> None:
+        """
+        Update the stock used for in-stock filtering without re-embedding.
+        
+        Args:
+            stock_levels: Medication ID to currently available (unreserved) stock
+        """
+        metadata_by_id = self._medication_metadata_by_id()
+        for med_id, stock in stock_levels.items():
+            if med_id in metadata_by_id:
+                metadata_by_id[med_id]["stock"] = stock
+    
+    def _medication_query(self, symptoms: str) -> str:
+        """Build the search query text for a symptoms string."""
+        return f"Điều trị triệu chứng: {symptoms}"
+    
+    def _filter_medication_results(self, search_results: List, k: int, filter_in_stock: bool, exclude_allergies: List[str]) -> List[Dict]:
+        """Attach metadata to raw search hits and apply stock/allergy filters."""
+        metadata_by_id = self._medication_metadata_by_id()
+        excluded = [allergy.lower() for allergy in exclude_allergies]
+        
+        relevant_meds = []
+        for doc, score in search_results:
+            metadata = metadata_by_id.get(doc.metadata["id"])
+            if not metadata:
+                continue
+            
+            # Apply filters
+            if filter_in_stock and metadata["stock"] <= 0:
+                continue
+            
+            # Check allergies
+            if excluded and metadata.get("allergy_tags"):
+                tags = [tag.lower() for tag in metadata["allergy_tags"]]
+                if any(allergy in tags for allergy in excluded):
+                    continue
+            
+            med_metadata = metadata.copy()
+            med_metadata["relevance_score"] = float(1 - score)  # Convert distance to similarity
+            relevant_meds.append(med_metadata)
+            
+            if len(relevant_meds) >= k:
+                break
+        
+        return relevant_meds
+    
+    def _medication_metadata_by_id(self) -> Dict[int, Dict]:
+        """Index medication metadata by medication ID, rebuilt after metadata changes."""
+        if self._metadata_index is None:
+            self._metadata_index = {
+                metadata["id"]: metadata for metadata in self.medication_metadata.values()
+            }
+        return self._metadata_index
+    
     def search_similar_symptoms(self, symptoms: str, k: int = 5) -> List[Dict]:
         """
         Search for similar symptoms in the database.
@@ -243,7 +403,7 @@ class MedicalVectorStore:
             List of similar symptom metadata
         """
         if not self.symptom_store:
-            print("Symptom store not initialized")
+            logger.warning("Symptom store not initialized")
             return []
         
         try:
@@ -264,17 +424,28 @@ class MedicalVectorStore:
             return similar_symptoms
             
         except Exception as e:
-            print(f"Error in symptom search: {e}")
+            logger.exception("Error in symptom search: %s", e)
             return []
     
     def load_existing_stores(self) -> bool:
         """
         Load existing vector stores from disk.
         
+        Only the indexes and metadata are read; the embedding model is loaded
+        on the first query (or by warm_up).
+        
         Returns:
-            True if stores loaded successfully, False otherwise
+            True if at least one store was loaded, False otherwise
         """
         try:
+            import faiss
+            from langchain_community.vectorstores import FAISS
+            
+            # A read-only mapping is shared by all workers through the page cache;
+            # rebuilds replace the stores rather than modifying them
+            io_flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if settings.faiss_mmap else 0
+            embeddings = _deferred_embeddings(self)
+            
             # Load medication store
             med_store_path = self.vector_store_path / "medication_store"
             med_metadata_path = self.vector_store_path / "medication_metadata.pkl"
@@ -282,14 +453,16 @@ class MedicalVectorStore:
             if med_store_path.exists() and med_metadata_path.exists():
                 self.medication_store = FAISS.load_local(
                     str(med_store_path), 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
+                    embeddings,
+                    allow_dangerous_deserialization=True,
+                    io_flags=io_flags
                 )
                 
                 with open(med_metadata_path, 'rb') as f:
                     self.medication_metadata = pickle.load(f)
+                self._metadata_index = None
                 
-                print("Loaded existing medication vector store")
+                logger.info("Loaded existing medication vector store")
             
             # Load symptom store
             symptom_store_path = self.vector_store_path / "symptom_store"
@@ -298,24 +471,26 @@ class MedicalVectorStore:
             if symptom_store_path.exists() and symptom_metadata_path.exists():
                 self.symptom_store = FAISS.load_local(
                     str(symptom_store_path), 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
+                    embeddings,
+                    allow_dangerous_deserialization=True,
+                    io_flags=io_flags
                 )
                 
                 with open(symptom_metadata_path, 'rb') as f:
                     self.symptom_metadata = pickle.load(f)
                 
-                print("Loaded existing symptom vector store")
+                logger.info("Loaded existing symptom vector store")
             
-            return True
+            return self.medication_store is not None or self.symptom_store is not None
             
         except Exception as e:
-            print(f"Error loading existing stores: {e}")
+            logger.exception("Error loading existing stores: %s", e)
             return False
     
     def _save_medication_store(self) -> None:
         """Save medication vector store to disk."""
         if self.medication_store:
+            self.vector_store_path.mkdir(parents=True, exist_ok=True)
             med_store_path = self.vector_store_path / "medication_store"
             self.medication_store.save_local(str(med_store_path))
             
@@ -327,6 +502,7 @@ class MedicalVectorStore:
     def _save_symptom_store(self) -> None:
         """Save symptom vector store to disk."""
         if self.symptom_store:
+            self.vector_store_path.mkdir(parents=True, exist_ok=True)
             symptom_store_path = self.vector_store_path / "symptom_store"
             self.symptom_store.save_local(str(symptom_store_path))
             
@@ -353,6 +529,30 @@ class MedicalVectorStore:
             exclude_allergies=patient_allergies or []
         )
         
+        return self._format_treatment_context(relevant_meds)
+    
+    def get_treatment_context_batch(self, symptoms_list: List[str], allergies_list: List[List[str]] = None) -> List[str]:
+        """
+        Get treatment context for many cases, sharing one batched embedding call.
+        
+        Args:
+            symptoms_list: Symptoms per case
+            allergies_list: Patient allergies per case
+            
+        Returns:
+            Formatted context strings aligned with symptoms_list
+        """
+        results = self.search_relevant_medications_batch(
+            symptoms_list=symptoms_list,
+            k=8,
+            filter_in_stock=True,
+            exclude_allergies_list=allergies_list
+        )
+        
+        return [self._format_treatment_context(relevant_meds) for relevant_meds in results]
+    
+    def _format_treatment_context(self, relevant_meds: List[Dict]) -> str:
+        """Format search results as a context block for the AI prompt."""
         if not relevant_meds:
             return ""
         
@@ -0,0 +1,80 @@
+"""
+Benchmark: database round trips and latency per /confirm_prescription call.
+
+Runs against the database in DATABASE_URL (use a disposable database seeded from
+init.sql; every confirmation decrements stock).
+
+Usage:
+    python -m benchmarks.confirm_prescription_roundtrips --items 10 --iterations 50
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database.connection import SessionLocal, async_engine
+from app.main import app
+from app.models.medication import Medication
+
+
+def build_request(medications, doses_per_day: int = 2, total_days: int = 1) -> dict:
+    """Build a confirm request using half the medications as main, half as supporting."""
+    half = max(1, len(medications) // 2)
+    return {
+        "patient_data": {"gender": "male", "age": 30, "weight": 65, "height": 170},
+        "main_medicines": [
+            {"name": med.name, "quantity_per_dose": 1, "reason": "benchmark"}
+            for med in medications[:half]
+        ],
+        "supporting_medicines": [
+            {"name": med.name, "quantity_total": 1, "reason": "benchmark"}
+            for med in medications[half:]
+        ],
+        "doses_per_day": doses_per_day,
+        "total_days": total_days
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=10, help="Medications per prescription")
+    parser.add_argument("--iterations", type=int, default=50, help="Confirmations to run")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        medications = db.query(Medication).filter(
+            Medication.stock >= args.iterations * 10
+        ).order_by(Medication.id).limit(args.items).all()
+    payload = build_request(medications)
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies = []
+    round_trips = []
+    with TestClient(app) as client:
+        for _ in range(args.iterations):
+            statements.clear()
+            started = time.perf_counter()
+            response = client.post("/api/v1/confirm_prescription", json=payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+            round_trips.append(len(statements))
+
+    latencies.sort()
+    print(f"Items per prescription: {len(medications)}")
+    print(f"Round trips per confirmation: {statistics.mean(round_trips):.1f} "
+          f"(min {min(round_trips)}, max {max(round_trips)})")
+    print(f"Latency ms: mean={statistics.mean(latencies):.1f} "
+          f"p50={latencies[len(latencies) // 2]:.1f} "
+          f"p95={latencies[int(len(latencies) * 0.95)]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: database endpoint throughput and event-loop lag while slow LLM calls are in flight.
+
+Drives the app in-process on one event loop, as a single uvicorn worker would:
+simulated LLM calls (awaiting --llm-latency seconds, like a Gemini request)
+run alongside medication listings. --mode sync serves the listing through a
+synchronous Session, as the endpoints did before the async engine; --mode async
+uses the async session dependency. --db-latency adds a server-side pg_sleep to
+each listing to model a remote database.
+
+Keep --concurrency below the sync pool limit (15) in sync mode: a sync Session
+waiting for a pooled connection blocks the loop that would return one.
+
+Usage:
+    python -m benchmarks.event_loop_blocking --mode sync --requests 300
+    python -m benchmarks.event_loop_blocking --mode async --requests 300
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.connection import async_engine
+from app.database.session import get_async_db, get_db
+from app.main import app
+from app.models.medication import Medication
+
+
+def register_routes(llm_latency: float, db_latency: float) -> None:
+    """Add the benchmark-only routes to the app."""
+
+    @app.get("/bench/llm")
+    async def simulated_llm():
+        await asyncio.sleep(llm_latency)
+        return {"ok": True}
+
+    @app.get("/bench/medications/sync")
+    async def list_medications_sync(db: Session = Depends(get_db)):
+        if db_latency:
+            db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": db_latency})
+        return len(db.query(Medication).filter(Medication.stock - Medication.reserved > 0).all())
+
+    @app.get("/bench/medications/async")
+    async def list_medications_async(db: AsyncSession = Depends(get_async_db)):
+        if db_latency:
+            await db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": db_latency})
+        return len((await db.scalars(
+            select(Medication).filter(Medication.stock - Medication.reserved > 0)
+        )).all())
+
+
+def percentile(values, p: float) -> float:
+    """Nearest-rank percentile of a list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+async def monitor_loop_lag(lags: list, stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Record how late the event loop wakes a sleeping task."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run(args) -> None:
+    register_routes(args.llm_latency, args.db_latency / 1000)
+    path = f"/bench/medications/{args.mode}"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Open pool connections before timing
+        await asyncio.gather(*[client.get(path) for _ in range(args.concurrency)])
+
+        stop = asyncio.Event()
+        lags, llm_latencies, db_latencies = [], [], []
+        remaining = iter(range(args.requests))
+
+        async def db_worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(path)
+                db_latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        async def llm_worker():
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = await client.get("/bench/llm")
+                llm_latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        monitor = asyncio.create_task(monitor_loop_lag(lags, stop))
+        llm_tasks = [asyncio.create_task(llm_worker()) for _ in range(args.llm_calls)]
+
+        started = time.perf_counter()
+        await asyncio.gather(*[db_worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await asyncio.gather(monitor, *llm_tasks)
+
+    await async_engine.dispose()
+
+    print(f"Mode: {args.mode}  requests={args.requests} concurrency={args.concurrency} "
+          f"llm_calls={args.llm_calls} llm_latency={args.llm_latency}s db_latency={args.db_latency}ms")
+    print(f"Listing throughput: {args.requests / elapsed:.1f} req/s")
+    print(f"Listing latency ms: mean={statistics.mean(db_latencies):.1f} "
+          f"p50={percentile(db_latencies, 0.50):.1f} p99={percentile(db_latencies, 0.99):.1f}")
+    print(f"Simulated LLM latency ms: p50={percentile(llm_latencies, 0.50):.1f} "
+          f"p99={percentile(llm_latencies, 0.99):.1f} (ideal {args.llm_latency * 1000:.0f})")
+    print(f"Event loop lag ms: p50={percentile(lags, 0.50):.1f} "
+          f"p99={percentile(lags, 0.99):.1f} max={max(lags):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["sync", "async"], default="async", help="Session type for the listing")
+    parser.add_argument("--requests", type=int, default=300, help="Listing requests to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent listing clients")
+    parser.add_argument("--llm-calls", type=int, default=16, help="Concurrent simulated LLM calls")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--db-latency", type=float, default=5.0, help="Added database latency in milliseconds")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,571 @@
+"""
+Load test: the kiosk customer journey end to end, against a running server.
+
+Simulated kiosks repeat the flow a customer goes through: POST /patients,
+POST /analyze_input, POST /confirm_prescription, then GET /prescriptions/{id}
+for the receipt, pausing between screens for a think time. A scenario file
+(benchmarks/scenarios/*.json) sets the number of kiosks, ramp-up, think times,
+how often customers walk away before paying, the weighted mix of symptoms and
+the thresholds the run must meet.
+
+By default the production server (gunicorn.conf.py) is started serving
+benchmarks.stub_llm:app, the app with a simulated LLM injected in place of
+Gemini, so analyses go through retrieval, admission control and output parsing
+with a simulated model latency. The report gives throughput, error
+and shed rates and p50/p95/p99 per step, and checks stock consistency: the stock
+taken from each medication equals both what the confirmations reported and the
+prescription lines written, and no stock or reservation went negative.
+
+Runs against the database in DATABASE_URL (use a disposable database seeded from
+init.sql); stock taken by the run is put back afterwards unless --keep-stock.
+With --base-url, the server there must use the same database and serve
+benchmarks.stub_llm:app.
+
+The process exits with status 1 when a threshold, the --baseline comparison or
+the stock check fails, so it can gate a CI job.
+
+Usage:
+    python -m benchmarks.kiosk_flow --scenario benchmarks/scenarios/steady.json
+    python -m benchmarks.kiosk_flow --kiosks 4 --duration 30 --report kiosk_flow.json
+    python -m benchmarks.kiosk_flow --baseline kiosk_flow.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal
+from benchmarks.worker_scaling import start_server
+
+SCENARIO_DIR = Path(__file__).resolve().parent / "scenarios"
+
+STEPS = ("patient", "analyze", "confirm", "receipt")
+
+# Retries of a confirmation lost in transit, sent with the same Idempotency-Key
+CONFIRM_RETRIES = 2
+
+
+@dataclass
+class StepResult:
+    """Outcomes and latencies of one step across all sessions."""
+
+    latencies: List[float] = field(default_factory=list)  # Successful requests, seconds
+    outcomes: Counter = field(default_factory=Counter)
+    error_samples: List[str] = field(default_factory=list)
+
+    def record(self, outcome: str, latency: float, detail: str = "") -> None:
+        self.outcomes[outcome] += 1
+        if outcome == "ok":
+            self.latencies.append(latency)
+        elif outcome == "error" and len(self.error_samples) < 5:
+            self.error_samples.append(detail)
+
+
+@dataclass
+class RunState:
+    """What the kiosks observed, shared between them."""
+
+    steps: Dict[str, StepResult] = field(default_factory=lambda: {step: StepResult() for step in STEPS})
+    sessions: Counter = field(default_factory=Counter)
+    sold: Counter = field(default_factory=Counter)  # Units per medication name, from confirm responses
+    prescription_ids: List[int] = field(default_factory=list)
+
+
+def load_scenario(args: argparse.Namespace) -> dict:
+    """Read the scenario file and apply command-line overrides."""
+    path = Path(args.scenario)
+    if not path.exists() and (SCENARIO_DIR / f"{args.scenario}.json").exists():
+        path = SCENARIO_DIR / f"{args.scenario}.json"
+    scenario = json.loads(path.read_text(encoding="utf-8"))
+
+    if args.kiosks is not None:
+        scenario["kiosks"] = args.kiosks
+    if args.duration is not None:
+        scenario["duration_seconds"] = args.duration
+    if args.think_time is not None:
+        scenario["think_time_seconds"] = {"min": args.think_time[0], "max": args.think_time[1]}
+    if args.llm_latency_ms is not None:
+        scenario["llm_latency_ms"] = args.llm_latency_ms
+    return scenario
+
+
+def pause(rng: random.Random, bounds: dict) -> float:
+    """A random pause in seconds between the scenario's bounds."""
+    return rng.uniform(bounds["min"], bounds["max"])
+
+
+def new_customer(rng: random.Random, scenario: dict) -> dict:
+    """A customer drawn from the symptom mix, with random body measurements."""
+    profile = rng.choices(scenario["symptom_mix"], weights=[p["weight"] for p in scenario["symptom_mix"]])[0]
+    age = profile.get("age", [18, 70])
+    return {
+        "profile": profile["name"],
+        "symptoms": profile["symptoms"],
+        "gender": rng.choice(("male", "female")),
+        "age": rng.randint(age[0], age[1]),
+        "height": rng.randint(150, 185),
+        "weight": rng.randint(45, 90),
+        "allergies": profile.get("allergies", []),
+        "underlying_conditions": profile.get("underlying_conditions", [])
+    }
+
+
+async def timed_request(
+    client: httpx.AsyncClient,
+    state: RunState,
+    step: str,
+    method: str,
+    url: str,
+    expected: tuple = (),
+    **kwargs
+) -> Optional[httpx.Response]:
+    """
+    Send one request of a step and record its outcome.
+
+    Args:
+        client: HTTP client
+        state: Shared run state
+        step: Step name
+        method: HTTP method
+        url: Request path
+        expected: (status, outcome) pairs of non-2xx answers that are not errors
+        **kwargs: Passed to client.request
+
+    Returns:
+        The response if it was successful, None otherwise
+    """
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        state.steps[step].record("error", time.perf_counter() - started, f"{type(e).__name__}: {e}")
+        return None
+    latency = time.perf_counter() - started
+
+    if response.is_success:
+        state.steps[step].record("ok", latency)
+        return response
+    for status, outcome in expected:
+        if response.status_code == status:
+            state.steps[step].record(outcome, latency)
+            return None
+    state.steps[step].record("error", latency, f"{response.status_code}: {response.text[:200]}")
+    return None
+
+
+async def confirm(client: httpx.AsyncClient, state: RunState, body: dict, kiosk_id: str) -> Optional[dict]:
+    """Confirm a prescription, retrying transport failures with the same Idempotency-Key."""
+    headers = {"X-Kiosk-ID": kiosk_id, "Idempotency-Key": uuid.uuid4().hex}
+    for attempt in range(CONFIRM_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/confirm_prescription", json=body, headers=headers)
+        except httpx.TransportError as e:
+            if attempt < CONFIRM_RETRIES:
+                state.steps["confirm"].outcomes["retried"] += 1
+                continue
+            state.steps["confirm"].record("error", time.perf_counter() - started, f"{type(e).__name__}: {e}")
+            return None
+        latency = time.perf_counter() - started
+        if response.is_success:
+            state.steps["confirm"].record("ok", latency)
+            return response.json()
+        if response.status_code == 400 and "Insufficient stock" in response.text:
+            state.steps["confirm"].record("out_of_stock", latency)
+        else:
+            state.steps["confirm"].record("error", latency, f"{response.status_code}: {response.text[:200]}")
+        return None
+
+
+async def session(client: httpx.AsyncClient, state: RunState, scenario: dict, rng: random.Random, kiosk_id: str) -> None:
+    """One customer at a kiosk, from entering their details to the receipt."""
+    customer = new_customer(rng, scenario)
+    think = scenario["think_time_seconds"]
+    state.sessions["started"] += 1
+    state.sessions[f"profile:{customer['profile']}"] += 1
+    patient_data = {
+        name: customer[name]
+        for name in ("gender", "age", "weight", "height", "allergies", "underlying_conditions")
+    }
+
+    response = await timed_request(client, state, "patient", "POST", "/api/v1/patients", json=patient_data)
+    if response is None:
+        return
+    await asyncio.sleep(pause(rng, think))
+
+    response = await timed_request(
+        client, state, "analyze", "POST", "/api/v1/analyze_input",
+        expected=((429, "shed"), (503, "shed")),
+        json={**patient_data, "symptoms": customer["symptoms"]},
+        headers={"X-Kiosk-ID": kiosk_id}
+    )
+    if response is None:
+        return
+    analysis = response.json()
+    if not analysis["main_medicines"]:
+        state.sessions["no_recommendation"] += 1
+        return
+    await asyncio.sleep(pause(rng, think))
+    if rng.random() < scenario.get("abandon_rate", 0.0):
+        state.sessions["abandoned"] += 1
+        return
+
+    confirmation = await confirm(client, state, {
+        "main_medicines": analysis["main_medicines"],
+        "supporting_medicines": analysis["supporting_medicines"],
+        "doses_per_day": analysis["doses_per_day"],
+        "total_days": analysis["total_days"],
+        "patient_data": patient_data,
+        "diagnosis": analysis["diagnosis"],
+        "ai_recommendation": analysis["recommendation_reasoning"],
+        "severity_level": analysis["severity_level"],
+        "side_effects_warning": analysis["side_effects_warning"],
+        "medical_advice": analysis["medical_advice"],
+        "emergency_status": analysis["emergency_status"],
+        "should_see_doctor": analysis["should_see_doctor"],
+        "disclaimer": analysis["disclaimer"]
+    }, kiosk_id)
+    if confirmation is None:
+        return
+    state.sessions["purchased"] += 1
+    state.prescription_ids.append(confirmation["prescription_id"])
+    for item in confirmation["items"]:
+        state.sold[item["name"]] += item["total_quantity"]
+
+    response = await timed_request(
+        client, state, "receipt", "GET", f"/api/v1/prescriptions/{confirmation['prescription_id']}"
+    )
+    if response is None:
+        return
+    receipt = response.json()
+    receipt_lines = Counter()
+    for dose in receipt["doses"]:
+        receipt_lines[dose["medication_name"]] += dose["total_quantity"]
+    for supporting in receipt["supportings"]:
+        receipt_lines[supporting["medication_name"]] += supporting["quantity_total"]
+    confirmed_lines = Counter()
+    for item in confirmation["items"]:
+        confirmed_lines[item["name"]] += item["total_quantity"]
+    if receipt["total_price"] != confirmation["total_price"] or receipt_lines != confirmed_lines:
+        state.steps["receipt"].outcomes["mismatch"] += 1
+        state.steps["receipt"].error_samples.append(
+            f"prescription {receipt['id']}: receipt differs from confirmation"
+        )
+    state.sessions["completed"] += 1
+
+
+async def kiosk(client: httpx.AsyncClient, state: RunState, scenario: dict, index: int, seed: int, deadline: float) -> None:
+    """Serve customers one after another until the deadline; the last session is finished."""
+    rng = random.Random(seed * 1000 + index)
+    kiosk_id = f"loadtest-{index:03d}"
+    await asyncio.sleep(scenario.get("ramp_up_seconds", 0) * index / scenario["kiosks"])
+    while time.monotonic() < deadline:
+        await session(client, state, scenario, rng, kiosk_id)
+        await asyncio.sleep(pause(rng, scenario.get("idle_between_sessions_seconds", {"min": 0, "max": 0})))
+
+
+async def drive(base_url: str, scenario: dict, seed: int) -> tuple:
+    """Run all kiosks for the scenario's duration; returns the run state and elapsed seconds."""
+    state = RunState()
+    limits = httpx.Limits(max_connections=scenario["kiosks"], max_keepalive_connections=scenario["kiosks"])
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        deadline = started + scenario["duration_seconds"]
+        await asyncio.gather(*(
+            kiosk(client, state, scenario, index, seed, deadline) for index in range(scenario["kiosks"])
+        ))
+        elapsed = time.monotonic() - started
+    return state, elapsed
+
+
+async def wait_ready(base_url: str, server: Optional[object], timeout: float) -> None:
+    """Poll /ready until consecutive answers (possibly from different workers) are all 200."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                statuses = [(await client.get("/ready")).status_code for _ in range(8)]
+                if all(status == 200 for status in statuses):
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout}s")
+
+
+def stock_snapshot() -> dict:
+    """Stock and reservations per medication, and the last prescription ID."""
+    with SessionLocal() as db:
+        rows = db.execute(text("SELECT id, name, stock, reserved FROM medications")).all()
+        last_prescription_id = db.execute(text("SELECT COALESCE(MAX(id), 0) FROM prescriptions")).scalar()
+    return {
+        "medications": {row.id: {"name": row.name, "stock": row.stock, "reserved": row.reserved} for row in rows},
+        "last_prescription_id": last_prescription_id
+    }
+
+
+def recorded_sales(after_prescription_id: int) -> tuple:
+    """Units per medication ID and number of prescriptions written after a prescription ID."""
+    with SessionLocal() as db:
+        sold = dict(db.execute(text("""
+            SELECT medication_id, SUM(quantity) FROM (
+                SELECT d.medication_id, d.quantity_per_dose * p.doses_per_day * p.days AS quantity
+                FROM prescription_doses d JOIN prescriptions p ON p.id = d.prescription_id
+                WHERE p.id > :last_id
+                UNION ALL
+                SELECT s.medication_id, s.quantity_total AS quantity
+                FROM prescription_supportings s
+                WHERE s.prescription_id > :last_id
+            ) lines
+            GROUP BY medication_id
+        """), {"last_id": after_prescription_id}).all())
+        prescriptions = db.execute(
+            text("SELECT COUNT(*) FROM prescriptions WHERE id > :last_id"), {"last_id": after_prescription_id}
+        ).scalar()
+    return {med_id: int(quantity) for med_id, quantity in sold.items()}, prescriptions
+
+
+def check_stock(before: dict, after: dict, state: RunState) -> dict:
+    """
+    Compare stock taken during the run with confirmations and prescription lines.
+
+    Assumes the run's kiosks are the only clients confirming prescriptions.
+
+    Args:
+        before: stock_snapshot() before the run
+        after: stock_snapshot() after the run
+        state: Run state with the confirmed items
+
+    Returns:
+        Dictionary with the consistency verdict, the problems found and the units sold per medication ID
+    """
+    db_sold, db_prescriptions = recorded_sales(before["last_prescription_id"])
+    ids_by_name = {med["name"]: med_id for med_id, med in before["medications"].items()}
+    client_sold = Counter({ids_by_name.get(name, name): quantity for name, quantity in state.sold.items()})
+
+    problems = []
+    if db_prescriptions != len(set(state.prescription_ids)):
+        problems.append(f"{db_prescriptions} prescriptions written, {len(set(state.prescription_ids))} confirmed")
+    for med_id in sorted(set(before["medications"]) | set(after["medications"]), key=str):
+        if med_id not in after["medications"] or med_id not in before["medications"]:
+            problems.append(f"medication {med_id} added or removed during the run")
+            continue
+        old, new = before["medications"][med_id], after["medications"][med_id]
+        taken = old["stock"] - new["stock"]
+        if new["stock"] < 0 or new["reserved"] < 0 or new["reserved"] > new["stock"]:
+            problems.append(f"{new['name']}: stock={new['stock']} reserved={new['reserved']}")
+        if taken != db_sold.get(med_id, 0) or taken != client_sold.get(med_id, 0):
+            problems.append(
+                f"{new['name']}: stock taken {taken}, prescription lines {db_sold.get(med_id, 0)}, "
+                f"confirmed {client_sold.get(med_id, 0)}"
+            )
+    return {"consistent": not problems, "problems": problems, "sold": db_sold}
+
+
+def restore_stock(sold: Dict[int, int]) -> None:
+    """Put back the units the run took."""
+    with SessionLocal() as db:
+        for med_id, quantity in sold.items():
+            db.execute(
+                text("UPDATE medications SET stock = stock + :quantity WHERE id = :id"),
+                {"quantity": quantity, "id": med_id}
+            )
+        db.commit()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values, in milliseconds."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def build_report(scenario: dict, state: RunState, elapsed: float, stock: dict) -> dict:
+    """Summarize a run as a JSON-serializable report."""
+    steps = {}
+    for name, result in state.steps.items():
+        latencies = sorted(result.latencies)
+        requests = sum(count for outcome, count in result.outcomes.items() if outcome not in ("retried", "mismatch"))
+        steps[name] = {
+            "requests": requests,
+            "ok": result.outcomes["ok"],
+            "errors": result.outcomes["error"] + result.outcomes["mismatch"],
+            "shed": result.outcomes["shed"],
+            "out_of_stock": result.outcomes["out_of_stock"],
+            "retried": result.outcomes["retried"],
+            "error_rate": (result.outcomes["error"] + result.outcomes["mismatch"]) / requests if requests else 0.0,
+            "shed_rate": result.outcomes["shed"] / requests if requests else 0.0,
+            "requests_per_second": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+            "error_samples": result.error_samples
+        }
+
+    requests = sum(step["requests"] for step in steps.values())
+    errors = sum(step["errors"] for step in steps.values())
+    return {
+        "scenario": scenario["name"],
+        "kiosks": scenario["kiosks"],
+        "duration_seconds": scenario["duration_seconds"],
+        "elapsed_seconds": elapsed,
+        "sessions": dict(state.sessions),
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "sessions_per_minute": state.sessions["started"] * 60 / elapsed,
+        "error_rate": errors / requests if requests else 0.0,
+        "steps": steps,
+        "stock": {"consistent": stock["consistent"], "problems": stock["problems"]}
+    }
+
+
+def check_thresholds(report: dict, thresholds: dict) -> List[str]:
+    """Threshold violations of a run, as messages."""
+    violations = []
+    if "max_error_rate" in thresholds and report["error_rate"] > thresholds["max_error_rate"]:
+        violations.append(f"error rate {report['error_rate']:.2%} > {thresholds['max_error_rate']:.2%}")
+    if "max_shed_rate" in thresholds:
+        shed_rate = report["steps"]["analyze"]["shed_rate"]
+        if shed_rate > thresholds["max_shed_rate"]:
+            violations.append(f"analyze shed rate {shed_rate:.2%} > {thresholds['max_shed_rate']:.2%}")
+    if "min_sessions_per_minute" in thresholds and report["sessions_per_minute"] < thresholds["min_sessions_per_minute"]:
+        violations.append(f"{report['sessions_per_minute']:.1f} sessions/min < {thresholds['min_sessions_per_minute']}")
+    for metric in ("p50_ms", "p95_ms", "p99_ms"):
+        for step, limit in thresholds.get(metric, {}).items():
+            value = report["steps"][step][metric]
+            if value > limit:
+                violations.append(f"{step} {metric[:-3]} {value:.0f} ms > {limit} ms")
+    return violations
+
+
+def compare_baseline(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions against an earlier report: slower percentiles, lower throughput, more errors."""
+    regressions = []
+    for step, current in report["steps"].items():
+        previous = baseline["steps"].get(step)
+        if not previous or not current["ok"] or not previous["ok"]:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{step} {metric[:-3]} {current[metric]:.0f} ms vs baseline {previous[metric]:.0f} ms"
+                )
+    if report["requests_per_second"] < baseline["requests_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"{report['requests_per_second']:.2f} req/s vs baseline {baseline['requests_per_second']:.2f} req/s"
+        )
+    # Error rates are compared in absolute terms: a relative tolerance on 0% allows nothing
+    if report["error_rate"] > baseline["error_rate"] + 0.01:
+        regressions.append(f"error rate {report['error_rate']:.2%} vs baseline {baseline['error_rate']:.2%}")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    """Print the per-step table and the session summary."""
+    print(
+        f"\n{report['requests']} requests in {report['elapsed_seconds']:.1f}s "
+        f"({report['requests_per_second']:.2f} req/s, {report['sessions_per_minute']:.1f} sessions/min)"
+    )
+    print(
+        f"{'step':>8} {'requests':>9} {'req/s':>7} {'errors':>7} {'err %':>6} {'shed':>5} {'no stock':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for name, step in report["steps"].items():
+        print(
+            f"{name:>8} {step['requests']:>9} {step['requests_per_second']:>7.2f} {step['errors']:>7} "
+            f"{step['error_rate'] * 100:>6.2f} {step['shed']:>5} {step['out_of_stock']:>8} "
+            f"{step['p50_ms']:>8.1f} {step['p95_ms']:>8.1f} {step['p99_ms']:>8.1f} {step['max_ms']:>8.1f}"
+        )
+        for sample in step["error_samples"]:
+            print(f"{'':>10}{sample}")
+
+    sessions = report["sessions"]
+    print(
+        f"Sessions: {sessions.get('started', 0)} started, {sessions.get('purchased', 0)} purchased, "
+        f"{sessions.get('abandoned', 0)} abandoned, {sessions.get('no_recommendation', 0)} without recommendation"
+    )
+    print("Stock consistent" if report["stock"]["consistent"] else "Stock INCONSISTENT")
+    for problem in report["stock"]["problems"]:
+        print(f"  {problem}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end kiosk flow load test with stock consistency check.")
+    parser.add_argument("--scenario", default=str(SCENARIO_DIR / "steady.json"), help="Scenario file or name")
+    parser.add_argument("--kiosks", type=int, help="Override the scenario's kiosk count")
+    parser.add_argument("--duration", type=float, help="Override the scenario's duration, seconds")
+    parser.add_argument("--think-time", type=float, nargs=2, metavar=("MIN", "MAX"), help="Override think times, seconds")
+    parser.add_argument("--llm-latency-ms", type=int, help="Override the stub LLM latency of a started server")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the customers' random choices")
+    parser.add_argument("--base-url", help="Test a running server (stub LLM app, same database) instead of starting one")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers of a started server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--app", default="benchmarks.stub_llm:app", help="ASGI application to serve (with the stub LLM)")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--report", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="Fail on regressions against this earlier report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    parser.add_argument("--keep-stock", action="store_true", help="Do not put back the stock the run took")
+    args = parser.parse_args()
+
+    scenario = load_scenario(args)
+    print(
+        f"scenario={scenario['name']} kiosks={scenario['kiosks']} duration={scenario['duration_seconds']}s "
+        f"think={scenario['think_time_seconds']['min']}-{scenario['think_time_seconds']['max']}s "
+        f"abandon={scenario.get('abandon_rate', 0.0):.0%} llm={scenario.get('llm_latency_ms', '-')}ms"
+    )
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        os.environ["STUB_LLM_LATENCY_MS"] = str(scenario.get("llm_latency_ms", 800))
+        server = start_server(args.workers, args.port, args.app)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        asyncio.run(wait_ready(base_url, server, args.ready_timeout))
+        before = stock_snapshot()
+        state, elapsed = asyncio.run(drive(base_url, scenario, args.seed))
+    finally:
+        if server is not None:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=60)
+
+    after = stock_snapshot()
+    stock = check_stock(before, after, state)
+    if not args.keep_stock:
+        restore_stock(stock["sold"])
+
+    report = build_report(scenario, state, elapsed, stock)
+    report["violations"] = check_thresholds(report, scenario.get("thresholds", {}))
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["violations"] += compare_baseline(report, baseline, args.tolerance)
+    print_report(report)
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    for violation in report["violations"]:
+        print(f"FAIL: {violation}")
+    if report["violations"] or not report["stock"]["consistent"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark: request latency with print() diagnostics versus the queue-based logger.
+
+Each mode runs in a child process whose stdout is a pipe drained by this process
+at a limited rate, like a log collector that falls behind under load. Inside
+the child, concurrent clients call an ASGI app (in-process, via httpx) whose
+endpoint writes a few diagnostic lines and then awaits simulated I/O:
+
+- print: print() lines plus a printed access line, as before (writes block the
+  event loop once the pipe is full)
+- sync-json: stdlib logging with a plain StreamHandler, JSON formatted on the
+  event loop
+- queue: app.core.logging (RequestContextMiddleware, JSON written by the
+  background listener; records are dropped when the queue is full)
+
+Usage:
+    python -m benchmarks.logging_overhead --concurrency 64 --duration 10 --sink-rate 262144
+    python -m benchmarks.logging_overhead --sink-rate 0   # drain stdout as fast as possible
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MODES = ("print", "sync-json", "queue")
+
+# Diagnostic lines written per request besides the access line
+LINES_PER_REQUEST = 3
+
+
+def build_app(mode: str, service_time: float):
+    """ASGI app whose endpoint logs like the retrieval hot path, then waits for I/O."""
+    from fastapi import FastAPI
+
+    logger = logging.getLogger("benchmarks.logging_overhead")
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work(k: int = 8):
+        for line in range(LINES_PER_REQUEST):
+            if mode == "print":
+                print(f"Searching medications: k={k} step={line} symptoms=đau đầu, sốt nhẹ")
+            else:
+                logger.info("Searching medications: k=%d step=%d symptoms=%s", k, line, "đau đầu, sốt nhẹ")
+        await asyncio.sleep(service_time)
+        return {"k": k}
+
+    if mode == "print":
+        async def print_access_log(scope, receive, send):
+            # What uvicorn's default access log amounts to: one synchronous write per request
+            await app(scope, receive, send)
+            if scope["type"] == "http":
+                print(f'127.0.0.1 - "{scope["method"]} {scope["path"]} HTTP/1.1" 200')
+        return print_access_log
+
+    from app.core.logging import RequestContextMiddleware
+    app.add_middleware(RequestContextMiddleware, log_access=True)
+    return app
+
+
+def configure_child_logging(mode: str) -> None:
+    """Set up the logging a mode measures."""
+    if mode == "queue":
+        from app.core.logging import configure_logging
+        configure_logging()
+    elif mode == "sync-json":
+        from app.core.logging import JsonFormatter, RequestContextFilter
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        handler.addFilter(RequestContextFilter())
+        logging.getLogger().handlers = [handler]
+        logging.getLogger().setLevel(logging.INFO)
+
+
+async def drive(app, concurrency: int, duration: float) -> dict:
+    """Call the app from concurrent clients for a fixed time; also sample event loop lag."""
+    import httpx
+
+    latencies: List[float] = []
+    lags: List[float] = []
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await client.get("/work")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def lag_monitor() -> None:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.monotonic()
+        await asyncio.gather(lag_monitor(), *(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_lag_ms": lags[-1] * 1000 if lags else 0.0
+    }
+
+
+def run_child(mode: str, concurrency: int, duration: float, service_time: float) -> None:
+    """Measure one mode; logs go to stdout, the result to stderr as JSON."""
+    configure_child_logging(mode)
+    app = build_app(mode, service_time)
+    result = asyncio.run(drive(app, concurrency, duration))
+
+    if mode == "queue":
+        from app.core.logging import get_log_stats
+        result["dropped"] = get_log_stats()["dropped"]
+    sys.stderr.write(json.dumps(result) + "\n")
+    sys.stderr.flush()
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    """Run a mode in a child process, draining its stdout at the sink rate."""
+    child = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.logging_overhead", "--child", mode,
+            "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+            "--service-ms", str(args.service_ms)
+        ],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    log_bytes = 0
+    started = time.monotonic()
+    while True:
+        chunk = child.stdout.read1(65536)
+        if not chunk:
+            break
+        log_bytes += len(chunk)
+        if args.sink_rate > 0:
+            # Hold back until the collector would have caught up with what it has read
+            time.sleep(max(0.0, log_bytes / args.sink_rate - (time.monotonic() - started)))
+
+    child.wait()
+    output = child.stderr.read().decode().strip().splitlines()
+    results = [line for line in output if line.startswith("{")]
+    if child.returncode != 0 or not results:
+        raise RuntimeError(f"{mode} run failed:\n" + "\n".join(output))
+    result = json.loads(results[-1])
+    result["log_mb"] = log_bytes / 1024 / 1024
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare request latency with print() and queue-based logging.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--service-ms", type=float, default=20.0, help="Simulated I/O time per request")
+    parser.add_argument("--sink-rate", type=int, default=256 * 1024, help="Bytes/s the log reader drains; 0 = unlimited")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.concurrency, args.duration, args.service_ms / 1000)
+        return
+
+    sink = f"{args.sink_rate / 1024:.0f} KB/s" if args.sink_rate > 0 else "unlimited"
+    print(f"concurrency={args.concurrency} duration={args.duration}s service={args.service_ms}ms sink={sink}")
+    print(f"{'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max lag':>8} {'log MB':>7} {'dropped':>8}")
+    for mode in args.modes:
+        result = run_mode(mode, args)
+        dropped = result.get("dropped")
+        print(
+            f"{mode:>10} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['max_lag_ms']:>8.1f} {result['log_mb']:>7.1f} "
+            f"{'-' if dropped is None else dropped:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: per-endpoint response serialization cost.
+
+Times only the work FastAPI does after the endpoint returns: validating the
+return value against the response model, converting it to JSON-compatible
+data and rendering the body. Compares the standard JSONResponse, the
+ORJSONResponse default and pre-serialized bytes for each payload:
+
+    catalog       GET /medications (full catalog, MedicationCatalogItem list)
+    analysis      POST /analyze_input (AIAnalysisResponse)
+    detail        GET /prescriptions/{id} (PrescriptionDetailResponse)
+    health        GET /health (plain dict, no response model)
+
+Usage:
+    python -m benchmarks.serialization --iterations 2000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy import select, text
+
+from app.api.v1.medications import medication_list_adapter
+from app.api.v1.prescriptions import _load_prescription_detail
+from app.database.connection import AsyncSessionLocal
+from app.main import app
+from app.models.medication import Medication
+from app.schemas.ai_response import AIAnalysisResponse, MedicineRecommendation, SupportingMedicine
+
+
+def response_field(path: str, method: str):
+    """Response model field of a route, as FastAPI uses it."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route.response_field
+    raise LookupError(f"No route {method} {path}")
+
+
+def sample_analysis() -> AIAnalysisResponse:
+    """A typical AI recommendation with a few medicines."""
+    return AIAnalysisResponse(
+        main_medicines=[
+            MedicineRecommendation(name=name, quantity_per_dose=1, reason="Giảm đau, hạ sốt theo triệu chứng được mô tả.")
+            for name in ("Paracetamol 500mg", "Ibuprofen 400mg", "Loratadine 10mg")
+        ],
+        supporting_medicines=[
+            SupportingMedicine(name="Oresol", quantity_total=4, reason="Bù nước và điện giải.")
+        ],
+        doses_per_day=3,
+        total_days=3,
+        recommendation_reasoning="Triệu chứng phù hợp với cảm cúm thông thường. " * 4,
+        diagnosis="Cảm cúm",
+        severity_level="mild",
+        side_effects_warning="Có thể gây buồn ngủ, khó chịu dạ dày. " * 2,
+        medical_advice="Nghỉ ngơi, uống nhiều nước. Đi khám nếu sốt trên 3 ngày. " * 2,
+        emergency_status=False,
+        should_see_doctor=False,
+        disclaimer="Đây chỉ là gợi ý tham khảo, không thay thế chẩn đoán của bác sĩ."
+    )
+
+
+async def load_payloads() -> dict:
+    """Read realistic payloads from the database."""
+    async with AsyncSessionLocal() as db:
+        medications = (await db.scalars(select(Medication).order_by(Medication.id))).all()
+        prescription_id = await db.scalar(text(
+            "SELECT prescription_id FROM prescription_doses GROUP BY prescription_id ORDER BY count(*) DESC LIMIT 1"
+        ))
+        detail = await _load_prescription_detail(db, prescription_id) if prescription_id else None
+
+    return {
+        "catalog": (medications, response_field("/api/v1/medications", "GET")),
+        "analysis": (sample_analysis(), response_field("/api/v1/analyze_input", "POST")),
+        "detail": (detail, response_field("/api/v1/prescriptions/{prescription_id}", "GET")),
+        "health": ({
+            "status": "healthy",
+            "app_name": "Medicine Vending Machine API",
+            "version": "1.0.0",
+            "vector_store": {"initialized": True, "medication_count": len(medications), "symptom_count": 60}
+        }, None)
+    }
+
+
+async def render(content: Any, field, response_class) -> bytes:
+    """Serialize a return value the way FastAPI does for a route."""
+    if field is None:
+        return response_class(jsonable_encoder(content)).body
+    return response_class(await serialize_response(field=field, response_content=content)).body
+
+
+def time_call(fn: Callable[[], Any], iterations: int) -> float:
+    """Mean microseconds per call."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def pre_serialized(name: str, content: Any) -> Optional[bytes]:
+    """Bytes as cached by the endpoint, or None if the endpoint has no cached form."""
+    if name == "catalog":
+        return medication_list_adapter.dump_json(medication_list_adapter.validate_python(content, from_attributes=True))
+    if name == "detail":
+        return content.model_dump_json().encode("utf-8")
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare response serialization paths.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    payloads = loop.run_until_complete(load_payloads())
+
+    print(f"{'payload':<10} {'bytes':>8} {'json (us)':>10} {'orjson (us)':>12} {'speedup':>8} {'cached (us)':>12}")
+    for name, (content, field) in payloads.items():
+        if content is None:
+            print(f"{name:<10} skipped (no data)")
+            continue
+
+        body = loop.run_until_complete(render(content, field, JSONResponse))
+        standard = time_call(lambda: loop.run_until_complete(render(content, field, JSONResponse)), args.iterations)
+        orjson = time_call(lambda: loop.run_until_complete(render(content, field, ORJSONResponse)), args.iterations)
+
+        # A cache hit only wraps stored bytes in a response
+        cached = pre_serialized(name, content)
+        cached_cost = (
+            f"{time_call(lambda: Response(content=cached, media_type='application/json'), args.iterations):>12.1f}"
+            if cached is not None else f"{'-':>12}"
+        )
+
+        print(f"{name:<10} {len(body):>8} {standard:>10.1f} {orjson:>12.1f} {standard / orjson:>7.2f}x {cached_cost}")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
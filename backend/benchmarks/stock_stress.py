@@ -0,0 +1,126 @@
+"""
+Stress test: concurrent stock decrements from many simulated kiosks.
+
+Several threads place random multi-item orders against the same few medications
+at once. The run checks that no medication is oversold and that the final stock
+matches the successful orders, and reports throughput and deadlocks.
+
+Runs against the database in DATABASE_URL (use a disposable database seeded from
+init.sql; stock of the chosen medications is overwritten and restored).
+
+Usage:
+    python -m benchmarks.stock_stress --kiosks 16 --orders 200
+    python -m benchmarks.stock_stress --naive   # old read-check-write, for comparison
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal
+from app.services.inventory_service import InsufficientStockError, decrement_stock
+
+
+def naive_decrement(db, quantities):
+    """The previous pattern: read stock, check in Python, write the new value."""
+    for med_id, quantity in quantities.items():
+        stock = db.execute(text("SELECT stock FROM medications WHERE id = :id"), {"id": med_id}).scalar()
+        if stock < quantity:
+            raise InsufficientStockError(med_id, stock, quantity)
+        time.sleep(0.001)  # Work done between the read and the write
+        db.execute(text("UPDATE medications SET stock = :stock WHERE id = :id"), {"stock": stock - quantity, "id": med_id})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent stock decrement stress test")
+    parser.add_argument("--kiosks", type=int, default=16, help="Concurrent threads")
+    parser.add_argument("--orders", type=int, default=200, help="Orders per kiosk")
+    parser.add_argument("--medications", type=int, default=5, help="Contended medications")
+    parser.add_argument("--stock", type=int, default=2000, help="Starting stock per medication")
+    parser.add_argument("--naive", action="store_true", help="Use the old read-check-write pattern")
+    args = parser.parse_args()
+
+    decrement = naive_decrement if args.naive else decrement_stock
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            text("SELECT id, stock FROM medications ORDER BY id LIMIT :n"), {"n": args.medications}
+        ).all()
+        original_stock = {row.id: row.stock for row in rows}
+        db.execute(
+            text("UPDATE medications SET stock = :stock WHERE id = ANY(:ids)"),
+            {"stock": args.stock, "ids": list(original_stock)}
+        )
+        db.commit()
+
+    med_ids = list(original_stock)
+    sold = Counter()
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def kiosk(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(args.orders):
+            # Random subset in random order: without deterministic locking this deadlocks
+            items = rng.sample(med_ids, rng.randint(1, len(med_ids)))
+            quantities = {med_id: rng.randint(1, 5) for med_id in items}
+            with SessionLocal() as db:
+                try:
+                    decrement(db, quantities)
+                    db.commit()
+                    with lock:
+                        sold.update(quantities)
+                        outcomes["ok"] += 1
+                except InsufficientStockError:
+                    db.rollback()
+                    with lock:
+                        outcomes["insufficient"] += 1
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        outcomes["deadlock" if "deadlock" in str(e) else "error"] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=kiosk, args=(i,)) for i in range(args.kiosks)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        final_stock = dict(db.execute(
+            text("SELECT id, stock FROM medications WHERE id = ANY(:ids)"), {"ids": med_ids}
+        ).all())
+        for med_id, stock in original_stock.items():
+            db.execute(text("UPDATE medications SET stock = :stock WHERE id = :id"), {"stock": stock, "id": med_id})
+        db.commit()
+
+    total_orders = sum(outcomes.values())
+    print(f"Mode: {'naive read-check-write' if args.naive else 'atomic conditional UPDATE'}")
+    print(f"Orders: {total_orders} in {elapsed:.2f}s ({total_orders / elapsed:.0f} orders/s)")
+    print(f"Outcomes: {dict(outcomes)}")
+
+    consistent = True
+    for med_id in med_ids:
+        expected = args.stock - sold[med_id]
+        status = "ok"
+        if final_stock[med_id] < 0 or sold[med_id] > args.stock:
+            status = "OVERSOLD"
+            consistent = False
+        elif final_stock[med_id] != expected:
+            status = "LOST UPDATE"
+            consistent = False
+        print(f"  medication {med_id}: sold={sold[med_id]} final={final_stock[med_id]} expected={expected} {status}")
+
+    print("Stock consistent" if consistent else "Stock INCONSISTENT")
+    if not consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Simulated LLM for load tests.
+
+StubChatModel stands in for Gemini: it answers the diagnosis prompt after a
+simulated model latency, recommending medications from the prompt's vector
+search context, so the whole analysis pipeline runs without an API key.
+
+This module is also the ASGI application the kiosk flow load test starts
+(benchmarks.stub_llm:app): the regular app with the stub injected into the AI
+service, latency from STUB_LLM_LATENCY_MS. The production app never imports it.
+
+Usage:
+    gunicorn -c gunicorn.conf.py benchmarks.stub_llm:app
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import zlib
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# Medication lines of the context block built by MedicalVectorStore._format_treatment_context
+_CONTEXT_LINE = re.compile(r"^\s*• (.+?) - ", re.MULTILINE)
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model returning deterministic recommendations after a simulated latency."""
+
+    model: str = "stub"
+    latency_ms: int = 800
+    jitter: float = 0.25  # Latency varies by +/- this fraction
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _delay(self) -> float:
+        """Simulated model latency in seconds."""
+        return self.latency_ms / 1000 * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _answer(self, messages: List[BaseMessage]) -> ChatResult:
+        """Build the JSON answer to a diagnosis prompt."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        names = list(dict.fromkeys(_CONTEXT_LINE.findall(prompt)))
+
+        # Same prompt, same answer; different symptoms pick different medications
+        seed = zlib.crc32(prompt.encode())
+        main_count = min(len(names), 1 + seed % 2)
+        answer = {
+            "main_medicines": [
+                {"name": name, "quantity_per_dose": 1, "reason": "Phù hợp với triệu chứng"}
+                for name in names[:main_count]
+            ],
+            "supporting_medicines": [
+                {"name": name, "quantity_per_day": 1, "reason": "Hỗ trợ điều trị"}
+                for name in names[main_count:main_count + 1]
+            ],
+            "doses_per_day": 2 + seed % 2,
+            "total_days": 1 + seed % 3,
+            "recommendation_reasoning": "Phản hồi mô phỏng (stub LLM) dựa trên kết quả tìm kiếm vector.",
+            "diagnosis": "Chẩn đoán mô phỏng",
+            "severity_level": "nhẹ",
+            "side_effects_warning": "",
+            "medical_advice": "",
+            "emergency_status": False,
+            "should_see_doctor": not names,
+            "disclaimer": "Đây là phản hồi mô phỏng dùng cho kiểm thử tải."
+        }
+        content = json.dumps(answer, ensure_ascii=False)
+
+        # Roughly four characters per token, like the real model's usage metadata
+        input_tokens, output_tokens = len(prompt) // 4, len(content) // 4
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return self._answer(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._answer(messages)
+
+
+# The application served by the load test: the regular app, with the stub in
+# place of Gemini
+from app.main import app  # noqa: E402
+from app.services.ai_service import ai_service  # noqa: E402
+
+ai_service.use_llm(StubChatModel(latency_ms=int(os.environ.get("STUB_LLM_LATENCY_MS", "800"))))
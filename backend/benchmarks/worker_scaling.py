@@ -0,0 +1,177 @@
+"""
+Benchmark: requests/sec and memory versus gunicorn worker count.
+
+Starts the production server (gunicorn.conf.py) once per worker count, waits
+for /ready, then drives a fixed number of concurrent clients for a fixed time.
+The default target embeds the query and searches FAISS, the CPU-bound part of
+an analysis; GET /health measures plain request overhead instead.
+
+Memory is summed over the master and workers: RSS counts pages shared through
+preloading once per process, PSS splits them between the processes sharing
+them, so the PSS total is the real footprint.
+
+Usage:
+    python -m benchmarks.worker_scaling --workers 1 2 4 --concurrency 16 --duration 20
+    python -m benchmarks.worker_scaling --target health
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SYMPTOMS = [
+    "đau đầu, sốt nhẹ",
+    "ho khan, đau họng",
+    "sổ mũi, hắt hơi",
+    "đau bụng, tiêu chảy",
+    "mất ngủ, mệt mỏi",
+    "ngứa da, nổi mẩn"
+]
+
+TARGETS = {
+    "search": ("POST", "/api/v1/vector-store/search/medications"),
+    "health": ("GET", "/health")
+}
+
+
+def request_body(target: str, i: int):
+    """JSON body for the i-th request of a target."""
+    if target == "search":
+        return {"symptoms": SYMPTOMS[i % len(SYMPTOMS)], "k": 5}
+    return None
+
+
+def process_tree(pid: int) -> List[int]:
+    """PIDs of a process and its direct children (the gunicorn master and workers)."""
+    children = Path(f"/proc/{pid}/task/{pid}/children")
+    return [pid] + [int(child) for child in children.read_text().split()] if children.exists() else [pid]
+
+
+def memory_mb(pids: List[int]) -> dict:
+    """Summed RSS and PSS of processes, in MB (Linux only)."""
+    totals = {"rss": 0, "pss": 0}
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                name, _, value = line.partition(":")
+                if name.lower() in totals:
+                    totals[name.lower()] += int(value.split()[0])
+        except OSError:
+            continue
+    return {name: kb / 1024 for name, kb in totals.items()}
+
+
+def start_server(workers: int, port: int, app_path: str) -> subprocess.Popen:
+    """Start gunicorn with the given worker count."""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), HOST="127.0.0.1")
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", app_path],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen, timeout: float) -> None:
+    """Poll /ready until the workers that answer have their vector stores loaded (the LLM is not needed)."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                # Consecutive answers may come from different workers
+                checks = [(await client.get("/ready")).json()["checks"] for _ in range(8)]
+                if all(check["vector_store"] and check["embedding_model"] for check in checks):
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout}s")
+
+
+async def drive(base_url: str, target: str, concurrency: int, duration: float) -> dict:
+    """Send requests from concurrent clients for a fixed time."""
+    method, path = TARGETS[target]
+    latencies: List[float] = []
+    errors = 0
+
+    async def client_loop(client: httpx.AsyncClient, offset: int) -> None:
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=request_body(target, i))
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            i += concurrency
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop(client, offset) for offset in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure throughput and memory per gunicorn worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--target", choices=TARGETS, default="search")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of load before measuring")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--app", default="app.main:app", help="ASGI application to serve")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"target={args.target} concurrency={args.concurrency} duration={args.duration}s cpus={os.cpu_count()}")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'RSS MB':>8} {'PSS MB':>8}")
+
+    for workers in args.workers:
+        server = start_server(workers, args.port, args.app)
+        try:
+            asyncio.run(wait_ready(base_url, server, args.ready_timeout))
+            asyncio.run(drive(base_url, args.target, args.concurrency, args.warmup))
+            result = asyncio.run(drive(base_url, args.target, args.concurrency, args.duration))
+            memory = memory_mb(process_tree(server.pid))
+            print(
+                f"{workers:>7} {result['rps']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['errors']:>7} {memory['rss']:>8.0f} {memory['pss']:>8.0f}"
+            )
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
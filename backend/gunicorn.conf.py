@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for production: several uvicorn workers forked from one
+master that has already loaded the FAISS indexes.
+
+The master only maps the saved indexes (python -m app.cli.build_vector_stores);
+forked workers share them copy-on-write, so memory grows little per worker.
+The embedding model is never loaded in the master: torch and OpenMP thread
+pools started before fork can deadlock the children. Each worker loads the
+model after the fork during warm-up, and if no stores were saved the first
+worker builds them while the others wait for its files.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import multiprocessing
+import os
+
+from app.core.config import settings
+
+cpu_count = multiprocessing.cpu_count()
+workers = settings.web_concurrency or cpu_count
+
+# Each worker's torch/BLAS pool gets an equal share of the cores; the defaults
+# (one thread per core in every worker) oversubscribe the CPU under load.
+# Must be set before numpy (preloaded with the indexes) or torch (imported by
+# the workers) is imported.
+worker_threads = settings.worker_threads or max(1, cpu_count // workers)
+for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(variable, str(worker_threads))
+# The tokenizers thread pool does not survive fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = f"{settings.host}:{settings.port}"
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# The LLM call can take tens of seconds; workers must not be killed during one
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Requests are logged by the app (LOG_ACCESS) through its background log queue
+accesslog = None
+
+
+def on_starting(server):
+    """Load the saved vector stores in the master, before any worker is forked (no embedding model)."""
+    from app.services.vector_store_manager import vector_store_manager
+
+    if vector_store_manager.load_existing():
+        server.log.info("Vector stores preloaded for %d workers (%d threads each)", workers, worker_threads)
+    else:
+        server.log.warning("No saved vector stores; the first worker builds them "
+                           "(run python -m app.cli.build_vector_stores to build them offline)")
+
+
+def post_fork(server, worker):
+    """Give the worker its own database connections."""
+    # Pooled connections opened by the master while importing the app must not
+    # be shared with the children; close=False leaves them open for the master
+    from app.database.connection import async_engine, async_replica_engine, engine, replica_engine
+
+    for sync_engine in {engine, replica_engine, async_engine.sync_engine, async_replica_engine.sync_engine}:
+        sync_engine.dispose(close=False)
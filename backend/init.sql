@@ -2,6 +2,9 @@
 -- Based on PRD requirements for Vietnamese pharmacy vending machine
 -- This file is automatically executed when the PostgreSQL container starts
 
+-- Trigram indexes for substring search (prescription diagnosis)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create patients table
 CREATE TABLE IF NOT EXISTS patients (
     id SERIAL PRIMARY KEY,
@@ -9,7 +12,7 @@ CREATE TABLE IF NOT EXISTS patients (
     age INTEGER NOT NULL CHECK (age > 0 AND age <= 120),
     weight INTEGER CHECK (weight > 0 AND weight <= 300), -- kg
     height INTEGER CHECK (height > 0 AND height <= 250), -- cm
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP -- Keyset pagination key, with id
 );
 
 -- Create allergies table
@@ -40,6 +43,7 @@ CREATE TABLE IF NOT EXISTS medications (
     unit_type TEXT NOT NULL, -- Đơn vị tính (viên, gói, chai...)
     unit_price INTEGER NOT NULL, -- Giá cho mỗi đơn vị (VND)
     stock INTEGER NOT NULL DEFAULT 0, -- Số lượng còn trong kho
+    reserved INTEGER NOT NULL DEFAULT 0 CHECK (reserved >= 0), -- Số lượng đang được giữ chỗ (stock_reservations)
     side_effects TEXT, -- Tác dụng phụ phổ biến
     max_per_day INTEGER, -- Liều tối đa/ngày
     is_supporting BOOLEAN DEFAULT FALSE, -- Có phải thuốc hỗ trợ hay không
@@ -52,6 +56,16 @@ CREATE TABLE IF NOT EXISTS medications (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create stock_reservations table (time-limited holds between recommendation and confirmation)
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    id SERIAL PRIMARY KEY,
+    reservation_id TEXT NOT NULL,
+    medication_id INTEGER NOT NULL REFERENCES medications(id) ON DELETE CASCADE,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create symptoms table
 CREATE TABLE IF NOT EXISTS symptoms (
     id SERIAL PRIMARY KEY,
@@ -74,7 +88,7 @@ CREATE TABLE IF NOT EXISTS medication_symptom (
 CREATE TABLE IF NOT EXISTS prescriptions (
     id SERIAL PRIMARY KEY,
     patient_id INTEGER REFERENCES patients(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- Keyset pagination and archive partition key
     doses_per_day INTEGER NOT NULL CHECK (doses_per_day >= 1 AND doses_per_day <= 6),
     days INTEGER NOT NULL CHECK (days >= 1 AND days <= 30),
     total_price INTEGER NOT NULL,
@@ -103,16 +117,82 @@ CREATE TABLE IF NOT EXISTS prescription_supportings (
     usage_instructions TEXT
 );
 
--- Create usage_logs table
+-- Create usage_logs table, partitioned by month so old months can be detached
+-- cheaply. prescription_id has no foreign key: prescriptions are archived
+-- independently of their logs. Monthly partitions are created ahead of time by
+-- the app (python -m app.cli.maintenance); the default partition catches the rest.
 CREATE TABLE IF NOT EXISTS usage_logs (
-    id SERIAL PRIMARY KEY,
-    prescription_id INTEGER REFERENCES prescriptions(id),
+    id SERIAL,
+    prescription_id INTEGER,
     note TEXT,
     generated_by TEXT NOT NULL,
     log_type TEXT DEFAULT 'info' CHECK (log_type IN ('info', 'warning', 'error', 'success')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS usage_logs_default PARTITION OF usage_logs DEFAULT;
+
+-- Archive tables for prescriptions older than PRESCRIPTION_ARCHIVE_AFTER_MONTHS,
+-- partitioned by the prescription's month. Line items carry the prescription's
+-- created_at so a whole archived month can be detached at once.
+CREATE TABLE IF NOT EXISTS prescriptions_archive (
+    id INTEGER NOT NULL,
+    patient_id INTEGER,
+    created_at TIMESTAMP NOT NULL,
+    doses_per_day INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    total_price INTEGER NOT NULL,
+    status TEXT,
+    diagnosis TEXT,
+    ai_recommendation TEXT,
+    pharmacist_notes TEXT,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescriptions_archive_default PARTITION OF prescriptions_archive DEFAULT;
+
+CREATE TABLE IF NOT EXISTS prescription_doses_archive (
+    id INTEGER NOT NULL,
+    prescription_id INTEGER NOT NULL,
+    medication_id INTEGER,
+    quantity_per_dose INTEGER NOT NULL,
+    dose_time TEXT NOT NULL,
+    special_instructions TEXT,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescription_doses_archive_default PARTITION OF prescription_doses_archive DEFAULT;
+
+CREATE TABLE IF NOT EXISTS prescription_supportings_archive (
+    id INTEGER NOT NULL,
+    prescription_id INTEGER NOT NULL,
+    medication_id INTEGER,
+    quantity_total INTEGER NOT NULL,
+    usage_instructions TEXT,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescription_supportings_archive_default PARTITION OF prescription_supportings_archive DEFAULT;
+
+-- Create idempotency_keys table (stored responses for retried confirmations)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    response JSONB NOT NULL,
+    prescription_id INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create medication_daily_consumption table (units dispensed per medication per
+-- day, maintained at confirm time; rebuild with python -m app.cli.rebuild_consumption)
+CREATE TABLE IF NOT EXISTS medication_daily_consumption (
+    medication_id INTEGER NOT NULL REFERENCES medications(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    prescriptions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (medication_id, day)
+);
+
 -- Insert common symptoms (Vietnamese context)
 INSERT INTO symptoms (name, vietnamese_name, category, severity_level) VALUES
 ('headache', 'đau đầu', 'neurological', 'mild'),
@@ -344,22 +424,96 @@ INSERT INTO medication_symptom (medication_id, symptom_id, effectiveness) VALUES
 (25, 14, 9), -- Fexofenadine for skin rash
 (26, 3, 6); -- Chlorpheniramine for cough
 
+-- Catalog version: bumped and announced on every change to the medication
+-- catalog, so API workers can drop their cached catalog snapshots. Stock and
+-- reservation updates (every sale and hold) are not catalog changes: they only
+-- announce on medication_stock, and only when a medication runs out or comes
+-- back into stock, which is all the search in-stock filter needs. A sequence
+-- avoids making changes wait on a single version row.
+CREATE SEQUENCE IF NOT EXISTS medication_catalog_version;
+
+CREATE OR REPLACE FUNCTION notify_medication_catalog_change() RETURNS trigger AS $$
+BEGIN
+    -- Statement-level, so skip statements that changed no rows (e.g. idle sweeps)
+    IF TG_OP = 'DELETE' THEN
+        IF NOT EXISTS (SELECT 1 FROM changed_rows_old) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+        RETURN NULL;
+    END IF;
+
+    -- Statement-level triggers cannot have a WHEN condition on the rows, so
+    -- updates are compared here
+    IF TG_OP = 'UPDATE' THEN
+        IF EXISTS (
+            SELECT 1 FROM changed_rows n JOIN changed_rows_old o ON o.id = n.id
+            WHERE (n.stock - n.reserved > 0) IS DISTINCT FROM (o.stock - o.reserved > 0)
+        ) THEN
+            PERFORM pg_notify('medication_stock', '');
+        END IF;
+
+        IF NOT EXISTS (
+            SELECT 1 FROM changed_rows n LEFT JOIN changed_rows_old o ON o.id = n.id
+            WHERE o.id IS NULL
+               OR to_jsonb(n) - '{stock,reserved}'::text[] IS DISTINCT FROM to_jsonb(o) - '{stock,reserved}'::text[]
+        ) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    -- Delivered on commit only
+    PERFORM pg_notify('medication_catalog', nextval('medication_catalog_version')::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS medications_catalog_insert ON medications;
+CREATE TRIGGER medications_catalog_insert
+    AFTER INSERT ON medications
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
+DROP TRIGGER IF EXISTS medications_catalog_update ON medications;
+CREATE TRIGGER medications_catalog_update
+    AFTER UPDATE ON medications
+    REFERENCING OLD TABLE AS changed_rows_old NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
+DROP TRIGGER IF EXISTS medications_catalog_delete ON medications;
+CREATE TRIGGER medications_catalog_delete
+    AFTER DELETE ON medications
+    REFERENCING OLD TABLE AS changed_rows_old
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_patients_age ON patients(age);
 CREATE INDEX IF NOT EXISTS idx_patients_gender ON patients(gender);
+CREATE INDEX IF NOT EXISTS idx_patients_created_at_id ON patients(created_at, id);
 CREATE INDEX IF NOT EXISTS idx_medications_treatment_class ON medications(treatment_class);
 CREATE INDEX IF NOT EXISTS idx_medications_name ON medications(name);
+CREATE INDEX IF NOT EXISTS idx_medications_name_lower ON medications(lower(name));
+CREATE INDEX IF NOT EXISTS idx_medications_name_id ON medications(name, id);
 CREATE INDEX IF NOT EXISTS idx_medications_active_ingredient ON medications(active_ingredient);
 CREATE INDEX IF NOT EXISTS idx_medications_stock ON medications(stock);
 CREATE INDEX IF NOT EXISTS idx_medications_is_supporting ON medications(is_supporting);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_reservation_id ON stock_reservations(reservation_id);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_expires_at ON stock_reservations(expires_at);
 CREATE INDEX IF NOT EXISTS idx_allergies_patient_id ON allergies(patient_id);
 CREATE INDEX IF NOT EXISTS idx_underlying_conditions_patient_id ON underlying_conditions(patient_id);
 CREATE INDEX IF NOT EXISTS idx_symptoms_category ON symptoms(category);
 CREATE INDEX IF NOT EXISTS idx_prescriptions_patient_id ON prescriptions(patient_id);
 CREATE INDEX IF NOT EXISTS idx_prescriptions_created_at ON prescriptions(created_at);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_created_at_id ON prescriptions(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_status_created_at_id ON prescriptions(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_patient_id_created_at_id ON prescriptions(patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_diagnosis_trgm ON prescriptions USING gin (diagnosis gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_prescription_doses_prescription_id ON prescription_doses(prescription_id);
 CREATE INDEX IF NOT EXISTS idx_prescription_supportings_prescription_id ON prescription_supportings(prescription_id);
 CREATE INDEX IF NOT EXISTS idx_usage_logs_prescription_id ON usage_logs(prescription_id);
+CREATE INDEX IF NOT EXISTS idx_prescription_doses_archive_prescription_id ON prescription_doses_archive(prescription_id);
+CREATE INDEX IF NOT EXISTS idx_prescription_supportings_archive_prescription_id ON prescription_supportings_archive(prescription_id);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at);
 CREATE INDEX IF NOT EXISTS idx_medication_symptom_medication_id ON medication_symptom(medication_id);
 CREATE INDEX IF NOT EXISTS idx_medication_symptom_symptom_id ON medication_symptom(symptom_id);
 
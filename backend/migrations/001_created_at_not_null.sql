@@ -0,0 +1,21 @@
+-- Make created_at NOT NULL on the tables listed by keyset pagination.
+--
+-- Patient and prescription listings page by (created_at, id), which cannot
+-- encode a cursor for a row without created_at and never returns such rows
+-- after the first page. init.sql declares the columns NOT NULL for new
+-- databases; apply this file to databases created from an earlier init.sql:
+--
+--     psql "$DATABASE_URL" -f migrations/001_created_at_not_null.sql
+--
+-- Rows without a creation time are backfilled with the epoch, so they sort as
+-- the oldest rows. Safe to run more than once.
+
+BEGIN;
+
+UPDATE patients SET created_at = 'epoch' WHERE created_at IS NULL;
+ALTER TABLE patients ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE prescriptions SET created_at = 'epoch' WHERE created_at IS NULL;
+ALTER TABLE prescriptions ALTER COLUMN created_at SET NOT NULL;
+
+COMMIT;
@@ -0,0 +1,99 @@
+-- Partition usage_logs by month and create the prescription archive tables.
+--
+-- init.sql creates usage_logs partitioned by RANGE (created_at), with primary
+-- key (id, created_at) and without the foreign key to prescriptions (logs
+-- outlive archived prescriptions). On a database created from an earlier
+-- init.sql, usage_logs is a plain table: creating its monthly partitions fails
+-- and audit inserts keep going to one ever-growing table. Apply this file to
+-- such databases:
+--
+--     psql "$DATABASE_URL" -f migrations/002_partition_usage_logs.sql
+--
+-- The existing table is not copied: it becomes the default partition
+-- (usage_logs_default) of a new partitioned usage_logs, which only takes a
+-- brief exclusive lock and one validation scan. Then run
+--
+--     python -m app.cli.maintenance partitions
+--
+-- to move its rows into monthly partitions, after which old months can be
+-- detached. Safe to run more than once.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('usage_logs')) = 'r' THEN
+        LOCK TABLE usage_logs IN ACCESS EXCLUSIVE MODE;
+
+        ALTER TABLE usage_logs RENAME TO usage_logs_default;
+        ALTER TABLE usage_logs_default DROP CONSTRAINT IF EXISTS usage_logs_prescription_id_fkey;
+        -- The partitioned table's primary key is (id, created_at)
+        ALTER TABLE usage_logs_default DROP CONSTRAINT IF EXISTS usage_logs_pkey;
+        ALTER INDEX IF EXISTS idx_usage_logs_prescription_id RENAME TO usage_logs_default_prescription_id_idx;
+
+        UPDATE usage_logs_default SET created_at = 'epoch' WHERE created_at IS NULL;
+        ALTER TABLE usage_logs_default ALTER COLUMN created_at SET NOT NULL;
+
+        CREATE TABLE usage_logs (
+            id INTEGER NOT NULL DEFAULT nextval('usage_logs_id_seq'),
+            prescription_id INTEGER,
+            note TEXT,
+            generated_by TEXT NOT NULL,
+            log_type TEXT DEFAULT 'info' CONSTRAINT usage_logs_log_type_check CHECK (log_type IN ('info', 'warning', 'error', 'success')),
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        -- Otherwise dropping a detached partition would drop the sequence
+        ALTER SEQUENCE usage_logs_id_seq OWNED BY usage_logs.id;
+
+        ALTER TABLE usage_logs ATTACH PARTITION usage_logs_default DEFAULT;
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_usage_logs_prescription_id ON usage_logs(prescription_id);
+
+-- Archive tables, as in init.sql
+CREATE TABLE IF NOT EXISTS prescriptions_archive (
+    id INTEGER NOT NULL,
+    patient_id INTEGER,
+    created_at TIMESTAMP NOT NULL,
+    doses_per_day INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    total_price INTEGER NOT NULL,
+    status TEXT,
+    diagnosis TEXT,
+    ai_recommendation TEXT,
+    pharmacist_notes TEXT,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescriptions_archive_default PARTITION OF prescriptions_archive DEFAULT;
+
+CREATE TABLE IF NOT EXISTS prescription_doses_archive (
+    id INTEGER NOT NULL,
+    prescription_id INTEGER NOT NULL,
+    medication_id INTEGER,
+    quantity_per_dose INTEGER NOT NULL,
+    dose_time TEXT NOT NULL,
+    special_instructions TEXT,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescription_doses_archive_default PARTITION OF prescription_doses_archive DEFAULT;
+
+CREATE TABLE IF NOT EXISTS prescription_supportings_archive (
+    id INTEGER NOT NULL,
+    prescription_id INTEGER NOT NULL,
+    medication_id INTEGER,
+    quantity_total INTEGER NOT NULL,
+    usage_instructions TEXT,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS prescription_supportings_archive_default PARTITION OF prescription_supportings_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_prescription_doses_archive_prescription_id ON prescription_doses_archive(prescription_id);
+CREATE INDEX IF NOT EXISTS idx_prescription_supportings_archive_prescription_id ON prescription_supportings_archive(prescription_id);
+
+COMMIT;
@@ -0,0 +1,72 @@
+-- Announce stock updates separately from catalog changes.
+--
+-- The medications triggers used to bump the catalog version on every update,
+-- so each sale and reservation dropped every worker's cached catalog. init.sql
+-- now only announces changes to columns other than stock and reserved on
+-- medication_catalog, and announces on medication_stock when a medication runs
+-- out or comes back into stock. Apply this file to databases created from an
+-- earlier init.sql:
+--
+--     psql "$DATABASE_URL" -f migrations/003_catalog_notify_stock.sql
+--
+-- Safe to run more than once.
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS medication_catalog_version;
+
+CREATE OR REPLACE FUNCTION notify_medication_catalog_change() RETURNS trigger AS $$
+BEGIN
+    -- Statement-level, so skip statements that changed no rows (e.g. idle sweeps)
+    IF TG_OP = 'DELETE' THEN
+        IF NOT EXISTS (SELECT 1 FROM changed_rows_old) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+        RETURN NULL;
+    END IF;
+
+    -- Statement-level triggers cannot have a WHEN condition on the rows, so
+    -- updates are compared here
+    IF TG_OP = 'UPDATE' THEN
+        IF EXISTS (
+            SELECT 1 FROM changed_rows n JOIN changed_rows_old o ON o.id = n.id
+            WHERE (n.stock - n.reserved > 0) IS DISTINCT FROM (o.stock - o.reserved > 0)
+        ) THEN
+            PERFORM pg_notify('medication_stock', '');
+        END IF;
+
+        IF NOT EXISTS (
+            SELECT 1 FROM changed_rows n LEFT JOIN changed_rows_old o ON o.id = n.id
+            WHERE o.id IS NULL
+               OR to_jsonb(n) - '{stock,reserved}'::text[] IS DISTINCT FROM to_jsonb(o) - '{stock,reserved}'::text[]
+        ) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    -- Delivered on commit only
+    PERFORM pg_notify('medication_catalog', nextval('medication_catalog_version')::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS medications_catalog_insert ON medications;
+CREATE TRIGGER medications_catalog_insert
+    AFTER INSERT ON medications
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
+DROP TRIGGER IF EXISTS medications_catalog_update ON medications;
+CREATE TRIGGER medications_catalog_update
+    AFTER UPDATE ON medications
+    REFERENCING OLD TABLE AS changed_rows_old NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
+DROP TRIGGER IF EXISTS medications_catalog_delete ON medications;
+CREATE TRIGGER medications_catalog_delete
+    AFTER DELETE ON medications
+    REFERENCING OLD TABLE AS changed_rows_old
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_catalog_change();
+
+COMMIT;
@@ -0,0 +1,40 @@
+"""Shared fixtures. Database tests run against DATABASE_URL and roll back their changes."""
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def db():
+    """Session on DATABASE_URL whose changes are rolled back; skips the test without a database."""
+    from app.database.connection import SessionLocal
+
+    session = SessionLocal()
+    try:
+        session.execute(text("SELECT 1 FROM medications LIMIT 1"))
+    except Exception as e:
+        session.close()
+        pytest.skip(f"Database not available: {type(e).__name__}")
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def make_medication(db):
+    """Insert a medication with the given stock (and reserved units) inside the test transaction."""
+    counter = iter(range(1, 1000))
+
+    def make(stock: int, reserved: int = 0) -> int:
+        return db.execute(
+            text("""
+                INSERT INTO medications (name, active_ingredient, form, unit_type, unit_price, stock, reserved, treatment_class)
+                VALUES (:name, 'test', 'viên', 'viên', 1000, :stock, :reserved, 'test')
+                RETURNING id
+            """),
+            {"name": f"test-medication-{next(counter)}", "stock": stock, "reserved": reserved}
+        ).scalar()
+
+    return make
@@ -0,0 +1,183 @@
+"""Tests for the LLM admission controller: fairness, priorities and rejections."""
+
+import asyncio
+
+import pytest
+
+from app.services.admission_controller import (
+    PRIORITY_EMERGENCY,
+    PRIORITY_NORMAL,
+    AdmissionController,
+    AdmissionRejected
+)
+
+
+def make_controller(**overrides) -> AdmissionController:
+    options = {
+        "max_concurrency": 1,
+        "max_queue_size": 16,
+        "max_queue_per_kiosk": 4,
+        "queue_timeout": 5.0,
+        "retry_after": 3
+    }
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+async def admit_in_order(controller: AdmissionController, requests) -> list:
+    """Queue (kiosk_id, priority) requests behind a held slot and return the order they are admitted in."""
+    admitted = []
+
+    async def request(kiosk_id: str, priority: int, label: str) -> None:
+        async with controller.slot(kiosk_id, priority):
+            admitted.append(label)
+            await asyncio.sleep(0)
+
+    await controller._acquire("holder", PRIORITY_NORMAL)
+    tasks = []
+    for kiosk_id, priority, label in requests:
+        tasks.append(asyncio.create_task(request(kiosk_id, priority, label)))
+        await asyncio.sleep(0)  # Enqueue in creation order
+    controller._release()
+    await asyncio.gather(*tasks)
+    return admitted
+
+
+def test_kiosks_are_served_round_robin():
+    controller = make_controller()
+    order = asyncio.run(admit_in_order(controller, [
+        ("a", PRIORITY_NORMAL, "a1"),
+        ("a", PRIORITY_NORMAL, "a2"),
+        ("a", PRIORITY_NORMAL, "a3"),
+        ("b", PRIORITY_NORMAL, "b1"),
+        ("c", PRIORITY_NORMAL, "c1")
+    ]))
+
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+    assert controller.get_stats()["in_flight"] == 0
+
+
+def test_emergencies_are_served_first():
+    controller = make_controller()
+    order = asyncio.run(admit_in_order(controller, [
+        ("a", PRIORITY_NORMAL, "normal-a"),
+        ("b", PRIORITY_NORMAL, "normal-b"),
+        ("c", PRIORITY_EMERGENCY, "emergency-c")
+    ]))
+
+    assert order == ["emergency-c", "normal-a", "normal-b"]
+
+
+def test_kiosk_queue_limit_is_rejected_with_429():
+    async def scenario():
+        controller = make_controller(max_queue_per_kiosk=1)
+        await controller._acquire("holder", PRIORITY_NORMAL)
+        waiter = asyncio.create_task(controller._acquire("a", PRIORITY_NORMAL))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller._acquire("a", PRIORITY_NORMAL)
+        # Other kiosks still get in line
+        other = asyncio.create_task(controller._acquire("b", PRIORITY_NORMAL))
+        await asyncio.sleep(0)
+        stats = controller.get_stats()
+
+        waiter.cancel()
+        other.cancel()
+        await asyncio.gather(waiter, other, return_exceptions=True)
+        return rejected.value, stats
+
+    rejected, stats = asyncio.run(scenario())
+
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 3
+    assert stats["queued"] == 2
+    assert stats["rejected_kiosk_limit"] == 1
+
+
+def test_full_queue_is_rejected_with_503():
+    async def scenario():
+        controller = make_controller(max_queue_size=2)
+        await controller._acquire("holder", PRIORITY_NORMAL)
+        waiters = [asyncio.create_task(controller._acquire(kiosk_id, PRIORITY_NORMAL)) for kiosk_id in ("a", "b")]
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller._acquire("c", PRIORITY_NORMAL)
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return rejected.value, controller.get_stats()
+
+    rejected, stats = asyncio.run(scenario())
+
+    assert rejected.status_code == 503
+    assert stats["rejected_queue_full"] == 1
+    # Cancelled waiters leave the queue
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        controller = make_controller(queue_timeout=0.01)
+        await controller._acquire("holder", PRIORITY_NORMAL)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller._acquire("a", PRIORITY_NORMAL)
+        return rejected.value, controller.get_stats()
+
+    rejected, stats = asyncio.run(scenario())
+
+    assert rejected.status_code == 503
+    assert stats["timed_out"] == 1
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 1
+
+
+def test_slot_granted_as_wait_times_out_is_returned(monkeypatch):
+    controller = make_controller()
+
+    async def grant_then_time_out(future, timeout):
+        # The holder finishes and hands its slot to this waiter in the same
+        # loop iteration in which the wait times out
+        controller._release()
+        assert future.done()
+        raise asyncio.TimeoutError()
+
+    async def scenario():
+        await controller._acquire("holder", PRIORITY_NORMAL)
+        monkeypatch.setattr(asyncio, "wait_for", grant_then_time_out)
+        with pytest.raises(AdmissionRejected):
+            await controller._acquire("a", PRIORITY_NORMAL)
+
+    asyncio.run(scenario())
+    stats = controller.get_stats()
+
+    assert stats["in_flight"] == 0
+    assert stats["queued"] == 0
+    assert stats["timed_out"] == 1
+
+
+def test_slot_granted_as_caller_is_cancelled_is_returned():
+    async def scenario():
+        controller = make_controller()
+        await controller._acquire("holder", PRIORITY_NORMAL)
+
+        async def request():
+            async with controller.slot("a", PRIORITY_NORMAL):
+                await asyncio.sleep(0)
+
+        waiter = asyncio.create_task(request())
+        await asyncio.sleep(0)
+
+        # Grant the slot and cancel the waiter before it runs again
+        controller._release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["in_flight"] == 0
+    assert stats["queued"] == 0
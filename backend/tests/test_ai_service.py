@@ -0,0 +1,73 @@
+"""Tests for the fallback status reported by the AI service."""
+
+import asyncio
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.services.admission_controller import AdmissionController
+from app.services.ai_service import AIService
+
+PATIENT = {"symptoms": "đau đầu", "gender": "nam", "age": 30, "height": 170, "weight": 65}
+
+RECOMMENDATION = {
+    "main_medicines": [
+        {"name": "Panadol", "quantity_per_dose": 1, "reason": "Giảm đau"},
+        {"name": "Efferalgan", "quantity_per_dose": 1, "reason": "Hạ sốt"}
+    ],
+    "supporting_medicines": [{"name": "Oresol", "quantity_per_day": 1, "reason": "Bù nước"}],
+    "doses_per_day": 2,
+    "total_days": 3,
+    "recommendation_reasoning": "",
+    "diagnosis": "",
+    "severity_level": "nhẹ",
+    "side_effects_warning": "",
+    "medical_advice": "",
+    "emergency_status": False,
+    "should_see_doctor": False,
+    "disclaimer": ""
+}
+
+
+class FakeChatModel(FakeListChatModel):
+    model: str = "fake"
+
+
+def analyze(service: AIService, controller: AdmissionController):
+    return asyncio.run(service.analyze_symptoms_with_status(
+        **PATIENT,
+        vector_context="",
+        admission_controller=controller
+    ))
+
+
+def make_controller() -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=1,
+        max_queue_size=1,
+        max_queue_per_kiosk=1,
+        queue_timeout=1.0,
+        retry_after=1
+    )
+
+
+def test_recommendation_is_not_a_fallback():
+    service = AIService()
+    service.use_llm(FakeChatModel(responses=[json.dumps(RECOMMENDATION)]))
+    controller = make_controller()
+
+    response, fallback = analyze(service, controller)
+
+    assert not fallback
+    assert [med.name for med in response.main_medicines] == ["Panadol", "Efferalgan"]
+    assert controller.get_stats()["in_flight"] == 0
+
+
+def test_pipeline_failure_is_reported_as_fallback():
+    service = AIService()
+    service.use_llm(FakeChatModel(responses=["not json"]))
+
+    response, fallback = analyze(service, make_controller())
+
+    assert fallback
+    assert response.main_medicines == []
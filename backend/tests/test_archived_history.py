@@ -0,0 +1,74 @@
+"""Tests that exports and rollup rebuilds read archived prescriptions too (requires Postgres)."""
+
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app.services.consumption_service import rebuild_consumption_day
+from app.services.export_service import EXPORT_SQL
+
+DAY = date(2001, 1, 15)
+CREATED_AT = datetime(2001, 1, 15, 10, 30)
+
+
+def add_live_prescription(db, medication_id: int) -> int:
+    prescription_id = db.execute(text("""
+        INSERT INTO prescriptions (created_at, doses_per_day, days, total_price)
+        VALUES (:created_at, 2, 3, 1000)
+        RETURNING id
+    """), {"created_at": CREATED_AT}).scalar()
+    db.execute(text("""
+        INSERT INTO prescription_doses (prescription_id, medication_id, quantity_per_dose, dose_time)
+        VALUES (:prescription_id, :medication_id, 1, 'regular')
+    """), {"prescription_id": prescription_id, "medication_id": medication_id})
+    return prescription_id
+
+
+def add_archived_prescription(db, medication_id: int) -> int:
+    # Archived ids come from the live sequence, so they never collide with live ones
+    prescription_id = db.execute(text("SELECT nextval('prescriptions_id_seq')")).scalar()
+    params = {"id": prescription_id, "created_at": CREATED_AT, "medication_id": medication_id}
+    db.execute(text("""
+        INSERT INTO prescriptions_archive (id, created_at, doses_per_day, days, total_price, status)
+        VALUES (:id, :created_at, 2, 3, 1000, 'completed')
+    """), params)
+    db.execute(text("""
+        INSERT INTO prescription_doses_archive (id, prescription_id, medication_id, quantity_per_dose, dose_time, created_at)
+        VALUES (nextval('prescription_doses_id_seq'), :id, :medication_id, 2, 'regular', :created_at)
+    """), params)
+    db.execute(text("""
+        INSERT INTO prescription_supportings_archive (id, prescription_id, medication_id, quantity_total, created_at)
+        VALUES (nextval('prescription_supportings_id_seq'), :id, :medication_id, 5, :created_at)
+    """), params)
+    return prescription_id
+
+
+def test_export_includes_archived_prescriptions(db, make_medication):
+    medication_id = make_medication(100)
+    live_id = add_live_prescription(db, medication_id)
+    archived_id = add_archived_prescription(db, medication_id)
+
+    rows = db.execute(
+        text(EXPORT_SQL.format(conditions="created_at >= :created_from AND created_at < :created_to")),
+        {"created_from": datetime(2001, 1, 15), "created_to": datetime(2001, 1, 16)}
+    ).mappings().all()
+
+    lines = [(row["id"], row["line_type"], row["quantity_total"]) for row in rows]
+    assert (live_id, "dose", 6) in lines
+    assert (archived_id, "dose", 12) in lines
+    assert (archived_id, "supporting", 5) in lines
+
+
+def test_rebuild_counts_archived_prescriptions(db, make_medication):
+    medication_id = make_medication(100)
+    add_live_prescription(db, medication_id)
+    add_archived_prescription(db, medication_id)
+
+    rebuild_consumption_day(db, DAY)
+
+    row = db.execute(
+        text("SELECT quantity, prescriptions FROM medication_daily_consumption WHERE medication_id = :id AND day = :day"),
+        {"id": medication_id, "day": DAY}
+    ).one()
+    # Live: 1 x 2 x 3; archived: 2 x 2 x 3 + 5
+    assert (row.quantity, row.prescriptions) == (23, 2)
@@ -0,0 +1,41 @@
+"""Tests for resuming the bulk analysis runner."""
+
+import json
+
+from app.cli.batch_analyze import load_completed_ids, read_case_chunks
+
+
+def write_lines(path, lines) -> None:
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def test_only_successful_results_count_as_completed(tmp_path):
+    output = tmp_path / "results.jsonl"
+    write_lines(output, [
+        json.dumps({"id": "1", "ok": True}),
+        json.dumps({"id": "2", "ok": False, "error": "LLM timeout"}),
+        json.dumps({"id": 3, "ok": True}),
+        '{"id": "4", "ok": tr'  # Interrupted write
+    ])
+
+    assert load_completed_ids(output) == {"1", "3"}
+    assert load_completed_ids(tmp_path / "missing.jsonl") == set()
+
+
+def test_completed_cases_are_skipped_and_invalid_lines_counted(tmp_path):
+    cases = tmp_path / "cases.jsonl"
+    write_lines(cases, [
+        json.dumps({"id": "1", "symptoms": "ho"}),
+        "{not json",
+        json.dumps({"id": "2", "symptoms": "sốt"}),
+        "",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"symptoms": "đau đầu"}),  # Id defaults to the line number
+        json.dumps({"id": "3", "symptoms": "đau bụng"})
+    ])
+    counts = {"skipped": 0, "invalid": 0}
+
+    chunks = list(read_case_chunks(cases, {"1", "3"}, chunk_size=1, counts=counts))
+
+    assert [[case["id"] for case in chunk] for chunk in chunks] == [["2"], ["6"]]
+    assert counts == {"skipped": 2, "invalid": 2}
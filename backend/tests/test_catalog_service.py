@@ -0,0 +1,98 @@
+"""Tests for the medication catalog snapshot cache."""
+
+import asyncio
+
+import pytest
+
+from app.services.catalog_service import CATALOG_CHANNEL, STOCK_CHANNEL, CatalogCache, CatalogSnapshot
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ("{etag}", True),
+    ("W/{etag}", True),
+    ('"other", {etag}', True),
+    ('"other"', False),
+    ("{etag}-gzip", False),
+])
+def test_snapshot_matches_if_none_match(header, expected):
+    snapshot = CatalogSnapshot(b'[{"id": 1}]', version=1)
+
+    assert snapshot.matches(header.format(etag=snapshot.etag) if header else header) is expected
+
+
+def test_etag_follows_the_body():
+    assert CatalogSnapshot(b"[]", 1).etag == CatalogSnapshot(b"[]", 2).etag
+    assert CatalogSnapshot(b"[]", 1).etag != CatalogSnapshot(b"[1]", 1).etag
+
+
+def test_snapshot_is_reused_until_invalidated():
+    cache = CatalogCache(max_age=10.0)
+    cache._listening = True
+    builds = []
+
+    async def build() -> bytes:
+        builds.append(1)
+        return f"[{len(builds)}]".encode()
+
+    async def polls():
+        first = await cache.get("catalog", build)
+        second = await cache.get("catalog", build)
+        cache.invalidate(7)
+        third = await cache.get("catalog", build)
+        return first, second, third
+
+    first, second, third = asyncio.run(polls())
+    assert second is first
+    assert third.body == b"[2]" and third.version == 7
+
+
+def test_change_during_build_is_not_kept():
+    cache = CatalogCache(max_age=10.0)
+    cache._listening = True
+    builds = []
+
+    async def build() -> bytes:
+        builds.append(1)
+        if len(builds) == 1:
+            cache.invalidate()  # Notification arriving while the catalog is read
+        return f"[{len(builds)}]".encode()
+
+    async def polls():
+        return await cache.get("catalog", build), await cache.get("catalog", build)
+
+    during, after = asyncio.run(polls())
+    assert during.body == b"[1]"  # Served to the request that built it
+    assert after.body == b"[2]"  # But rebuilt for the next one
+    assert cache.get_stats()["snapshots"] == 1
+
+
+def test_snapshots_expire_without_listener(monkeypatch):
+    cache = CatalogCache(max_age=10.0)
+    snapshot = CatalogSnapshot(b"[]", None)
+    cache._snapshots["catalog"] = snapshot
+
+    assert cache._fresh("catalog") is snapshot
+    snapshot.built_at -= 11
+    assert cache._fresh("catalog") is None
+    cache._listening = True
+    assert cache._fresh("catalog") is snapshot
+
+
+def test_stock_notifications_keep_snapshots():
+    cache = CatalogCache(max_age=10.0)
+    cache._snapshots["catalog"] = CatalogSnapshot(b"[]", 1)
+    changes, stock_changes = [], []
+    cache.on_change(lambda: changes.append(1))
+    cache.on_stock_change(lambda: stock_changes.append(1))
+
+    cache._on_notification(None, 0, STOCK_CHANNEL, "")
+    assert "catalog" in cache._snapshots
+    assert (len(changes), len(stock_changes)) == (0, 1)
+
+    cache._on_notification(None, 0, CATALOG_CHANNEL, "8")
+    assert not cache._snapshots
+    assert cache.get_stats()["catalog_version"] == 8
+    assert (len(changes), len(stock_changes)) == (1, 1)
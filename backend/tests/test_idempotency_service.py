@@ -0,0 +1,87 @@
+"""Tests for Idempotency-Key fingerprints, replay and purging."""
+
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from app.schemas.ai_response import ConfirmPrescriptionResponse
+from app.services.idempotency_service import (
+    IdempotencyKeyConflict,
+    get_stored_response,
+    purge_expired_keys,
+    request_fingerprint,
+    store_response
+)
+
+
+class Order(BaseModel):
+    main_medicines: List[dict]
+    doses_per_day: int
+
+
+def make_response(prescription_id: int) -> ConfirmPrescriptionResponse:
+    return ConfirmPrescriptionResponse(
+        prescription_id=prescription_id,
+        total_price=12000,
+        diagnosis="Cảm cúm",
+        usage_instructions="Uống 2 lần/ngày",
+        side_effects_warning="",
+        medical_advice="",
+        recommendation_reasoning="",
+        severity_level="nhẹ",
+        emergency_status=False,
+        should_see_doctor=False,
+        disclaimer="",
+        items=[{"name": "Paracetamol 500mg", "total_quantity": 6, "price": 12000}]
+    )
+
+
+def test_fingerprint_ignores_key_order_but_not_values():
+    order = Order(main_medicines=[{"name": "Paracetamol 500mg", "quantity_per_dose": 1}], doses_per_day=2)
+    reordered = Order(main_medicines=[{"quantity_per_dose": 1, "name": "Paracetamol 500mg"}], doses_per_day=2)
+    changed = Order(main_medicines=[{"name": "Paracetamol 500mg", "quantity_per_dose": 2}], doses_per_day=2)
+
+    assert request_fingerprint(order) == request_fingerprint(reordered)
+    assert request_fingerprint(order) != request_fingerprint(changed)
+
+
+def test_completed_request_is_replayed(db):
+    store_response(db, "test-key-replay", "hash-a", make_response(41), prescription_id=None)
+
+    stored = get_stored_response(db, "test-key-replay", "hash-a")
+
+    assert ConfirmPrescriptionResponse(**stored) == make_response(41)
+
+
+def test_unknown_key_has_no_stored_response(db):
+    assert get_stored_response(db, "test-key-unknown", "hash-a") is None
+
+
+def test_key_reused_with_a_different_body_is_a_conflict(db):
+    store_response(db, "test-key-conflict", "hash-a", make_response(42))
+
+    with pytest.raises(IdempotencyKeyConflict):
+        get_stored_response(db, "test-key-conflict", "hash-b")
+
+
+def test_purge_deletes_only_keys_past_retention(db):
+    store_response(db, "test-key-old", "hash-a", make_response(43))
+    store_response(db, "test-key-new", "hash-a", make_response(44))
+    db.execute(
+        text("UPDATE idempotency_keys SET created_at = now() - interval '3 days' WHERE key = 'test-key-old'")
+    )
+
+    assert purge_expired_keys(db, retention_hours=48) >= 1
+
+    assert get_stored_response(db, "test-key-old", "hash-a") is None
+    assert get_stored_response(db, "test-key-new", "hash-a") is not None
+
+
+def test_purge_is_batched(db):
+    for i in range(3):
+        store_response(db, f"test-key-batch-{i}", "hash-a", make_response(i))
+    db.execute(text("UPDATE idempotency_keys SET created_at = created_at - interval '3 days'"))
+
+    assert purge_expired_keys(db, retention_hours=48, batch_size=2) == 2
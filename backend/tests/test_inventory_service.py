@@ -0,0 +1,68 @@
+"""Tests for the single-statement stock check and decrement (requires Postgres) and its audit event."""
+
+import pytest
+from sqlalchemy import text
+
+from app.services import inventory_service
+from app.services.audit_logger import SOURCE_INVENTORY
+from app.services.inventory_service import InsufficientStockError, audit_stock_decrement, decrement_stock
+
+
+def stock_of(db, med_id: int) -> tuple:
+    row = db.execute(text("SELECT stock, reserved FROM medications WHERE id = :id"), {"id": med_id}).one()
+    return row.stock, row.reserved
+
+
+def test_decrement_takes_stock_and_returns_availability(db, make_medication):
+    first, second = make_medication(10), make_medication(5, reserved=2)
+
+    available = decrement_stock(db, {first: 4, second: 3})
+
+    assert available == {first: 6, second: 0}
+    assert stock_of(db, first) == (6, 0)
+    assert stock_of(db, second) == (2, 2)
+
+
+def test_decrement_of_exactly_the_available_stock_succeeds(db, make_medication):
+    med_id = make_medication(3)
+
+    assert decrement_stock(db, {med_id: 3}) == {med_id: 0}
+
+
+def test_insufficient_stock_names_the_medication(db, make_medication):
+    enough, short = make_medication(10), make_medication(2)
+
+    with pytest.raises(InsufficientStockError) as error:
+        decrement_stock(db, {enough: 1, short: 3})
+
+    assert error.value.medication_id == short
+    assert error.value.available == 2
+    assert error.value.required == 3
+    # The short medication is never taken below zero; the caller rolls back the rest
+    assert stock_of(db, short) == (2, 0)
+
+
+def test_reserved_units_are_not_available_to_plain_decrements(db, make_medication):
+    med_id = make_medication(10, reserved=8)
+
+    with pytest.raises(InsufficientStockError) as error:
+        decrement_stock(db, {med_id: 3})
+
+    assert error.value.available == 2
+    assert stock_of(db, med_id) == (10, 8)
+
+
+def test_empty_order_does_nothing(db):
+    assert decrement_stock(db, {}) == {}
+
+
+def test_decrement_is_audited_per_medication(monkeypatch):
+    events = []
+    monkeypatch.setattr(inventory_service.audit_logger, "log", lambda *args, **kwargs: events.append((args, kwargs)))
+
+    audit_stock_decrement({7: 2, 3: 1}, {3: 9, 7: 0}, prescription_id=42, reservation_id="r-1")
+
+    assert events == [(
+        (SOURCE_INVENTORY, "Stock decremented from reservation r-1: #3 -1 (9 left), #7 -2 (0 left)"),
+        {"prescription_id": 42}
+    )]
@@ -0,0 +1,65 @@
+"""Tests for resolving the medicine names of a prescription request to medications (requires Postgres)."""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.prescriptions import _lookup_medication, _resolve_medications
+from app.models.prescription import Prescription  # noqa: F401  (registers the prescription mappers)
+
+INSERT_MEDICATION_SQL = text("""
+    INSERT INTO medications (name, active_ingredient, form, unit_type, unit_price, stock, reserved, treatment_class)
+    VALUES (:name, 'test', 'viên', 'viên', 1000, 10, 0, 'test')
+""")
+
+
+def resolve(existing, names):
+    """Resolve names against the catalog plus the existing medication names, inserted in a rolled-back transaction."""
+    from app.database.connection import async_engine
+
+    async def scenario():
+        try:
+            async with async_engine.connect() as conn:
+                await conn.begin()
+                session = AsyncSession(bind=conn)
+                for name in existing:
+                    await session.execute(INSERT_MEDICATION_SQL, {"name": name})
+                medications = await _resolve_medications(session, names)
+                await session.close()
+                await conn.rollback()
+                return medications
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_exact_names_and_ingredient_suffix_resolve(db):
+    medications = resolve(["Test-Resolve A"], ["Test-Resolve A", "Test-Resolve A (Hoạt chất)"])
+
+    assert _lookup_medication(medications, "Test-Resolve A").name == "Test-Resolve A"
+    # The part before the active ingredient is tried as a fallback
+    assert _lookup_medication(medications, "Test-Resolve A (Hoạt chất)").name == "Test-Resolve A"
+
+
+def test_case_and_whitespace_variants_resolve(db):
+    requested = ["TEST-RESOLVE A", "  test-resolve a ", "test-resolve a (Hoạt chất)"]
+    medications = resolve(["Test-Resolve A"], requested)
+
+    for name in requested:
+        assert _lookup_medication(medications, name).name == "Test-Resolve A"
+    assert _lookup_medication(medications, "Test-Resolve B") is None
+
+
+def test_names_differing_only_in_case_need_an_exact_match(db):
+    medications = resolve(["Test-Resolve A", "TEST-RESOLVE A"], ["test-resolve a", "TEST-RESOLVE A", "Test-Resolve A"])
+
+    assert _lookup_medication(medications, "Test-Resolve A").name == "Test-Resolve A"
+    assert _lookup_medication(medications, "TEST-RESOLVE A").name == "TEST-RESOLVE A"
+    # Ambiguous: never an arbitrary one of them
+    assert _lookup_medication(medications, "test-resolve a") is None
+
+
+def test_no_names_resolve_to_nothing():
+    assert asyncio.run(_resolve_medications(None, [])) == {}
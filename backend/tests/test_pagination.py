@@ -0,0 +1,94 @@
+"""Tests for keyset pagination cursors and pages."""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.pagination import (
+    InvalidCursor,
+    _decode_key,
+    _encode_key,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    split_alphabetical_page,
+    split_page
+)
+from app.models.patient import Patient
+from app.models.prescription import Prescription  # noqa: F401  (mapper relationships)
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2024, 5, 17, 8, 30, 12, 123456),
+    datetime(2024, 1, 1),
+    datetime(1970, 1, 1)
+])
+def test_cursor_round_trip(created_at):
+    cursor = encode_cursor(created_at, 12345)
+
+    assert decode_cursor(cursor) == (created_at, 12345)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+
+
+def test_alphabetical_cursor_round_trip_keeps_unicode_names():
+    rows = [SimpleNamespace(name=name, id=row_id) for row_id, name in enumerate(["Đường glucose", "Ích mẫu", "Zinc"])]
+
+    page, cursor = split_alphabetical_page(rows, limit=2)
+
+    assert page == rows[:2]
+    assert _decode_key(cursor) == ["Ích mẫu", 1]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _encode_key(["2024-01-01T00:00:00"]),
+    _encode_key(["yesterday", 1]),
+    _encode_key(["2024-01-01T00:00:00", "one"]),
+    _encode_key({"created_at": "2024-01-01T00:00:00", "id": 1})
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_split_page_builds_a_cursor_only_when_more_rows_exist():
+    rows = [SimpleNamespace(created_at=datetime(2024, 1, day), id=day) for day in (3, 2, 1)]
+
+    assert split_page(rows, limit=3) == (rows, None)
+    page, cursor = split_page(rows, limit=2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (datetime(2024, 1, 2), 2)
+
+
+def make_patients(db, created_at: str, count: int) -> list:
+    return [
+        db.execute(
+            text("INSERT INTO patients (gender, age, weight, height, created_at) VALUES ('other', 30, 60, 170, :created_at) RETURNING id"),
+            {"created_at": created_at}
+        ).scalar()
+        for _ in range(count)
+    ]
+
+
+def test_pages_cover_rows_with_equal_timestamps_exactly_once(db):
+    # Far in the future, so these are the newest rows in any database
+    ids = make_patients(db, "2999-01-01", 5) + make_patients(db, "2998-01-01", 2)
+    query = select(Patient).filter(Patient.id.in_(ids))
+
+    seen, cursor = [], None
+    while True:
+        rows = db.execute(keyset_page(query, Patient.created_at, Patient.id, cursor, limit=2)).scalars().all()
+        page, cursor = split_page(rows, limit=2)
+        seen += [patient.id for patient in page]
+        if cursor is None:
+            break
+
+    assert seen == sorted(ids[:5], reverse=True) + sorted(ids[5:], reverse=True)
+
+
+def test_rows_without_created_at_are_rejected(db):
+    with pytest.raises(IntegrityError):
+        db.execute(text("INSERT INTO patients (gender, age, weight, height, created_at) VALUES ('other', 30, 60, 170, NULL)"))
@@ -0,0 +1,63 @@
+"""Tests for connection pool wait metrics."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from app.database.pool_metrics import PoolMetrics, timed_pool_class
+
+CONNECT_SECONDS = 0.2
+
+
+def make_pool(metrics: PoolMetrics, **kwargs) -> QueuePool:
+    def slow_connect():
+        time.sleep(CONNECT_SECONDS)
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    return timed_pool_class(QueuePool, metrics)(slow_connect, **kwargs)
+
+
+def wait_stats(metrics: PoolMetrics) -> dict:
+    with metrics._lock:
+        return {"waits": metrics._waits, "blocked": metrics._blocked, "max": metrics._wait_max,
+                "timeouts": metrics._timeouts}
+
+
+def test_connect_time_is_not_counted_as_waiting():
+    metrics = PoolMetrics("test")
+    pool = make_pool(metrics, pool_size=1, max_overflow=1)
+
+    first, second = pool.connect(), pool.connect()  # Both open a new connection
+
+    assert wait_stats(metrics) == {"waits": 2, "blocked": 0, "max": 0.0, "timeouts": 0}
+    first.close()
+    second.close()
+
+
+def test_checkout_from_a_full_pool_is_timed():
+    metrics = PoolMetrics("test")
+    pool = make_pool(metrics, pool_size=1, max_overflow=0)
+    held = pool.connect()
+
+    threading.Timer(0.1, held.close).start()
+    pool.connect().close()
+
+    stats = wait_stats(metrics)
+    assert stats["blocked"] == 1
+    assert 0.05 < stats["max"] < CONNECT_SECONDS
+
+
+def test_timeouts_are_recorded():
+    metrics = PoolMetrics("test")
+    pool = make_pool(metrics, pool_size=1, max_overflow=0, timeout=0.05)
+    held = pool.connect()
+
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+
+    assert wait_stats(metrics)["timeouts"] == 1
+    held.close()
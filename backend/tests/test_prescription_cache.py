@@ -0,0 +1,85 @@
+"""Tests for warming the prescription detail cache on confirmation (requires Postgres)."""
+
+import asyncio
+import json
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.prescriptions import (
+    ConfirmPrescriptionRequest,
+    _cache_prescription_detail,
+    _load_prescription_detail,
+    confirm_prescription,
+    prescription_detail_cache
+)
+
+INSERT_MEDICATION_SQL = text("""
+    INSERT INTO medications (name, active_ingredient, form, unit_type, unit_price, stock, reserved, treatment_class)
+    VALUES (:name, 'test', 'viên', 'viên', :unit_price, 100, 0, 'test')
+""")
+
+
+def confirm_and_reload(request: dict):
+    """Confirm inside a transaction that is rolled back; return the confirmation and the prescription read back."""
+    from app.database.connection import async_engine
+
+    async def scenario():
+        try:
+            async with async_engine.connect() as conn:
+                await conn.begin()
+                # The endpoint's commit only releases a savepoint of the outer transaction
+                session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+                for name, unit_price in (("test-cache-main-1", 1000), ("test-cache-main-2", 1500), ("test-cache-support", 700)):
+                    await session.execute(INSERT_MEDICATION_SQL, {"name": name, "unit_price": unit_price})
+
+                confirmation = await confirm_prescription(
+                    ConfirmPrescriptionRequest(**request),
+                    Response(),
+                    idempotency_key=None,
+                    db=session
+                )
+                stored = await _load_prescription_detail(session, confirmation.prescription_id)
+                await session.close()
+                await conn.rollback()
+                return confirmation, stored
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_confirmation_caches_the_body_get_would_serve(db):
+    confirmation, stored = confirm_and_reload({
+        "patient_data": {"gender": "female", "age": 30, "weight": 50, "height": 160},
+        "main_medicines": [
+            {"name": "test-cache-main-1", "quantity_per_dose": 1},
+            {"name": "test-cache-main-2", "quantity_per_dose": 2}
+        ],
+        "supporting_medicines": [{"name": "test-cache-support", "quantity_total": 3}],
+        "doses_per_day": 2,
+        "total_days": 3,
+        "diagnosis": "Cảm cúm"
+    })
+
+    cached = prescription_detail_cache.get(confirmation.prescription_id)
+    prescription_detail_cache.invalidate(confirmation.prescription_id)
+
+    assert json.loads(cached) == json.loads(stored.model_dump_json())
+    assert [dose["quantity_per_dose"] for dose in json.loads(cached)["doses"]] == [1, 2]
+
+
+def test_failed_serialization_leaves_no_entry():
+    class Unserializable:
+        id = -1
+
+        def model_dump_json(self):
+            raise ValueError("cannot serialize")
+
+    prescription_detail_cache.set(-1, b"stale")
+
+    # The error is logged, not raised: the prescription is already committed
+    _cache_prescription_detail(Unserializable())
+
+    assert prescription_detail_cache.get(-1) is None
@@ -0,0 +1,66 @@
+"""Tests for the bounded profile store and its download path guard."""
+
+import os
+
+import pytest
+
+from app.core.profiling import ProfileStore, new_profile_id
+
+SCOPE = {"method": "POST", "path": "/api/v1/analyze_input", "headers": [(b"x-kiosk-id", b"kiosk/01")]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles"), max_files=3, max_bytes=1024 * 1024)
+
+
+def test_saved_profile_resolves_inside_the_directory(store):
+    name = store.save(new_profile_id(), SCOPE, 200, 1.234, "{}")
+
+    path = store.path(name)
+
+    assert path is not None
+    assert path.resolve().parent == store.directory.resolve()
+    assert "/" not in name and name.endswith("_200_1234ms_kiosk-01.speedscope.json")
+
+
+@pytest.mark.parametrize("name", [
+    "../secret.speedscope.json",
+    "../../etc/passwd",
+    "/etc/passwd",
+    "20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json/../../../etc/passwd",
+    "../20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json",
+    "20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json\n",
+    "20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json\x00",
+    "..%2F20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json",
+    ""
+])
+def test_names_outside_the_pattern_are_refused(store, name):
+    store.save(new_profile_id(), SCOPE, 200, 0.1, "{}")
+
+    assert store.path(name) is None
+
+
+def test_refused_even_if_a_matching_file_exists_outside(store, tmp_path):
+    # A valid-looking name one level up must not be reachable
+    outside = tmp_path / "20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json"
+    outside.write_text("{}")
+
+    assert store.path(f"../{outside.name}") is None
+    assert store.path(outside.name) is None
+
+
+def test_unknown_valid_name_is_not_found(store):
+    assert store.path("20240101T000000-abcdef01_GET_x_200_1ms.speedscope.json") is None
+
+
+def test_oldest_profiles_are_pruned_beyond_max_files(store):
+    names = []
+    for second in range(5):
+        name = store.save(new_profile_id(), SCOPE, 200, 0.1, "{}")
+        os.utime(store.directory / name, (1_700_000_000 + second, 1_700_000_000 + second))
+        names.append(name)
+    store._prune()
+
+    assert [profile["name"] for profile in store.list()] == names[:-4:-1]
+    assert store.get_stats()["profiles"] == 3
@@ -0,0 +1,109 @@
+"""Tests for stock reservations and their consumption on confirm (requires Postgres)."""
+
+import pytest
+from sqlalchemy import text
+
+from app.services.inventory_service import (
+    InsufficientStockError,
+    cancel_reservation,
+    decrement_stock,
+    expire_reservations,
+    reserve_stock
+)
+
+
+def stock_of(db, med_id: int) -> tuple:
+    row = db.execute(text("SELECT stock, reserved FROM medications WHERE id = :id"), {"id": med_id}).one()
+    return row.stock, row.reserved
+
+
+def holds_of(db, reservation_id: str) -> int:
+    return db.execute(
+        text("SELECT count(*) FROM stock_reservations WHERE reservation_id = :id"), {"id": reservation_id}
+    ).scalar()
+
+
+def test_reserve_sets_units_aside(db, make_medication):
+    med_id = make_medication(10)
+
+    reservation_id, expires_at, available = reserve_stock(db, {med_id: 4}, ttl_seconds=600)
+
+    assert available == {med_id: 6}
+    assert expires_at is not None
+    assert stock_of(db, med_id) == (10, 4)
+    assert holds_of(db, reservation_id) == 1
+
+
+def test_reserve_beyond_unreserved_stock_fails(db, make_medication):
+    med_id = make_medication(10, reserved=7)
+
+    with pytest.raises(InsufficientStockError) as error:
+        reserve_stock(db, {med_id: 4}, ttl_seconds=600)
+
+    assert error.value.available == 3
+    assert stock_of(db, med_id) == (10, 7)
+
+
+def test_held_order_succeeds_where_unheld_order_would_oversell(db, make_medication):
+    med_id = make_medication(10)
+    reservation_id, _, _ = reserve_stock(db, {med_id: 8}, ttl_seconds=600)
+
+    # Another kiosk without a hold cannot take the held units
+    with pytest.raises(InsufficientStockError):
+        decrement_stock(db, {med_id: 5})
+    assert decrement_stock(db, {med_id: 2}) == {med_id: 0}
+
+    # The holder still gets all eight, consuming its hold
+    assert decrement_stock(db, {med_id: 8}, reservation_id=reservation_id) == {med_id: 0}
+    assert stock_of(db, med_id) == (0, 0)
+    assert holds_of(db, reservation_id) == 0
+
+
+def test_quantity_beyond_the_hold_is_checked_against_unreserved_stock(db, make_medication):
+    med_id = make_medication(10, reserved=3)
+    reservation_id, _, _ = reserve_stock(db, {med_id: 4}, ttl_seconds=600)
+
+    # Held 4, plus 3 more of the 3 unreserved units
+    assert decrement_stock(db, {med_id: 7}, reservation_id=reservation_id) == {med_id: 0}
+    assert stock_of(db, med_id) == (3, 3)
+
+
+def test_hold_covering_less_than_the_order_fails_without_enough_free_stock(db, make_medication):
+    med_id = make_medication(10, reserved=5)
+    reservation_id, _, _ = reserve_stock(db, {med_id: 4}, ttl_seconds=600)
+
+    with pytest.raises(InsufficientStockError):
+        decrement_stock(db, {med_id: 6}, reservation_id=reservation_id)
+
+
+def test_unused_held_medication_is_released_on_confirm(db, make_medication):
+    kept, dropped = make_medication(10), make_medication(10)
+    reservation_id, _, _ = reserve_stock(db, {kept: 2, dropped: 3}, ttl_seconds=600)
+
+    # The confirmed order no longer contains the second medication
+    decrement_stock(db, {kept: 2}, reservation_id=reservation_id)
+
+    assert stock_of(db, kept) == (8, 0)
+    assert stock_of(db, dropped) == (10, 0)
+
+
+def test_expired_hold_is_a_plain_checked_decrement(db, make_medication):
+    med_id = make_medication(10)
+    reservation_id, _, _ = reserve_stock(db, {med_id: 8}, ttl_seconds=0)
+
+    # The expired hold still counts in reserved until swept, and gives nothing to its owner
+    with pytest.raises(InsufficientStockError):
+        decrement_stock(db, {med_id: 8}, reservation_id=reservation_id)
+
+    assert expire_reservations(db)[med_id] == 10
+    assert stock_of(db, med_id) == (10, 0)
+    assert decrement_stock(db, {med_id: 8}, reservation_id=reservation_id) == {med_id: 2}
+
+
+def test_cancel_gives_units_back(db, make_medication):
+    med_id = make_medication(10)
+    reservation_id, _, _ = reserve_stock(db, {med_id: 6}, ttl_seconds=600)
+
+    assert cancel_reservation(db, reservation_id) == {med_id: 10}
+    assert cancel_reservation(db, reservation_id) == {}
+    assert stock_of(db, med_id) == (10, 0)
@@ -0,0 +1,64 @@
+"""Tests for reloading vector search stock levels after stock notifications."""
+
+import asyncio
+from contextlib import nullcontext
+
+from app.core.config import settings
+from app.services import vector_store_manager as manager_module
+from app.services.catalog_service import STOCK_CHANNEL, CatalogCache
+from app.services.vector_store_manager import VectorStoreManager
+from app.services.vector_store_service import MedicalVectorStore
+
+
+def make_manager(medication_ids) -> VectorStoreManager:
+    manager = VectorStoreManager()
+    manager.vector_store = MedicalVectorStore(vector_store_path="unused")
+    manager.vector_store.medication_store = object()
+    manager.vector_store.medication_metadata = {
+        position: {"id": med_id, "stock": 0} for position, med_id in enumerate(medication_ids)
+    }
+    manager.initialized = True
+    return manager
+
+
+def stock_of(manager: VectorStoreManager, med_id: int) -> int:
+    return manager.vector_store._medication_metadata_by_id()[med_id]["stock"]
+
+
+def test_refresh_reads_unreserved_stock(db, make_medication, monkeypatch):
+    med_id = make_medication(stock=10, reserved=3)
+    monkeypatch.setattr(manager_module, "SessionLocal", lambda: nullcontext(db))
+    manager = make_manager([med_id])
+
+    assert manager.refresh_stock_levels() >= 1
+    assert stock_of(manager, med_id) == 7
+
+
+def test_stock_notifications_schedule_one_refresh(monkeypatch):
+    monkeypatch.setattr(settings, "stock_refresh_delay_seconds", 0.01)
+    manager = make_manager([1])
+    refreshes = []
+    monkeypatch.setattr(manager, "refresh_stock_levels", lambda: refreshes.append(1) or 1)
+    cache = CatalogCache(max_age=10.0)
+    cache.on_stock_change(manager.schedule_stock_refresh)
+
+    async def changes():
+        for _ in range(3):
+            cache._on_notification(None, 0, STOCK_CHANNEL, "")
+        await manager._stock_refresh_task
+        cache._on_notification(None, 0, STOCK_CHANNEL, "")
+        await manager._stock_refresh_task
+
+    asyncio.run(changes())
+    assert len(refreshes) == 2
+
+
+def test_no_refresh_before_stores_are_loaded(monkeypatch):
+    manager = make_manager([1])
+    manager.initialized = False
+
+    async def change():
+        manager.schedule_stock_refresh()
+
+    asyncio.run(change())
+    assert manager._stock_refresh_task is None
@@ -0,0 +1,53 @@
+"""Tests for batched query embedding in the medical vector store."""
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.services.vector_store_service import MedicalVectorStore
+
+QUERIES = ["đau đầu, sốt", "ho khan, sổ mũi", "đau bụng"]
+
+
+def make_store(embeddings) -> MedicalVectorStore:
+    store = MedicalVectorStore(vector_store_path="unused")
+    store._embeddings = embeddings
+    return store
+
+
+def test_batched_queries_match_embed_query_for_huggingface(monkeypatch):
+    calls = []
+
+    def fake_embed(self, texts, encode_kwargs):
+        calls.append((len(texts), encode_kwargs))
+        # Vectors depend on the encode settings, as normalize_embeddings would
+        scale = 2.0 if encode_kwargs.get("normalize_embeddings") else 1.0
+        return [[float(len(text)) * scale, scale] for text in texts]
+
+    monkeypatch.setattr(HuggingFaceEmbeddings, "_embed", fake_embed)
+    embeddings = HuggingFaceEmbeddings.model_construct(
+        encode_kwargs={},
+        query_encode_kwargs={"normalize_embeddings": True}
+    )
+    store = make_store(embeddings)
+
+    batched = store._embed_queries(QUERIES)
+
+    assert calls[0] == (len(QUERIES), {"normalize_embeddings": True})
+    assert batched == [embeddings.embed_query(query) for query in QUERIES]
+    assert batched != embeddings.embed_documents(QUERIES)
+
+
+def test_batched_queries_use_encode_kwargs_without_query_kwargs(monkeypatch):
+    monkeypatch.setattr(
+        HuggingFaceEmbeddings, "_embed",
+        lambda self, texts, encode_kwargs: [[float(len(text)), float(len(encode_kwargs))] for text in texts]
+    )
+    embeddings = HuggingFaceEmbeddings.model_construct(encode_kwargs={"batch_size": 8}, query_encode_kwargs={})
+
+    assert make_store(embeddings)._embed_queries(QUERIES) == [embeddings.embed_query(query) for query in QUERIES]
+
+
+def test_batched_queries_match_embed_query_for_other_embeddings():
+    embeddings = DeterministicFakeEmbedding(size=8)
+
+    assert make_store(embeddings)._embed_queries(QUERIES) == [embeddings.embed_query(query) for query in QUERIES]
@@ -39,13 +39,22 @@ export const confirmPrescription = async (patientData) => {
 
 /**
  * GET /medications
- * Get all available medications in stock
+ * Get the medication catalog (without stock)
  */
 export const getMedications = async () => {
   const response = await apiClient.get('/medications');
   return response.data;
 };
 
+/**
+ * GET /medications/stock
+ * Get the available stock of every medication
+ */
+export const getMedicationStock = async () => {
+  const response = await apiClient.get('/medications/stock');
+  return response.data;
+};
+
 /**
  * POST /patients
  * Create patient record with basic info
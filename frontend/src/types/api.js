@@ -99,7 +99,6 @@ export const medicationsResponseSchema = [
     form: "string",
     unit_type: "string",
     unit_price: "number",
-    stock: "number",
     side_effects: "string",
     max_per_day: "number",
     is_supporting: "boolean",
@@ -107,4 +106,12 @@ export const medicationsResponseSchema = [
     contraindications: "string",
     allergy_tags: ["string"]
   }
+];
+
+// GET /medications/stock response structure
+export const medicationStockResponseSchema = [
+  {
+    id: "number",
+    available_stock: "number"
+  }
 ]; 
\ No newline at end of file